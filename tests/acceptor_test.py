@@ -0,0 +1,287 @@
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from wampproto import acceptor, auth, joiner, messages, serializers, uris
+from wampproto.auth import wampcra
+
+PRIVATE_KEY = "49fe40797d16012c92004a19cdd217a2b74ac825e3855d445c455988d70c8973"
+
+
+class Authenticator(auth.IServerAuthenticator):
+    def methods(self) -> list[str]:
+        return ["cryptosign", "ticket", "wampcra", "anonymous"]
+
+    def authenticate(self, request: auth.Request) -> auth.Response:
+        if request.method == "wampcra":
+            return auth.WAMPCRAResponse(request.authid, "user", "password")
+
+        return auth.Response(request.authid, "user")
+
+
+def start_handshake(authenticator: auth.IClientAuthenticator) -> tuple[acceptor.Acceptor, messages.Authenticate]:
+    serializer = serializers.JSONSerializer()
+    j = joiner.Joiner("realm1", serializer, authenticator)
+    a = acceptor.Acceptor(serializer, Authenticator())
+
+    challenge, _ = a.receive(j.send_hello())
+    return a, serializer.deserialize(j.receive(challenge))
+
+
+def test_receive_authenticate_batch():
+    pending = [
+        start_handshake(auth.CryptoSignAuthenticator("alice", PRIVATE_KEY)),
+        start_handshake(auth.CryptoSignAuthenticator("bob", PRIVATE_KEY)),
+        start_handshake(auth.TicketAuthenticator("carol", "ticket")),
+    ]
+
+    # a signature over a different challenge must be rejected
+    forged_acceptor, _ = start_handshake(auth.CryptoSignAuthenticator("mallory", PRIVATE_KEY))
+    pending.append((forged_acceptor, pending[0][1]))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = acceptor.receive_authenticate_batch(pending, executor)
+
+    assert [type(result) for result in results] == [
+        messages.Welcome,
+        messages.Welcome,
+        messages.Welcome,
+        messages.Abort,
+    ]
+    assert [result.authid for result in results[:3]] == ["alice", "bob", "carol"]
+    assert forged_acceptor.is_aborted()
+
+    # an AsyncAcceptor would return a coroutine, nothing of the batch is processed then
+    cryptosign_acceptor, authenticate = start_handshake(auth.CryptoSignAuthenticator("alice", PRIVATE_KEY))
+    pending = [
+        (cryptosign_acceptor, authenticate),
+        (acceptor.AsyncAcceptor(authenticator=Authenticator()), authenticate),
+    ]
+    with pytest.raises(ValueError):
+        acceptor.receive_authenticate_batch(pending)
+
+    assert cryptosign_acceptor._state == acceptor.Acceptor.STATE_CHALLENGE_SENT
+
+
+def test_cryptosign_invalid_public_key():
+    a = acceptor.Acceptor(authenticator=Authenticator())
+    hello = messages.Hello(
+        messages.HelloFields("realm1", {"caller": {}}, "alice", ["cryptosign"], {"pubkey": "not-hex"})
+    )
+
+    result = a.receive_message(hello)
+    assert isinstance(result, messages.Abort)
+    assert a.is_aborted()
+
+
+class SaltedAuthenticator(auth.IServerAuthenticator):
+    def methods(self) -> list[str]:
+        return ["wampcra"]
+
+    def authenticate(self, request: auth.Request) -> auth.Response:
+        return auth.WAMPCRASaltedResponse(request.authid, "user", "password", "salt", 1000, 32)
+
+
+def test_join_wampcra_salted(monkeypatch):
+    serializer = serializers.JSONSerializer()
+    key_cache = auth.DerivedKeyCache()
+
+    derivations = []
+    pbkdf2_hmac = hashlib.pbkdf2_hmac
+    monkeypatch.setattr(wampcra.hashlib, "pbkdf2_hmac", lambda *args: derivations.append(args) or pbkdf2_hmac(*args))
+
+    for _ in range(2):
+        j = joiner.Joiner("realm1", serializer, auth.WAMPCRAAuthenticator("alice", "password", key_cache=key_cache))
+        a = acceptor.Acceptor(serializer, SaltedAuthenticator(), cra_key_cache=key_cache)
+
+        challenge = a.receive_message(serializer.deserialize(j.send_hello()))
+        assert challenge.extra["salt"] == "salt"
+        assert challenge.extra["iterations"] == 1000
+        assert challenge.extra["keylen"] == 32
+
+        welcome = a.receive_message(j.receive_message(challenge))
+        assert isinstance(welcome, messages.Welcome)
+        assert welcome.authid == "alice"
+
+    # joiner and acceptor share the cache here, the key was derived exactly once
+    assert len(derivations) == 1
+    assert len(key_cache) == 1
+
+    # without a cache every handshake derives the key on both ends
+    j = joiner.Joiner("realm1", serializer, auth.WAMPCRAAuthenticator("alice", "password"))
+    a = acceptor.Acceptor(serializer, SaltedAuthenticator())
+    welcome = a.receive_message(j.receive_message(a.receive_message(serializer.deserialize(j.send_hello()))))
+    assert isinstance(welcome, messages.Welcome)
+    assert len(derivations) == 3
+
+
+class BlockingAuthenticator(Authenticator):
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def authenticate(self, request: auth.Request) -> auth.Response:
+        with self._lock:
+            self.threads.add(threading.current_thread())
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+        threading.Event().wait(0.01)
+
+        with self._lock:
+            self.active -= 1
+
+        if request.authid == "denied":
+            raise ValueError("access denied")
+
+        return super().authenticate(request)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "authenticator",
+    [
+        auth.AnonymousAuthenticator("alice"),
+        auth.TicketAuthenticator("alice", "ticket"),
+        auth.WAMPCRAAuthenticator("alice", "password"),
+        auth.CryptoSignAuthenticator("alice", PRIVATE_KEY),
+    ],
+)
+async def test_async_acceptor(authenticator):
+    serializer = serializers.JSONSerializer()
+    server_authenticator = BlockingAuthenticator()
+    j = joiner.Joiner("realm1", serializer, authenticator)
+    a = acceptor.AsyncAcceptor(serializer, auth.ExecutorAuthenticator(server_authenticator, max_concurrency=2))
+
+    data, final = await a.receive(j.send_hello())
+    while not final:
+        data, final = await a.receive(j.receive(data))
+
+    assert j.receive(data) is None
+    assert a.get_session_details() == j.get_session_details()
+    assert threading.current_thread() not in server_authenticator.threads
+
+
+@pytest.mark.asyncio
+async def test_executor_authenticator_limits_concurrency():
+    server_authenticator = BlockingAuthenticator()
+    executor_authenticator = auth.ExecutorAuthenticator(server_authenticator, max_concurrency=2)
+
+    async def handshake(authid: str) -> messages.Message:
+        a = acceptor.AsyncAcceptor(authenticator=executor_authenticator)
+        hello = messages.Hello(messages.HelloFields("realm1", {"caller": {}}, authid, ["anonymous"]))
+        return await a.receive_message(hello)
+
+    results = await asyncio.gather(*(handshake(f"user{i}") for i in range(8)), handshake("denied"))
+
+    assert all(isinstance(result, messages.Welcome) for result in results[:8])
+    assert isinstance(results[8], messages.Abort)
+    assert results[8].args == ["access denied"]
+    assert server_authenticator.max_active <= 2
+
+
+class CountingAuthenticator(Authenticator):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def authenticate(self, request: auth.Request) -> auth.Response:
+        self.calls += 1
+        return super().authenticate(request)
+
+
+def test_resumption_ticket():
+    serializer = serializers.MsgPackSerializer()
+    authenticator = CountingAuthenticator()
+    tickets = auth.ResumptionTickets(b"k" * 32)
+
+    j = joiner.Joiner("realm1", serializer, auth.CryptoSignAuthenticator("alice", PRIVATE_KEY))
+    a = acceptor.Acceptor(serializer, authenticator, resumption=tickets)
+    challenge, _ = a.receive(j.send_hello())
+    welcome, final = a.receive(j.receive(challenge))
+    assert final
+    assert j.receive(welcome) is None
+    assert authenticator.calls == 1
+
+    ticket = j.get_resume_ticket()
+    assert ticket is not None
+
+    # the reconnecting client is welcomed straight away
+    j = joiner.Joiner("realm1", serializer, auth.CryptoSignAuthenticator("alice", PRIVATE_KEY), resume_ticket=ticket)
+    a = acceptor.Acceptor(serializer, authenticator, resumption=tickets)
+    welcome, final = a.receive(j.send_hello())
+    assert final
+    assert j.receive(welcome) is None
+    assert authenticator.calls == 1
+    assert j.get_session_details() == a.get_session_details()
+    assert j.get_session_details().authid == "alice"
+
+    # an invalid ticket falls back to a full authentication
+    j = joiner.Joiner("realm1", serializer, auth.CryptoSignAuthenticator("alice", PRIVATE_KEY), resume_ticket="bogus")
+    a = acceptor.Acceptor(serializer, authenticator, resumption=tickets)
+    challenge, final = a.receive(j.send_hello())
+    assert not final
+    assert isinstance(serializer.deserialize(challenge), messages.Challenge)
+
+
+class TicketOnlyAuthenticator(Authenticator):
+    def methods(self) -> list[str]:
+        return ["ticket", "scram"]
+
+
+def test_negotiate_auth_method():
+    authenticator = TicketOnlyAuthenticator()
+    hello = messages.Hello(messages.HelloFields("realm1", {"caller": {}}, "alice", ["cryptosign", "ticket"]))
+
+    a = acceptor.Acceptor(authenticator=authenticator)
+    challenge = a.receive_message(hello)
+    assert isinstance(challenge, messages.Challenge)
+    assert challenge.authmethod == "ticket"
+
+    welcome = a.receive_message(messages.Authenticate(messages.AuthenticateFields("secret", {})))
+    assert isinstance(welcome, messages.Welcome)
+
+    # methods unknown to the acceptor are never negotiated
+    hello = messages.Hello(messages.HelloFields("realm1", {"caller": {}}, "alice", ["scram", "cryptosign"]))
+    a = acceptor.Acceptor(authenticator=authenticator)
+    abort = a.receive_message(hello)
+    assert isinstance(abort, messages.Abort)
+    assert abort.reason == uris.NO_AUTH_METHOD
+    assert a.is_aborted()
+
+    assert acceptor._supported_methods(authenticator) == {"ticket"}
+    assert acceptor._supported_methods(authenticator) is acceptor._supported_methods(authenticator)
+
+
+@pytest.mark.asyncio
+async def test_async_acceptor_rejects_authenticate_while_authenticating():
+    with auth.ExecutorAuthenticator(BlockingAuthenticator()) as executor_authenticator:
+        a = acceptor.AsyncAcceptor(authenticator=executor_authenticator)
+        hello = messages.Hello(messages.HelloFields("realm1", {"caller": {}}, "alice", ["ticket"]))
+        assert isinstance(await a.receive_message(hello), messages.Challenge)
+
+        authenticate = messages.Authenticate(messages.AuthenticateFields("ticket", {}))
+        pending = asyncio.create_task(a.receive_message(authenticate))
+        await asyncio.sleep(0)
+        assert a._state == acceptor.Acceptor.STATE_AUTHENTICATING
+
+        with pytest.raises(ValueError):
+            await a.receive_message(authenticate)
+
+        assert isinstance(await pending, messages.Welcome)
+
+    # the executor created by the authenticator was shut down
+    with pytest.raises(RuntimeError):
+        executor_authenticator.executor.submit(print)
+
+
+def test_executor_authenticator_keeps_caller_executor():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        auth.ExecutorAuthenticator(Authenticator(), executor).close()
+        assert executor.submit(lambda: 1).result() == 1
@@ -0,0 +1,108 @@
+import pytest
+
+from wampproto import acceptor, admission, auth, messages, uris
+
+
+class Authenticator(auth.IServerAuthenticator):
+    def methods(self) -> list[str]:
+        return ["ticket"]
+
+    def authenticate(self, request: auth.Request) -> auth.Response:
+        return auth.Response(request.authid, "user")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_global_limit():
+    clock = Clock()
+    controller = admission.AdmissionController(rate=1, burst=2, now=clock)
+
+    assert controller.admit("alice", "ticket") is None
+    assert controller.admit("bob", "ticket") is None
+    assert controller.admit("carol", "ticket") == pytest.approx(1.0)
+
+    clock.now = 0.5
+    assert controller.admit("carol", "ticket") == pytest.approx(0.5)
+
+    clock.now = 1.0
+    assert controller.admit("carol", "ticket") is None
+
+
+def test_authid_and_method_limits():
+    clock = Clock()
+    controller = admission.AdmissionController(
+        rate=100, authid_rate=1, authid_burst=1, method_limits={"cryptosign": (1, 1)}, now=clock
+    )
+
+    assert controller.admit("alice", "ticket") is None
+    assert controller.admit("alice", "ticket") is not None
+    assert controller.admit("bob", "cryptosign") is None
+
+    # a rejected handshake doesn't take a token from the other buckets
+    assert controller.admit("carol", "cryptosign") is not None
+    assert controller.admit("carol", "ticket") is None
+
+
+def test_keyed_buckets_bounded():
+    clock = Clock()
+    buckets = admission.KeyedBuckets(rate=1, burst=1, max_buckets=3)
+    for key in "abcde":
+        buckets.get(key, clock.now).tokens -= 1
+
+    assert len(buckets) == 3
+
+    # depleted buckets are never evicted, new keys share the depleted overflow bucket instead
+    assert buckets.get("a", clock.now).tokens < 1
+    assert buckets.get("f", clock.now) is buckets.get("g", clock.now)
+    assert buckets.get("f", clock.now).wait_time() > 0
+
+    # only the least recently used bucket is checked, a depleted one sends new keys to the overflow
+    # bucket even if a later one is idle
+    buckets.get("c", clock.now).tokens = 1
+    assert buckets.get("h", clock.now) is buckets.get("f", clock.now)
+
+    # idle buckets are dropped as soon as they are full again
+    clock.now = 10
+    buckets.get("f", clock.now)
+    assert len(buckets) == 1
+
+
+def test_authid_limit_not_bypassed_by_cycling():
+    clock = Clock()
+    controller = admission.AdmissionController(authid_rate=1, authid_burst=1, max_buckets=4, now=clock)
+
+    admitted = [controller.admit(f"user{i % 8}", "ticket") is None for i in range(32)]
+    # the first 4 authids fill the buckets, the other 4 share the overflow bucket
+    assert sum(admitted) == 5
+
+    clock.now = 1
+    assert controller.admit("user0", "ticket") is None
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        admission.AdmissionController(rate=0)
+
+    with pytest.raises(ValueError):
+        admission.AdmissionController(authid_rate=1, authid_burst=0.5)
+
+
+def test_acceptor_admission():
+    controller = admission.AdmissionController(rate=1, burst=1, now=Clock())
+    hello = messages.Hello(messages.HelloFields("realm1", {"caller": {}}, "alice", ["ticket"]))
+
+    a = acceptor.Acceptor(authenticator=Authenticator(), admission=controller)
+    assert isinstance(a.receive_message(hello), messages.Challenge)
+
+    a = acceptor.Acceptor(authenticator=Authenticator(), admission=controller)
+    abort = a.receive_message(hello)
+    assert isinstance(abort, messages.Abort)
+    assert abort.reason == uris.TOO_MANY_REQUESTS
+    assert abort.details == {"retry_after": 1.0}
+    assert a.is_aborted()
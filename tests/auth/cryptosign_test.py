@@ -1,4 +1,5 @@
 import binascii
+from concurrent.futures import ThreadPoolExecutor
 
 import nacl.signing
 
@@ -40,3 +41,29 @@ def test_sign_cryptosign_challenge():
 def test_verify_cryptosign_signature():
     is_valid = cryptosign.verify_cryptosign_signature(signature + challenge, binascii.unhexlify(public_key_hex))
     assert is_valid
+
+
+def test_verify_cryptosign_signature_checks_challenge():
+    public_key = binascii.unhexlify(public_key_hex)
+    assert cryptosign.verify_cryptosign_signature(signature + challenge, public_key, challenge)
+    assert not cryptosign.verify_cryptosign_signature(signature + challenge, public_key, "00" * 32)
+    assert not cryptosign.verify_cryptosign_signature("zz" + signature + challenge, public_key)
+
+
+def test_verify_key_is_cached():
+    public_key = binascii.unhexlify(public_key_hex)
+    assert cryptosign.get_verify_key(public_key) is cryptosign.get_verify_key(public_key)
+
+
+def test_verify_cryptosign_signatures():
+    public_key = binascii.unhexlify(public_key_hex)
+    items = [
+        (signature + challenge, public_key, challenge),
+        (signature + challenge, public_key, "00" * 32),
+        (signature + challenge, public_key, None),
+    ]
+
+    assert cryptosign.verify_cryptosign_signatures(items) == [True, False, True]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert cryptosign.verify_cryptosign_signatures(items, executor) == [True, False, True]
@@ -0,0 +1,29 @@
+from wampproto.auth import resumption
+
+KEY = b"k" * 32
+
+
+def test_verify():
+    tickets = resumption.ResumptionTickets(KEY)
+    ticket = tickets.issue("alice", "user", "realm1")
+
+    response = tickets.verify(ticket, "realm1")
+    assert response.authid == "alice"
+    assert response.authrole == "user"
+    assert tickets.verify(ticket, "realm1", "alice") is not None
+
+
+def test_reject():
+    now = 1000.0
+    tickets = resumption.ResumptionTickets(KEY, ttl=60, now=lambda: now)
+    ticket = tickets.issue("alice", "user", "realm1")
+
+    assert tickets.verify(ticket, "realm2") is None
+    assert tickets.verify(ticket, "realm1", "bob") is None
+    assert tickets.verify(ticket[:-2], "realm1") is None
+    assert tickets.verify("not-a-ticket", "realm1") is None
+    assert tickets.verify(None, "realm1") is None
+    assert resumption.ResumptionTickets(b"x" * 32).verify(ticket, "realm1") is None
+
+    now += 61
+    assert tickets.verify(ticket, "realm1") is None
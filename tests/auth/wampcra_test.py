@@ -1,4 +1,5 @@
 import json
+import threading
 from datetime import datetime
 
 from wampproto import messages
@@ -66,3 +67,78 @@ def test_verify_invalid_wampcra_signature():
     signature = "invalid_signature"
     is_valid = wampcra.verify_wampcra_signature(signature, cra_challenge, key.encode())
     assert not is_valid
+
+
+def test_derived_key_cache(monkeypatch):
+    cache = wampcra.DerivedKeyCache(maxsize=2, ttl=60)
+    derived = cache.get("salt", "secret", 1000, 32)
+    assert derived == wampcra.derive_cra_key("salt", "secret", 1000, 32)
+
+    calls = []
+    monkeypatch.setattr(wampcra, "derive_cra_key", lambda *args: calls.append(args) or b"key")
+
+    # cached keys are not derived again
+    assert cache.get("salt", "secret", 1000, 32) == derived
+    assert calls == []
+
+    cache.get("salt2", "secret", 1000, 32)
+    cache.get("salt3", "secret", 1000, 32)
+    assert len(cache) == 2
+    assert len(calls) == 2
+
+    # least recently used entry was evicted
+    cache.get("salt", "secret", 1000, 32)
+    assert len(calls) == 3
+
+
+def test_derived_key_cache_keys():
+    cache = wampcra.DerivedKeyCache()
+    cache.get("salt", "secret", 1000, 32)
+
+    # neither the secret nor a plain digest of it is kept
+    (cache_key,) = cache._keys
+    assert b"secret" not in cache_key
+    assert cache_key != cache._cache_key("salt", "secret", 1000, 16)
+    assert cache_key != wampcra.DerivedKeyCache()._cache_key("salt", "secret", 1000, 32)
+
+
+def test_derived_key_cache_threads():
+    cache = wampcra.DerivedKeyCache(maxsize=8)
+    salts = [f"salt{i}" for i in range(32)]
+
+    def derive():
+        for salt in salts:
+            cache.get(salt, "secret", 10, 32)
+
+    threads = [threading.Thread(target=derive) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert len(cache) == 8
+    assert cache.get("salt31", "secret", 10, 32) == wampcra.derive_cra_key("salt31", "secret", 10, 32)
+
+
+def test_derived_key_cache_expiry():
+    cache = wampcra.DerivedKeyCache(ttl=0)
+    cache.get("salt", "secret", 1000, 32)
+    assert len(cache) == 0
+
+
+def test_authenticate_salted():
+    salt = "salt"
+    cache = wampcra.DerivedKeyCache()
+    authenticator = wampcra.WAMPCRAAuthenticator("authID", key, {}, key_cache=cache)
+    challenge = messages.Challenge(
+        ChallengeFields(
+            wampcra.WAMPCRAAuthenticator.TYPE,
+            {"challenge": cra_challenge, "salt": salt, "iterations": 1000, "keylen": 32},
+        )
+    )
+
+    authenticate = authenticator.authenticate(challenge)
+    derived = wampcra.derive_cra_key(salt, key, 1000, 32)
+    assert wampcra.verify_wampcra_signature(authenticate.signature, cra_challenge, derived)
+    assert len(cache) == 1
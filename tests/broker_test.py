@@ -1,7 +1,8 @@
 import pytest
 
-from wampproto import messages
-from wampproto.broker import Broker
+from wampproto import messages, queues, uris
+from wampproto.broker import Broker, OPTION_CONFLATE
+from wampproto.messages import util
 from wampproto.types import MessageWithRecipient, SessionDetails
 
 
@@ -136,3 +137,225 @@ def test_publishing_to_topic():
         broker.receive_publish(5, publish)
 
     assert str(exc.value) == "cannot publish, session 5 doesn't exist"
+
+
+def test_invalid_topic_uri():
+    broker = Broker()
+    details = SessionDetails(1, "realm1", "authid", "authrole")
+    broker.add_session(details)
+
+    subscribe = messages.Subscribe(messages.SubscribeFields(1, "io..test"))
+    message_with_recipient = broker.receive_message(details.session_id, subscribe)
+    assert isinstance(message_with_recipient.message, messages.Error)
+    assert message_with_recipient.message.uri == uris.INVALID_URI
+    assert not broker.has_subscription("io..test")
+
+    # pattern based subscriptions are not supported
+    for match in ("wildcard", "prefix"):
+        subscribe = messages.Subscribe(messages.SubscribeFields(2, "io..test", options={"match": match}))
+        message_with_recipient = broker.receive_message(details.session_id, subscribe)
+        assert isinstance(message_with_recipient.message, messages.Error)
+        assert message_with_recipient.message.uri == uris.INVALID_ARGUMENT
+        assert not broker.has_subscription("io..test")
+
+    subscribe = messages.Subscribe(messages.SubscribeFields(2, "io.test", options={"match": "exact"}))
+    message_with_recipient = broker.receive_message(details.session_id, subscribe)
+    assert isinstance(message_with_recipient.message, messages.Subscribed)
+
+    publish = messages.Publish(messages.PublishFields(3, "io..test", options={"acknowledge": True}))
+    publication = broker.receive_publish(details.session_id, publish)
+    assert publication.event is None
+    assert publication.ack.message.uri == uris.INVALID_URI
+
+    # strict mode only allows lowercase letters, digits and underscores
+    strict_broker = Broker(uri_check=util.URI_CHECK_STRICT)
+    strict_broker.add_session(details)
+    subscribe = messages.Subscribe(messages.SubscribeFields(1, "io.xconn.Test"))
+    message_with_recipient = strict_broker.receive_message(details.session_id, subscribe)
+    assert isinstance(message_with_recipient.message, messages.Error)
+
+
+def test_subscriber_queues():
+    broker = Broker(queue_size=2, queue_policy=queues.POLICY_DISCONNECT)
+    for session_id in (1, 2, 3):
+        broker.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+        broker.receive_message(session_id, messages.Subscribe(messages.SubscribeFields(1, "io.xconn.test")))
+
+    publish = messages.Publish(messages.PublishFields(1, "io.xconn.test", args=[1]))
+    for _ in range(2):
+        assert broker.dispatch(broker.receive_publish(3, publish)) == []
+
+    # session 1 keeps up, session 2 doesn't
+    assert len(broker.drain(1)) == 2
+    assert broker.dispatch(broker.receive_publish(3, publish)) == [2, 3]
+    assert broker.dropped_events == 2
+    assert broker.pending_events(1) == 1
+    assert broker.pending_events(2) == 2
+
+    broker.remove_session(2)
+    assert broker.pending_events(2) == 0
+    assert broker.drain(2) == []
+
+    with pytest.raises(ValueError):
+        Broker(queue_size=0)
+
+
+def test_unbounded_subscriber_queues():
+    broker = Broker()
+    for session_id in (1, 2):
+        broker.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+
+    broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(1, "io.xconn.test")))
+    for i in range(100):
+        publish = messages.Publish(messages.PublishFields(i, "io.xconn.test", args=[i]))
+        assert broker.dispatch(broker.receive_publish(2, publish)) == []
+
+    # without a queue_size nothing is dropped
+    assert broker.dropped_events == 0
+    assert broker.pending_events(2) == 0
+    assert [event.args[0] for event in broker.drain(1)] == list(range(100))
+
+
+def test_conflation():
+    broker = Broker(queue_size=100)
+    subscribers = {1: {}, 2: {OPTION_CONFLATE: True}, 3: {OPTION_CONFLATE: "symbol"}}
+    for session_id, options in subscribers.items():
+        broker.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+        subscribe = messages.Subscribe(messages.SubscribeFields(1, "io.xconn.ticks", options=options))
+        broker.receive_message(session_id, subscribe)
+
+    broker.add_session(SessionDetails(4, "realm", "authid", "authrole"))
+    for price, symbol in enumerate(["AAPL", "MSFT", "AAPL", "MSFT", "AAPL"]):
+        publish = messages.Publish(
+            messages.PublishFields(1, "io.xconn.ticks", kwargs={"symbol": symbol, "price": price})
+        )
+        broker.dispatch(broker.receive_publish(4, publish))
+
+    def prices(session_id: int) -> list[int]:
+        return [event.kwargs["price"] for event in broker.drain(session_id)]
+
+    # the plain subscriber gets every event
+    assert prices(1) == [0, 1, 2, 3, 4]
+    # the others only the latest per topic or per symbol, in order of first arrival
+    assert prices(2) == [4]
+    assert prices(3) == [4, 3]
+    assert broker.queues[3].conflated == 3
+    assert broker.dropped_events == 0
+
+    # once delivered, conflation starts over
+    publish = messages.Publish(messages.PublishFields(1, "io.xconn.ticks", kwargs={"symbol": "AAPL", "price": 5}))
+    broker.dispatch(broker.receive_publish(4, publish))
+    assert prices(3) == [5]
+
+    # values that can't be hashed are not conflated, even inside a tuple
+    for price, symbol in enumerate([("AAPL", [1]), ("AAPL", [1]), ["MSFT"], ["MSFT"]], 6):
+        publish = messages.Publish(
+            messages.PublishFields(1, "io.xconn.ticks", kwargs={"symbol": symbol, "price": price})
+        )
+        broker.dispatch(broker.receive_publish(4, publish))
+
+    assert prices(3) == [6, 7, 8, 9]
+
+    broker.receive_message(
+        2, messages.Unsubscribe(messages.UnsubscribeFields(2, broker.lookup_subscription("io.xconn.ticks")))
+    )
+    assert 2 not in broker.get_subscription(broker.lookup_subscription("io.xconn.ticks")).conflate
+
+
+def test_receive_publish_many():
+    broker = Broker()
+    for session_id in (1, 2, 3):
+        broker.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+
+    broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(1, "io.xconn.a")))
+    broker.receive_message(2, messages.Subscribe(messages.SubscribeFields(1, "io.xconn.a")))
+    broker.receive_message(2, messages.Subscribe(messages.SubscribeFields(2, "io.xconn.b")))
+
+    publishes = [
+        messages.Publish(messages.PublishFields(1, "io.xconn.a", args=[1])),
+        messages.Publish(messages.PublishFields(2, "io.xconn.b", args=[2], options={"acknowledge": True})),
+        messages.Publish(messages.PublishFields(3, "io.xconn.c", args=[3], options={"acknowledge": True})),
+        messages.Publish(messages.PublishFields(4, "io..invalid", args=[4], options={"acknowledge": True})),
+        messages.Publish(messages.PublishFields(5, "io.xconn.a", args=[5])),
+    ]
+    batch = broker.receive_publish_many(3, publishes)
+
+    assert {recipient: [event.args[0] for event in events] for recipient, events in batch.events.items()} == {
+        1: [1, 5],
+        2: [1, 2, 5],
+    }
+    # recipients share the same event objects
+    assert batch.events[1][0] is batch.events[2][0]
+
+    assert [ack.recipient for ack in batch.acks] == [3, 3, 3]
+    assert [type(ack.message) for ack in batch.acks] == [messages.Published, messages.Published, messages.Error]
+    assert batch.acks[2].message.uri == uris.INVALID_URI
+
+    with pytest.raises(ValueError):
+        broker.receive_publish_many(4, publishes)
+
+
+def test_dispatch_batch_matches_single_publishes():
+    def make_broker() -> Broker:
+        broker = Broker(queue_size=3, queue_policy=queues.POLICY_DISCONNECT)
+        subscribers = {1: {}, 2: {OPTION_CONFLATE: "symbol"}, 3: {}}
+        for session_id, options in subscribers.items():
+            broker.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+            subscribe = messages.Subscribe(messages.SubscribeFields(1, "io.xconn.ticks", options=options))
+            broker.receive_message(session_id, subscribe)
+
+        broker.add_session(SessionDetails(4, "realm", "authid", "authrole"))
+        return broker
+
+    publishes = [
+        messages.Publish(messages.PublishFields(i, "io.xconn.ticks", kwargs={"symbol": symbol, "price": i}))
+        for i, symbol in enumerate(["AAPL", "MSFT", "AAPL", "MSFT", "AAPL"])
+    ]
+
+    single = make_broker()
+    single_overflowed = set()
+    for publish in publishes:
+        single_overflowed.update(single.dispatch(single.receive_publish(4, publish)))
+
+    batched = make_broker()
+    batched_overflowed = batched.dispatch_batch(batched.receive_publish_many(4, publishes))
+
+    # queue limits and conflation apply to batches as well
+    assert sorted(batched_overflowed) == sorted(single_overflowed) == [1, 3]
+    assert batched.dropped_events == single.dropped_events == 4
+    for session_id in (1, 2, 3):
+        assert [event.kwargs["price"] for event in batched.drain(session_id)] == [
+            event.kwargs["price"] for event in single.drain(session_id)
+        ]
+
+
+def test_recipients_snapshot():
+    broker = Broker()
+    for session_id in (1, 2, 3):
+        broker.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+
+    broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(1, "io.xconn.topic")))
+    broker.receive_message(2, messages.Subscribe(messages.SubscribeFields(1, "io.xconn.topic")))
+
+    publish = messages.Publish(messages.PublishFields(1, "io.xconn.topic"))
+    first = broker.receive_publish(3, publish)
+    second = broker.receive_publish(3, publish)
+    assert first.recipients == (1, 2)
+    # publications to an unchanged subscription share the same recipients
+    assert second.recipients is first.recipients
+
+    broker.receive_message(3, messages.Subscribe(messages.SubscribeFields(1, "io.xconn.topic")))
+    third = broker.receive_publish(3, publish)
+    assert third.recipients is not first.recipients
+    assert third.recipients == (1, 2, 3)
+
+    broker.remove_session(1)
+    assert broker.receive_publish(3, publish).recipients == (2, 3)
+
+    # recipients are kept in the order they subscribed
+    for session_id in (9, 5, 7):
+        broker.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+        broker.receive_message(session_id, messages.Subscribe(messages.SubscribeFields(1, "io.xconn.ordered")))
+
+    ordered = messages.Publish(messages.PublishFields(1, "io.xconn.ordered"))
+    assert broker.receive_publish(3, ordered).recipients == (9, 5, 7)
@@ -0,0 +1,187 @@
+import os
+
+import pytest
+
+from wampproto import WAMPSession, chunking, messages, serializers
+from wampproto.dealer import Dealer, OPTION_RECEIVE_PROGRESS
+from wampproto.types import SessionDetails
+
+
+def invocation(request_id: int = 1, receive_progress: bool = True) -> messages.Invocation:
+    details = {OPTION_RECEIVE_PROGRESS: True} if receive_progress else {}
+    return messages.Invocation(messages.InvocationFields(request_id, 1, details=details))
+
+
+def test_chunk_yields():
+    yields = chunking.chunk_yields(invocation(), b"abcdefg", chunk_size=3)
+    assert [y.args for y in yields] == [[b"abc"], [b"def"], [b"g"]]
+    assert [y.options.get("progress", False) for y in yields] == [True, True, False]
+    assert yields[2].options[chunking.OPTION_CHUNK] == {"index": 2, "count": 3, "size": 7}
+
+    assert len(chunking.chunk_yields(invocation(), b"")) == 1
+    with pytest.raises(ValueError):
+        chunking.chunk_yields(invocation(), b"abc", chunk_size=0)
+
+    # the dealer would complete the call with the first chunk
+    with pytest.raises(ValueError):
+        chunking.chunk_yields(invocation(receive_progress=False), b"abc")
+
+
+def test_chunk_yields_text():
+    # str data is split by its UTF-8 encoding, so no chunk exceeds chunk_size bytes
+    yields = chunking.chunk_yields(invocation(), "äöü", chunk_size=4)
+    assert [y.args for y in yields] == [["äö".encode()], ["ü".encode()]]
+    assert yields[0].options[chunking.OPTION_CHUNK] == {"index": 0, "count": 2, "size": 6, "text": True}
+
+    yields = chunking.chunk_yields(invocation(), b"abcd", chunk_size=3, encoding=chunking.ENCODING_BASE64)
+    assert [y.args for y in yields] == [["YWJj"], ["ZA=="]]
+    assert yields[0].options[chunking.OPTION_CHUNK]["encoding"] == chunking.ENCODING_BASE64
+
+    with pytest.raises(ValueError):
+        chunking.chunk_yields(invocation(), b"abc", encoding="hex")
+
+
+@pytest.mark.parametrize(
+    "serializer", [serializers.JSONSerializer(), serializers.MsgPackSerializer(), serializers.CBORSerializer()]
+)
+@pytest.mark.parametrize("data", [os.urandom(100_000), "grüße " * 15_000])
+def test_chunked_call(serializer: serializers.Serializer, data: bytes | str):
+    dealer = Dealer()
+    dealer.add_session(SessionDetails(1, "realm1", "callee", "user"))
+    dealer.add_session(SessionDetails(2, "realm1", "caller", "user"))
+
+    callee = WAMPSession(serializer)
+    caller = WAMPSession(serializer, chunking.ChunkAssembler(max_msg_size=2**20))
+
+    register = messages.Register(messages.RegisterFields(1, "io.xconn.report"))
+    callee.send_message(register)
+    callee.receive_message(dealer.receive_message(1, register).message)
+
+    call = messages.Call(messages.CallFields(1, "io.xconn.report", options={OPTION_RECEIVE_PROGRESS: True}))
+    caller.send_message(call)
+    invocation = dealer.receive_message(2, call).message
+    callee.receive_message(invocation)
+    assert invocation.details[OPTION_RECEIVE_PROGRESS]
+
+    results = []
+    for to_send in callee.send_chunked(invocation, data, chunk_size=30_000):
+        result = dealer.receive_message(1, serializer.deserialize(to_send)).message
+        results.append(caller.receive(serializer.serialize(result)))
+
+    assert len(results) == 4
+    assert results[:3] == [None, None, None]
+    assert isinstance(results[3], messages.Result)
+    assert results[3].args == [data]
+    assert results[3].details == {}
+    assert caller._chunk_assembler.buffered == 0
+
+    # both sides are done with the call
+    with pytest.raises(ValueError):
+        callee.send_message(messages.Yield(messages.YieldFields(invocation.request_id)))
+
+    with pytest.raises(ValueError):
+        caller.receive_message(messages.Result(messages.ResultFields(1)))
+
+
+def test_chunked_call_without_receive_progress():
+    serializer = serializers.MsgPackSerializer()
+    dealer = Dealer()
+    dealer.add_session(SessionDetails(1, "realm1", "callee", "user"))
+    dealer.add_session(SessionDetails(2, "realm1", "caller", "user"))
+
+    callee = WAMPSession(serializer)
+    caller = WAMPSession(serializer, chunking.ChunkAssembler())
+
+    register = messages.Register(messages.RegisterFields(1, "io.xconn.report"))
+    callee.send_message(register)
+    callee.receive_message(dealer.receive_message(1, register).message)
+
+    call = messages.Call(messages.CallFields(1, "io.xconn.report"))
+    caller.send_message(call)
+    invocation = dealer.receive_message(2, call).message
+    callee.receive_message(invocation)
+
+    with pytest.raises(ValueError):
+        callee.send_chunked(invocation, b"x" * 30, chunk_size=10)
+
+    # a callee that chunks anyway completes the call with its first chunk, which the caller rejects
+    yields = chunking.chunk_yields(
+        messages.Invocation(
+            messages.InvocationFields(invocation.request_id, 1, details={OPTION_RECEIVE_PROGRESS: True})
+        ),
+        b"x" * 30,
+        chunk_size=10,
+    )
+    first = dealer.receive_message(1, yields[0]).message
+    assert "progress" not in first.details
+    with pytest.raises(ValueError):
+        caller.receive_message(first)
+
+    assert caller._chunk_assembler.buffered == 0
+    assert caller._call_requests == set()
+
+
+def result(index: int, count: int, size: int, chunk: bytes, request_id: int = 1) -> messages.Result:
+    details = {chunking.OPTION_CHUNK: {"index": index, "count": count, "size": size}}
+    if index < count - 1:
+        details["progress"] = True
+
+    return messages.Result(messages.ResultFields(request_id, args=[chunk], details=details))
+
+
+def test_assembler_limits():
+    assembler = chunking.ChunkAssembler(max_msg_size=10, max_buffered=12)
+
+    with pytest.raises(ValueError):
+        assembler.add(result(0, 2, 11, b"x"))
+
+    # chunks can't add up to more than announced
+    assembler.add(result(0, 2, 4, b"xxx"))
+    with pytest.raises(ValueError):
+        assembler.add(result(1, 2, 4, b"xxx"))
+    assert assembler.buffered == 0
+
+    with pytest.raises(ValueError):
+        assembler.add(result(1, 2, 4, b"xx"))
+
+    # the limit applies to all pending calls together
+    assembler.add(result(0, 2, 10, b"x" * 5, request_id=1))
+    assembler.add(result(0, 2, 10, b"x" * 5, request_id=2))
+    with pytest.raises(ValueError):
+        assembler.add(result(0, 2, 10, b"x" * 5, request_id=3))
+
+    assembler.discard(1)
+    assert assembler.buffered == 5
+
+    plain = messages.Result(messages.ResultFields(4, args=[1]))
+    assert assembler.add(plain) is plain
+
+
+@pytest.mark.parametrize(
+    "chunk_info, args",
+    [
+        ({"index": 0, "count": 1, "size": 3}, ["abc"]),
+        ({"index": 0, "count": 1, "size": 3}, [3]),
+        ({"index": 0, "count": 1, "size": 3}, [b"a", b"b"]),
+        ({"index": 0, "count": 1, "size": 3}, None),
+        ({"index": "0", "count": 1, "size": 3}, [b"abc"]),
+        ({"index": 1, "count": 1, "size": 3}, [b"abc"]),
+        ({"index": 0, "count": 1, "size": True}, [b"abc"]),
+        ({"index": 0, "count": 1, "size": 4}, [b"abc"]),
+        ({"index": 0, "count": 1, "size": 3, "encoding": "base64"}, ["!!!!"]),
+        ({"index": 0, "count": 1, "size": 3, "encoding": "base64"}, [b"YWJj"]),
+        ({"index": 0, "count": 1, "size": 3, "encoding": "hex"}, ["616263"]),
+        ({"index": 0, "count": 1, "size": 1, "text": True}, [b"\xff"]),
+        ([0, 1, 3], [b"abc"]),
+        # more chunks are announced, but the RESULT isn't progressive
+        ({"index": 0, "count": 2, "size": 6}, [b"abc"]),
+    ],
+)
+def test_assembler_rejects_invalid_chunks(chunk_info, args):
+    assembler = chunking.ChunkAssembler()
+    msg = messages.Result(messages.ResultFields(1, args=args, details={chunking.OPTION_CHUNK: chunk_info}))
+
+    with pytest.raises(ValueError):
+        assembler.add(msg)
+
+    assert assembler.buffered == 0
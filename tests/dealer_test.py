@@ -1,6 +1,6 @@
 import pytest
 
-from wampproto import messages
+from wampproto import messages, uris
 from wampproto.dealer import Dealer, OPTION_RECEIVE_PROGRESS, OPTION_PROGRESS
 from wampproto.types import SessionDetails
 
@@ -222,3 +222,32 @@ def test_progressive_call_invocations():
     msg = dealer.receive_message(caller_details.session_id, call)
     assert isinstance(msg.message, messages.Invocation)
     assert OPTION_PROGRESS not in msg.message.details
+
+
+def test_invalid_procedure_uri():
+    dealer = Dealer()
+    details = SessionDetails(1, "realm1", "authid", "authrole")
+    dealer.add_session(details)
+
+    register = messages.Register(messages.RegisterFields(1, "io..test"))
+    message_with_recipient = dealer.receive_message(details.session_id, register)
+    assert isinstance(message_with_recipient.message, messages.Error)
+    assert message_with_recipient.message.uri == uris.INVALID_URI
+    assert not dealer.has_registration("io..test")
+
+    # pattern based registrations are not supported
+    for match in ("wildcard", "prefix"):
+        register = messages.Register(messages.RegisterFields(2, "io.test", options={"match": match}))
+        message_with_recipient = dealer.receive_message(details.session_id, register)
+        assert isinstance(message_with_recipient.message, messages.Error)
+        assert message_with_recipient.message.uri == uris.INVALID_ARGUMENT
+        assert not dealer.has_registration("io.test")
+
+    register = messages.Register(messages.RegisterFields(2, "io.test", options={"match": "exact"}))
+    message_with_recipient = dealer.receive_message(details.session_id, register)
+    assert isinstance(message_with_recipient.message, messages.Registered)
+
+    call = messages.Call(messages.CallFields(2, "io.xconn test"))
+    message_with_recipient = dealer.receive_message(details.session_id, call)
+    assert isinstance(message_with_recipient.message, messages.Error)
+    assert message_with_recipient.message.uri == uris.INVALID_URI
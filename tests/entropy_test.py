@@ -0,0 +1,81 @@
+import gc
+import os
+import weakref
+
+import pytest
+
+from wampproto import entropy
+
+
+def test_read():
+    pool = entropy.EntropyPool(64)
+
+    chunks = [pool.read(16) for _ in range(10)]
+    assert all(len(chunk) == 16 for chunk in chunks)
+    # refilled buffers must never hand out the same bytes twice
+    assert len(set(chunks)) == len(chunks)
+
+    assert len(pool.read(128)) == 128
+    assert len(pool.read_hex(32)) == 64
+
+
+def test_reset():
+    pool = entropy.EntropyPool(64)
+    first = pool.read(16)
+    pool.reset()
+
+    assert pool.read(16) != first
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 255, 256, 1000, 1 << 53])
+def test_randbelow(n):
+    pool = entropy.EntropyPool()
+    values = [pool.randbelow(n) for _ in range(200)]
+
+    assert all(0 <= value < n for value in values)
+
+
+def test_randbelow_invalid():
+    with pytest.raises(ValueError):
+        entropy.randbelow(0)
+
+
+def test_token_hex():
+    assert len(entropy.token_hex(16)) == 32
+    assert len(entropy.token_bytes(16)) == 16
+
+
+def test_pools_are_not_kept_alive():
+    pool = entropy.EntropyPool(64)
+    assert pool in entropy._pools
+
+    ref = weakref.ref(pool)
+    del pool
+    gc.collect()
+    assert ref() is None
+
+
+def test_reset_after_fork():
+    pool = entropy.EntropyPool(64)
+    first = pool.read(16)
+    # simulates a fork while another thread held the lock
+    pool._lock.acquire()
+
+    entropy._reset_pools_after_fork()
+    assert not pool._lock.locked()
+    assert pool.read(16) != first
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_fork():
+    entropy.token_bytes(16)
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write, entropy.token_bytes(16))
+        os._exit(0)
+
+    os.waitpid(pid, 0)
+    assert os.read(read, 16) != entropy.token_bytes(16)
+    os.close(read)
+    os.close(write)
@@ -0,0 +1,111 @@
+import pytest
+
+from wampproto import auth, idgen, messages
+from wampproto.acceptor import Acceptor
+
+
+def test_generate_session_id():
+    for _ in range(100):
+        session_id = idgen.generate_session_id()
+        assert 1 <= session_id <= idgen.ID_MAX
+
+
+def test_router_scope_id_generator():
+    generator = idgen.RouterScopeIDGenerator()
+    ids = {generator.next() for _ in range(1000)}
+
+    assert len(ids) == 1000
+    assert len(generator) == 1000
+    assert all(1 <= session_id <= idgen.ID_MAX for session_id in ids)
+
+    session_id = ids.pop()
+    assert generator.is_live(session_id)
+
+    generator.release(session_id)
+    assert not generator.is_live(session_id)
+    assert len(generator) == 999
+
+
+def test_router_scope_id_generator_partitioning():
+    generators = [idgen.RouterScopeIDGenerator(worker_id, 4) for worker_id in range(4)]
+
+    for generator in generators:
+        for _ in range(100):
+            session_id = generator.next()
+            assert generator.owner(session_id) == generator.worker_id
+            assert 1 <= session_id <= idgen.ID_MAX
+
+    with pytest.raises(ValueError):
+        idgen.RouterScopeIDGenerator(4, 4)
+
+    with pytest.raises(ValueError):
+        idgen.RouterScopeIDGenerator(0, 0)
+
+
+def test_acceptor_uses_router_scope_generator():
+    generator = idgen.RouterScopeIDGenerator(1, 2)
+    acceptor = Acceptor(session_id_generator=generator)
+
+    hello = messages.Hello(messages.HelloFields("realm1", {"caller": {}}, "authid", ["anonymous"]))
+    welcome = acceptor.receive_message(hello)
+
+    assert generator.is_live(welcome.session_id)
+    assert generator.owner(welcome.session_id) == 1
+
+
+def test_shard_scope_id_generator():
+    generators = [idgen.ShardScopeIDGenerator(shard, 3) for shard in range(3)]
+
+    assert [generator.next() for generator in generators] == [1, 2, 3]
+    assert [generator.next() for generator in generators] == [4, 5, 6]
+    for generator in generators:
+        assert generator.owner(generator.next()) == generator.shard
+
+    generator = generators[2]
+    generator.id = idgen.ID_MAX - 1
+    assert generator.next() == 3
+
+    with pytest.raises(ValueError):
+        idgen.ShardScopeIDGenerator(3, 3)
+
+
+class RejectingAuthenticator(auth.IServerAuthenticator):
+    def methods(self) -> list[str]:
+        return ["ticket", "anonymous"]
+
+    def authenticate(self, request: auth.Request) -> auth.Response:
+        raise ValueError("rejected")
+
+
+def test_acceptor_releases_session_id():
+    generator = idgen.RouterScopeIDGenerator()
+    hello = messages.Hello(messages.HelloFields("realm1", {"caller": {}}, "authid", ["anonymous"]))
+
+    # rejected by the authenticator
+    acceptor = Acceptor(authenticator=RejectingAuthenticator(), session_id_generator=generator)
+    assert isinstance(acceptor.receive_message(hello), messages.Abort)
+    assert len(generator) == 0
+
+    # no common auth method
+    acceptor = Acceptor(authenticator=RejectingAuthenticator(), session_id_generator=generator)
+    scram = messages.Hello(messages.HelloFields("realm1", {"caller": {}}, "authid", ["scram"]))
+    assert isinstance(acceptor.receive_message(scram), messages.Abort)
+    assert len(generator) == 0
+
+    # aborted by the client
+    acceptor = Acceptor(authenticator=RejectingAuthenticator(), session_id_generator=generator)
+    acceptor.receive_message(messages.Hello(messages.HelloFields("realm1", {"caller": {}}, "authid", ["ticket"])))
+    acceptor.receive_message(messages.Abort(messages.AbortFields({}, "wamp.close.goodbye_and_out")))
+    assert len(generator) == 0
+
+    # established sessions keep their ID until closed, which releases it only once
+    acceptor = Acceptor(session_id_generator=generator)
+    welcome = acceptor.receive_message(hello)
+    assert generator.is_live(welcome.session_id)
+
+    acceptor.close()
+    assert len(generator) == 0
+
+    reissued = generator.next()
+    acceptor.close()
+    assert generator.is_live(reissued)
@@ -116,6 +116,37 @@ def test_validate_uri_or_raise_correctly():
     assert result == uri
 
 
+@pytest.mark.parametrize(
+    "uri, mode, allow_empty, valid",
+    [
+        ("io.xconn.test", util.URI_CHECK_LOOSE, False, True),
+        ("io.xconn.Test-1", util.URI_CHECK_LOOSE, False, True),
+        ("io.xconn.Test-1", util.URI_CHECK_STRICT, False, False),
+        ("io..test", util.URI_CHECK_LOOSE, False, False),
+        ("io..test", util.URI_CHECK_LOOSE, True, True),
+        ("io..test", util.URI_CHECK_STRICT, True, True),
+        ("io.xconn#test", util.URI_CHECK_LOOSE, True, False),
+        ("io.xconn test", util.URI_CHECK_LOOSE, False, False),
+        ("", util.URI_CHECK_LOOSE, False, False),
+    ],
+)
+def test_is_valid_uri(uri, mode, allow_empty, valid):
+    assert util.is_valid_uri(uri, mode, allow_empty) == valid
+
+
+def test_validate_uri_or_raise_with_invalid_uri():
+    error_message = "error"
+    with pytest.raises(exceptions.InvalidUriError) as exc_info:
+        util.validate_uri_or_raise("io..test", error_message)
+
+    assert str(exc_info.value) == f"invalid uri 'io..test' for {error_message}"
+
+    assert util.validate_uri_or_raise("io..test", error_message, allow_empty=True) == "io..test"
+
+    with pytest.raises(exceptions.InvalidUriError):
+        util.validate_procedure_or_raise("io.xconn.Echo", error_message, util.URI_CHECK_STRICT)
+
+
 def test_validate_procedure_or_raise_with_invalid_uri_type():
     error_message = "error"
     with pytest.raises(exceptions.InvalidUriError) as exc_info:
@@ -0,0 +1,182 @@
+from wampproto import messages, meta, uris
+from wampproto.broker import Broker
+from wampproto.dealer import Dealer
+from wampproto.types import SessionDetails
+
+
+def call(meta_api: meta.MetaAPI, procedure: str, args: list | None = None) -> messages.Message:
+    message = messages.Call(messages.CallFields(1, procedure, args=args))
+    return meta_api.receive_call(1, message).message
+
+
+def setup_router() -> tuple[Broker, Dealer, meta.MetaAPI]:
+    broker = Broker()
+    dealer = Dealer()
+    for session_id, authrole in ((1, "user"), (2, "user"), (3, "admin")):
+        details = SessionDetails(session_id, "realm1", "authid", authrole)
+        broker.add_session(details)
+        dealer.add_session(details)
+
+    return broker, dealer, meta.MetaAPI(broker, dealer)
+
+
+def test_session_count():
+    broker, _, meta_api = setup_router()
+
+    assert call(meta_api, meta.SESSION_COUNT).args == [3]
+    assert call(meta_api, meta.SESSION_COUNT, [["user"]]).args == [2]
+    assert call(meta_api, meta.SESSION_COUNT, [["admin", "guest"]]).args == [1]
+
+    broker.remove_session(3)
+    assert call(meta_api, meta.SESSION_COUNT, [["admin"]]).args == [0]
+    assert broker.sessions_by_authrole == {"user": 2}
+
+
+def test_subscription_meta_procedures():
+    broker, _, meta_api = setup_router()
+    topic = "io.xconn.test"
+
+    assert call(meta_api, meta.SUBSCRIPTION_LOOKUP, [topic]).args == [None]
+    assert call(meta_api, meta.SUBSCRIPTION_MATCH, [topic]).args == [None]
+
+    broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(1, topic)))
+    broker.receive_message(2, messages.Subscribe(messages.SubscribeFields(1, topic)))
+    subscription_id = broker.lookup_subscription(topic)
+
+    assert call(meta_api, meta.SUBSCRIPTION_LIST).args == [{"exact": [subscription_id], "prefix": [], "wildcard": []}]
+    assert call(meta_api, meta.SUBSCRIPTION_LOOKUP, [topic]).args == [subscription_id]
+    assert call(meta_api, meta.SUBSCRIPTION_LOOKUP, [topic, {"match": "prefix"}]).args == [None]
+    assert call(meta_api, meta.SUBSCRIPTION_MATCH, [topic]).args == [[subscription_id]]
+    assert call(meta_api, meta.SUBSCRIPTION_GET, [subscription_id]).args == [
+        {"id": subscription_id, "uri": topic, "match": "exact"}
+    ]
+    assert call(meta_api, meta.SUBSCRIPTION_LIST_SUBSCRIBERS, [subscription_id]).args == [[1, 2]]
+    assert call(meta_api, meta.SUBSCRIPTION_COUNT_SUBSCRIBERS, [subscription_id]).args == [2]
+
+    broker.remove_session(1)
+    assert call(meta_api, meta.SUBSCRIPTION_COUNT_SUBSCRIBERS, [subscription_id]).args == [1]
+
+    broker.receive_message(2, messages.Unsubscribe(messages.UnsubscribeFields(2, subscription_id)))
+    assert broker.get_subscription(subscription_id) is None
+
+    err = call(meta_api, meta.SUBSCRIPTION_COUNT_SUBSCRIBERS, [subscription_id])
+    assert isinstance(err, messages.Error)
+    assert err.uri == uris.NO_SUCH_SUBSCRIPTION
+
+
+def test_registration_meta_procedures():
+    _, dealer, meta_api = setup_router()
+    procedure = "io.xconn.test"
+
+    dealer.receive_message(1, messages.Register(messages.RegisterFields(1, procedure)))
+    registration_id = dealer.lookup_registration(procedure)
+
+    assert call(meta_api, meta.REGISTRATION_LIST).args == [{"exact": [registration_id], "prefix": [], "wildcard": []}]
+    assert call(meta_api, meta.REGISTRATION_LOOKUP, [procedure]).args == [registration_id]
+    assert call(meta_api, meta.REGISTRATION_MATCH, [procedure]).args == [registration_id]
+    assert call(meta_api, meta.REGISTRATION_GET, [registration_id]).args == [
+        {"id": registration_id, "uri": procedure, "match": "exact", "invoke": "single"}
+    ]
+    assert call(meta_api, meta.REGISTRATION_LIST_CALLEES, [registration_id]).args == [[1]]
+    assert call(meta_api, meta.REGISTRATION_COUNT_CALLEES, [registration_id]).args == [1]
+
+    dealer.remove_session(1)
+    assert dealer.get_registration(registration_id) is None
+
+    err = call(meta_api, meta.REGISTRATION_GET, [registration_id])
+    assert isinstance(err, messages.Error)
+    assert err.uri == uris.NO_SUCH_REGISTRATION
+
+
+def test_invalid_meta_call():
+    _, _, meta_api = setup_router()
+
+    assert meta_api.has_procedure(meta.SUBSCRIPTION_LIST)
+    assert not meta_api.has_procedure("io.xconn.test")
+
+    err = call(meta_api, "io.xconn.test")
+    assert isinstance(err, messages.Error)
+    assert err.uri == uris.NO_SUCH_PROCEDURE
+
+    err = call(meta_api, meta.SUBSCRIPTION_GET)
+    assert isinstance(err, messages.Error)
+    assert err.uri == uris.INVALID_ARGUMENT
+
+    err = call(meta_api, meta.SUBSCRIPTION_GET, ["1"])
+    assert isinstance(err, messages.Error)
+    assert err.uri == uris.INVALID_ARGUMENT
+
+
+def test_meta_events():
+    meta_events = meta.MetaEventQueue()
+    broker = Broker(meta_events)
+    dealer = Dealer(meta_events)
+    broker.add_session(SessionDetails(1, "realm1", "authid", "authrole"))
+    dealer.add_session(SessionDetails(1, "realm1", "authid", "authrole"))
+
+    # session 1 watches joins and registrations
+    broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(1, meta.SESSION_ON_JOIN)))
+    broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(2, meta.REGISTRATION_ON_REGISTER)))
+    broker.flush_meta_events()
+
+    broker.add_session(SessionDetails(2, "realm1", "foo", "user"))
+    dealer.add_session(SessionDetails(2, "realm1", "foo", "user"))
+    dealer.receive_message(2, messages.Register(messages.RegisterFields(1, "io.xconn.test")))
+    assert meta_events.pending() == 3
+
+    publications = broker.flush_meta_events()
+    assert meta_events.pending() == 0
+    assert len(publications) == 2
+
+    on_join, on_register = publications
+    assert on_join.recipients == (1,)
+    assert on_join.event.args == [{"session": 2, "realm": "realm1", "authid": "foo", "authrole": "user"}]
+    assert on_register.event.args == [2, dealer.lookup_registration("io.xconn.test")]
+    assert on_register.event.details == {}
+
+
+def test_meta_events_batched():
+    meta_events = meta.MetaEventQueue(batch=True)
+    broker = Broker(meta_events)
+    broker.add_session(SessionDetails(1, "realm1", "authid", "authrole"))
+    broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(1, meta.SESSION_ON_LEAVE)))
+    broker.flush_meta_events()
+
+    for session_id in range(2, 12):
+        broker.add_session(SessionDetails(session_id, "realm1", "authid", "authrole"))
+        broker.remove_session(session_id)
+
+    # 10 joins and 10 leaves are coalesced into one event per topic
+    assert meta_events.pending() == 2
+
+    publications = broker.flush_meta_events()
+    assert len(publications) == 1
+
+    event = publications[0].event
+    assert event.details == {meta.DETAIL_BATCHED: True}
+    assert event.args == [[session_id, "authid", "authrole"] for session_id in range(2, 12)]
+
+
+def test_meta_events_batched_order():
+    meta_events = meta.MetaEventQueue(batch=True)
+    meta_events.emit(meta.SESSION_ON_JOIN, [1])
+    meta_events.emit(meta.SUBSCRIPTION_ON_SUBSCRIBE, [1, 10])
+    meta_events.emit(meta.SESSION_ON_JOIN, [2])
+    meta_events.emit(meta.SESSION_ON_LEAVE, [1])
+
+    # batches in order of their first event, events in arrival order within a batch
+    assert [(event.topic, event.args) for event in meta_events.pop()] == [
+        (meta.SESSION_ON_JOIN, [[1], [2]]),
+        (meta.SUBSCRIPTION_ON_SUBSCRIBE, [[1, 10]]),
+        (meta.SESSION_ON_LEAVE, [[1]]),
+    ]
+
+    meta_events = meta.MetaEventQueue()
+    meta_events.emit(meta.SESSION_ON_JOIN, [1])
+    meta_events.emit(meta.SUBSCRIPTION_ON_SUBSCRIBE, [1, 10])
+    meta_events.emit(meta.SESSION_ON_JOIN, [2])
+    assert [event.topic for event in meta_events.pop()] == [
+        meta.SESSION_ON_JOIN,
+        meta.SUBSCRIPTION_ON_SUBSCRIBE,
+        meta.SESSION_ON_JOIN,
+    ]
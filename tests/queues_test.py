@@ -0,0 +1,145 @@
+import pytest
+
+from wampproto import WAMPSession, messages, queues, serializers
+from wampproto.transports import rawsocket, websocket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_thresholds():
+    clock = Clock()
+    queue = queues.OutboundQueue(max_bytes=10, max_count=3, max_delay=0.5, now=clock)
+    assert queue.deadline() is None
+    assert not queue.due()
+
+    assert not queue.push(b"ab")
+    assert queue.deadline() == 0.5
+    assert not queue.push(b"cd")
+    assert queue.push(b"ef")
+    assert queue.due()
+    assert queue.flush() == [b"ab", b"cd", b"ef"]
+    assert len(queue) == 0
+    assert queue.deadline() is None
+
+    assert queue.push(b"x" * 10)
+    queue.flush()
+
+    clock.now = 1
+    queue.push(b"a")
+    clock.now = 1.4
+    assert not queue.due()
+    clock.now = 1.5
+    assert queue.due()
+
+    with pytest.raises(ValueError):
+        queues.OutboundQueue(max_count=0)
+
+
+def test_session_queue():
+    serializer = serializers.MsgPackSerializer()
+    session = WAMPSession(serializer, outbound=queues.OutboundQueue(max_count=2, framer=rawsocket.frame_many))
+    assert session.flush() == []
+
+    first = messages.Subscribe(messages.SubscribeFields(1, "io.xconn.a"))
+    second = messages.Subscribe(messages.SubscribeFields(2, "io.xconn.b"))
+    assert not session.enqueue_message(first)
+    assert session.enqueue_message(second)
+
+    buffers = session.flush()
+    assert len(buffers) == 4
+    assert serializer.deserialize(buffers[3]).topic == "io.xconn.b"
+    assert rawsocket.MessageHeader.from_bytes(buffers[2]).length == len(buffers[3])
+
+    with pytest.raises(ValueError):
+        WAMPSession(serializer).enqueue_message(first)
+
+
+def test_queue_counts_encoded_bytes():
+    queue = queues.OutboundQueue(max_bytes=8)
+    assert not queue.push("abc")
+    assert queue.size == 3
+
+    # "äöü" is 3 characters but 6 bytes on the wire
+    assert queue.push("äöü")
+    assert queue.size == 9
+
+
+def test_session_queue_json():
+    serializer = serializers.JSONSerializer()
+    subscribe = messages.Subscribe(messages.SubscribeFields(1, "io.xconn.grüße"))
+
+    session = WAMPSession(serializer, outbound=queues.OutboundQueue(framer=rawsocket.frame_many))
+    session.enqueue_message(subscribe)
+    header, payload = session.flush()
+    assert rawsocket.MessageHeader.from_bytes(header).length == len(payload)
+    assert serializer.deserialize(payload.decode()).topic == "io.xconn.grüße"
+
+    session = WAMPSession(serializer, outbound=queues.OutboundQueue(framer=websocket.frame_many))
+    session.enqueue_message(subscribe)
+    (frame,) = websocket.FrameDecoder().feed(b"".join(session.flush()))
+    assert frame.opcode == websocket.OPCODE_TEXT
+    assert serializer.deserialize(frame.payload).topic == "io.xconn.grüße"
+
+
+def event(subscription_id: int, publication_id: int) -> messages.Event:
+    return messages.Event(messages.EventFields(subscription_id, publication_id))
+
+
+def publication_ids(events: list[messages.Event]) -> list[int]:
+    return [e.publication_id for e in events]
+
+
+@pytest.mark.parametrize(
+    "policy, expected, overflowed",
+    [
+        (queues.POLICY_DROP_OLDEST, [2, 3, 4], False),
+        (queues.POLICY_DROP_NEWEST, [1, 2, 3], False),
+        (queues.POLICY_DISCONNECT, [1, 2, 3], True),
+        # the event of subscription 1 is replaced in place by the latest one
+        (queues.POLICY_CONFLATE, [4, 2, 3], False),
+    ],
+)
+def test_subscriber_queue_policies(policy: str, expected: list[int], overflowed: bool):
+    queue = queues.SubscriberQueue(3, policy)
+    assert queue.push(event(1, 1))
+    assert queue.push(event(2, 2))
+    assert queue.push(event(3, 3))
+    assert not queue.push(event(1, 4))
+
+    assert queue.dropped == 1
+    assert queue.overflowed == overflowed
+    assert publication_ids(queue.pop()) == expected
+    assert len(queue) == 0
+
+
+def test_subscriber_queue_conflate_without_match():
+    queue = queues.SubscriberQueue(2, queues.POLICY_CONFLATE)
+    queue.push(event(1, 1))
+    queue.push(event(2, 2))
+    queue.push(event(3, 3))
+    queue.push(event(3, 4))
+
+    assert publication_ids(queue.pop(1)) == [2]
+    assert publication_ids(queue.pop()) == [4]
+
+    with pytest.raises(ValueError):
+        queues.SubscriberQueue(2, "unknown")
+
+
+def test_subscriber_queue_conflation_keys():
+    queue = queues.SubscriberQueue(2, queues.POLICY_CONFLATE)
+    queue.push(event(1, 1), conflation_key=(1, "a"))
+    queue.push(event(1, 2), conflation_key=(1, "b"))
+    assert queue.push(event(1, 3), conflation_key=(1, "a"))
+    assert queue.conflated == 1
+
+    # overflow replaces the latest pending event of the subscription along with its key
+    assert not queue.push(event(1, 4), conflation_key=(1, "c"))
+    assert queue.push(event(1, 5), conflation_key=(1, "c"))
+    assert publication_ids(queue.pop()) == [3, 5]
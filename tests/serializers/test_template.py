@@ -0,0 +1,62 @@
+import pytest
+
+from wampproto import acceptor, messages
+from wampproto.acceptor import ROUTER_ROLES
+from wampproto.serializers.cbor import CBORSerializer
+from wampproto.serializers.json import JSONSerializer
+from wampproto.serializers.msgpack import MsgPackSerializer
+from wampproto.serializers import template
+from wampproto.serializers.serializer import Serializer
+from wampproto.serializers.template import get_handshake_templates
+
+WELCOMES = [
+    messages.Welcome(messages.WelcomeFields(1, ROUTER_ROLES)),
+    messages.Welcome(messages.WelcomeFields(2, ROUTER_ROLES, "foo", "anonymous", "anonymous")),
+    messages.Welcome(messages.WelcomeFields(3, ROUTER_ROLES, "foo", "user", "ticket", {})),
+    messages.Welcome(messages.WelcomeFields(1 << 53, ROUTER_ROLES, "föö", "user", "wampcra", {"x": [1, "ü"]})),
+]
+
+CHALLENGES = [
+    messages.Challenge(messages.ChallengeFields("ticket", {})),
+    messages.Challenge(messages.ChallengeFields("cryptosign", {"challenge": "ab" * 32})),
+]
+
+
+@pytest.mark.parametrize("serializer", [JSONSerializer(), MsgPackSerializer(), CBORSerializer()])
+def test_templates_match_serializer(serializer: Serializer):
+    templates = get_handshake_templates(serializer, ROUTER_ROLES)
+    assert templates is not None
+
+    # render twice so cached encodings are checked as well
+    for msg in (WELCOMES + CHALLENGES) * 2:
+        assert templates.render(msg) == serializer.serialize(msg)
+
+    assert templates.render(messages.Goodbye(messages.GoodbyeFields({}, "wamp.close.close_realm"))) is None
+
+
+def test_templates_unsupported_serializer():
+    class CustomSerializer(JSONSerializer):
+        pass
+
+    assert get_handshake_templates(CustomSerializer(), ROUTER_ROLES) is None
+
+
+@pytest.mark.parametrize("serializer", [JSONSerializer(), MsgPackSerializer(), CBORSerializer()])
+def test_acceptor_templates(serializer: Serializer, monkeypatch):
+    roles = {"broker": {"features": {}}}
+    templates = get_handshake_templates(serializer, roles)
+    acceptor.Acceptor(serializer)
+
+    # the roles are encoded once per router, not per connection
+    def encode(*args, **kwargs):
+        raise AssertionError("roles encoded per connection")
+
+    monkeypatch.setattr(template, "get_handshake_templates", encode)
+    monkeypatch.setattr(acceptor, "get_handshake_templates", encode)
+    hello = messages.Hello(messages.HelloFields("realm1", {"caller": {}}))
+    for roles_, templates_ in ((roles, templates), (None, None)):
+        for _ in range(2):
+            accept = acceptor.Acceptor(serializer, roles=roles_, templates=templates_)
+            assert accept._templates is not None
+            welcome = accept.receive_message(hello)
+            assert accept._serialize(welcome) == serializer.serialize(welcome)
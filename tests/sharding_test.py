@@ -0,0 +1,167 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from wampproto import idgen, messages, sharding
+from wampproto.sharding import ShardedBroker, ShardedDealer
+from wampproto.types import SessionDetails
+
+
+def test_default_shards(monkeypatch):
+    monkeypatch.setattr(sys, "_is_gil_enabled", lambda: True, raising=False)
+    assert sharding.default_shards() == 1
+    assert ShardedBroker().shards == 1
+
+    monkeypatch.setattr(sys, "_is_gil_enabled", lambda: False, raising=False)
+    monkeypatch.setattr(sharding.os, "cpu_count", lambda: 8)
+    assert sharding.default_shards() == 8
+
+    with pytest.raises(ValueError):
+        ShardedDealer(shards=0)
+
+
+def test_sharded_broker():
+    broker = ShardedBroker(shards=4)
+    for session_id in (1, 2):
+        broker.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+
+    topics = [f"io.xconn.topic{i}" for i in range(16)]
+    for request_id, topic in enumerate(topics, 1):
+        subscribed = broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(request_id, topic)))
+        subscription_id = subscribed.message.subscription_id
+        # the subscription ID tells which shard owns the topic
+        assert broker.shard_for_id(subscription_id) == broker.shard_for_topic(topic)
+        assert broker.lookup_subscription(topic) == subscription_id
+
+    assert len(set(broker.list_subscriptions())) == len(topics)
+
+    publication = broker.receive_publish(2, messages.Publish(messages.PublishFields(1, topics[3], args=[1])))
+    assert publication.recipients == (1,)
+    assert publication.event.subscription_id == broker.lookup_subscription(topics[3])
+
+    subscription_id = broker.lookup_subscription(topics[5])
+    broker.receive_message(1, messages.Unsubscribe(messages.UnsubscribeFields(1, subscription_id)))
+    assert not broker.has_subscription(topics[5])
+
+    broker.remove_session(1)
+    assert broker.list_subscriptions() == []
+
+    with pytest.raises(ValueError):
+        broker.receive_message(1, messages.Publish(messages.PublishFields(1, topics[0])))
+
+
+def test_sharded_dealer():
+    dealer = ShardedDealer(shards=4)
+    for session_id in (1, 2):
+        dealer.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+
+    procedures = [f"io.xconn.procedure{i}" for i in range(8)]
+    for request_id, procedure in enumerate(procedures, 1):
+        dealer.receive_message(1, messages.Register(messages.RegisterFields(request_id, procedure)))
+
+    assert len(dealer.list_registrations()) == len(procedures)
+
+    for request_id, procedure in enumerate(procedures, 1):
+        invocation = dealer.receive_message(2, messages.Call(messages.CallFields(request_id, procedure, args=[1])))
+        assert invocation.recipient == 1
+
+        result = dealer.receive_message(1, messages.Yield(messages.YieldFields(invocation.message.request_id)))
+        assert result.recipient == 2
+        assert result.message.request_id == request_id
+
+    invocation = dealer.receive_message(2, messages.Call(messages.CallFields(9, procedures[0])))
+    error = messages.Error(
+        messages.ErrorFields(messages.Invocation.TYPE, invocation.message.request_id, "io.xconn.error")
+    )
+    assert dealer.receive_message(1, error).recipient == 2
+
+    registration_id = dealer.lookup_registration(procedures[1])
+    dealer.receive_message(1, messages.Unregister(messages.UnregisterFields(1, registration_id)))
+    assert not dealer.has_registration(procedures[1])
+    assert dealer.get_registration(registration_id) is None
+
+
+def test_sharded_broker_concurrent_publishes():
+    broker = ShardedBroker(shards=4)
+    broker.add_session(SessionDetails(1, "realm", "authid", "authrole"))
+    topics = [f"io.xconn.topic{i}" for i in range(8)]
+    for request_id, topic in enumerate(topics, 1):
+        broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(request_id, topic)))
+
+    delivered = []
+
+    def publish(topic: str):
+        for request_id in range(200):
+            publication = broker.receive_publish(1, messages.Publish(messages.PublishFields(request_id, topic)))
+            delivered.append(len(publication.recipients))
+
+    threads = [threading.Thread(target=publish, args=(topic,)) for topic in topics]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert delivered == [1] * len(topics) * 200
+
+
+class SlowIDGenerator(idgen.ShardScopeIDGenerator):
+    # gives up the GIL between the broker's lookup of a topic and storing its new subscription,
+    # so concurrent subscribes to the same topic race unless the shard lock serializes them
+    def next(self) -> int:
+        time.sleep(0.0005)
+        return super().next()
+
+
+def test_sharded_broker_concurrent_same_shard():
+    broker = ShardedBroker(shards=2)
+    shard = broker._shards[0]
+    shard.idgen = SlowIDGenerator(0, 2)
+
+    # all topics of one shard, so every thread contends for the same lock
+    topics = [topic for topic in (f"io.xconn.topic{i}" for i in range(32)) if broker.shard_for_topic(topic) == 0][:2]
+    sessions = range(1, 9)
+    for session_id in sessions:
+        broker.add_session(SessionDetails(session_id, "realm", "authid", "authrole"))
+
+    errors = []
+    # lines the threads up so they all subscribe, publish and unsubscribe on the same topic at once
+    barrier = threading.Barrier(len(sessions), timeout=10)
+
+    def churn(session_id: int):
+        try:
+            for i in range(10):
+                topic = topics[i % len(topics)]
+                barrier.wait()
+                subscribed = broker.receive_message(session_id, messages.Subscribe(messages.SubscribeFields(i, topic)))
+                subscription_id = subscribed.message.subscription_id
+                barrier.wait()
+
+                # all sessions must have joined the one subscription of the topic
+                assert broker.lookup_subscription(topic) == subscription_id
+                assert broker.count_subscribers(subscription_id) == len(sessions)
+                publication = broker.receive_publish(session_id, messages.Publish(messages.PublishFields(i, topic)))
+                assert sorted(publication.recipients) == list(sessions)
+                barrier.wait()
+
+                unsubscribe = messages.Unsubscribe(messages.UnsubscribeFields(i, subscription_id))
+                broker.receive_message(session_id, unsubscribe)
+        except Exception as e:
+            errors.append(e)
+            barrier.abort()
+
+    threads = [threading.Thread(target=churn, args=(session_id,)) for session_id in sessions]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # every session unsubscribed again, so no subscription may be left behind in any index
+    assert shard.subscriptions_by_topic == {}
+    assert shard.subscriptions_by_id == {}
+    assert all(subscriptions == {} for subscriptions in shard.subscriptions_by_session.values())
+    assert broker.list_subscriptions() == []
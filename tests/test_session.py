@@ -261,3 +261,24 @@ def test_exceptions():
         session.receive_message(messages.Error(messages.ErrorFields(messages.Publish.TYPE, 100, uris.INVALID_ARGUMENT)))
 
     assert str(exc.value) == f"received {messages.Error.TEXT} for invalid publish request"
+
+
+def test_progressive_results(session: WAMPSession):
+    session.send_message(messages.Call(messages.CallFields(1, "foo.bar", options={"receive_progress": True})))
+
+    for _ in range(3):
+        progress = messages.Result(messages.ResultFields(1, details={"progress": True}))
+        assert session.receive_message(progress) == progress
+
+    session.receive_message(messages.Result(messages.ResultFields(1)))
+    with pytest.raises(ValueError):
+        session.receive_message(messages.Result(messages.ResultFields(1)))
+
+
+def test_progressive_yields(session: WAMPSession, register_procedure):
+    session.receive_message(messages.Invocation(messages.InvocationFields(5, 1)))
+
+    session.send_message(messages.Yield(messages.YieldFields(5, options={"progress": True})))
+    session.send_message(messages.Yield(messages.YieldFields(5)))
+    with pytest.raises(ValueError):
+        session.send_message(messages.Yield(messages.YieldFields(5)))
@@ -0,0 +1,93 @@
+import json
+import zlib
+
+import pytest
+
+from wampproto import messages, serializers
+from wampproto.transports import compression, websocket
+
+LARGE_EVENT = messages.Event(
+    messages.EventFields(1, 2, kwargs={"rows": [{"id": i, "name": f"item-{i}", "value": i * 1.5} for i in range(2000)]})
+)
+
+
+def test_deflate_roundtrip():
+    compressor = compression.DeflateCompressor()
+    decompressor = compression.DeflateDecompressor()
+    data = json.dumps(LARGE_EVENT.marshal()).encode()
+
+    for _ in range(3):
+        compressed = compressor.compress(data)
+        assert len(compressed) < len(data) // 4
+        assert decompressor.decompress(compressed) == data
+
+    # without context takeover every message can be decompressed on its own
+    compressor = compression.DeflateCompressor(context_takeover=False)
+    first, second = compressor.compress(data), compressor.compress(data)
+    assert first == second
+    assert compression.DeflateDecompressor(context_takeover=False).decompress(second) == data
+
+
+def test_decompress_limit():
+    compressed = compression.DeflateCompressor().compress(b"\x00" * 100_000)
+    with pytest.raises(ValueError):
+        compression.DeflateDecompressor(max_size=10_000).decompress(compressed)
+
+
+def test_permessage_deflate_negotiation():
+    offer = compression.PerMessageDeflate.offer()
+    header = f"x-webkit-deflate-frame, {offer}; {compression.SERVER_NO_CONTEXT_TAKEOVER}"
+
+    response, server = compression.PerMessageDeflate.accept(header)
+    assert response == "permessage-deflate; server_no_context_takeover"
+    client = compression.PerMessageDeflate.from_response(response)
+
+    assert compression.PerMessageDeflate.accept("x-webkit-deflate-frame") is None
+    assert compression.PerMessageDeflate.accept("permessage-deflate; server_max_window_bits=8") is None
+    with pytest.raises(ValueError):
+        compression.PerMessageDeflate.from_response("")
+
+    serializer = serializers.JSONSerializer()
+    server_decoder = websocket.FrameDecoder(expect_masked=True, allow_rsv1=True)
+    client_decoder = websocket.FrameDecoder(expect_masked=False, allow_rsv1=True)
+
+    data = serializer.serialize(LARGE_EVENT)
+    for _ in range(2):
+        (frame,) = client_decoder.feed(server.encode(data))
+        assert frame.rsv1
+        assert client.decode(frame).payload == data
+
+    # small messages are sent uncompressed
+    goodbye = serializer.serialize(messages.Goodbye(messages.GoodbyeFields({}, "wamp.close.close_realm")))
+    (frame,) = server_decoder.feed(client.encode(goodbye))
+    assert not frame.rsv1
+    assert server.decode(frame).payload == goodbye
+
+    with pytest.raises(ValueError):
+        websocket.FrameDecoder().feed(server.encode(data))
+
+
+@pytest.mark.parametrize("serializer", [serializers.JSONSerializer(), serializers.MsgPackSerializer()])
+def test_rawsocket_compression(serializer: serializers.Serializer):
+    sender = compression.RawSocketCompression()
+    receiver = compression.RawSocketCompression()
+
+    publish = messages.Publish(messages.PublishFields(1, "io.xconn.test", kwargs={"value": 1, "name": "x" * 300}))
+    for msg in (LARGE_EVENT, publish, messages.Published(messages.PublishedFields(1, 2))):
+        data = serializer.serialize(msg)
+        encoded = sender.encode(data)
+        raw = data.encode() if isinstance(data, str) else data
+        assert receiver.decode(encoded) == raw
+
+    with pytest.raises(ValueError):
+        receiver.decode(b"\x07abc")
+
+
+def test_dictionary_helps_small_messages():
+    data = json.dumps(messages.Publish(messages.PublishFields(1, "io.xconn.test", args=[1])).marshal()).encode()
+    data += b', {"acknowledge": true}'
+
+    with_dictionary = compression.DeflateCompressor(zdict=compression.WAMP_DICTIONARY).compress(data)
+    without_dictionary = compression.DeflateCompressor().compress(data)
+    assert len(with_dictionary) < len(without_dictionary)
+    assert zlib.decompressobj(-15, zdict=compression.WAMP_DICTIONARY).decompress(with_dictionary) == data
@@ -0,0 +1,115 @@
+import pytest
+
+from wampproto.transports import keepalive, rawsocket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def split(frame: bytes) -> tuple[int, bytes]:
+    header = rawsocket.MessageHeader.from_bytes(frame[:4])
+    assert header.length == len(frame) - 4
+    return header.kind, frame[4:]
+
+
+def test_ping_pong():
+    clock = Clock()
+    client = keepalive.KeepAlive(interval=30, timeout=10, now=clock)
+    server = keepalive.KeepAlive(interval=30, timeout=10, now=clock)
+
+    assert client.poll() is None
+    assert client.next_deadline() == 30
+
+    clock.now = 30
+    ping = client.poll()
+    kind, payload = split(ping)
+    assert kind == rawsocket.MSG_TYPE_PING
+    assert client.poll() is None
+    assert client.next_deadline() == 40
+
+    pong = server.receive(kind, payload)
+    assert split(pong) == (rawsocket.MSG_TYPE_PONG, payload)
+
+    clock.now = 30.002
+    assert client.receive(*split(pong)) is None
+    assert client.rtt.count == 1
+    assert client.rtt.mean == pytest.approx(0.002)
+    assert not client.is_dead()
+    assert client.next_deadline() == pytest.approx(60.002)
+
+
+def test_dead_peer():
+    clock = Clock()
+    client = keepalive.KeepAlive(interval=5, timeout=2, now=clock)
+
+    clock.now = 5
+    client.poll()
+
+    clock.now = 6.9
+    assert not client.is_dead()
+
+    clock.now = 7
+    assert client.is_dead()
+    assert client.rtt.count == 0
+
+
+def test_traffic_while_awaiting_pong():
+    clock = Clock()
+    client = keepalive.KeepAlive(interval=5, timeout=2, now=clock)
+
+    clock.now = 5
+    _, payload = split(client.poll())
+
+    # the peer is busy sending data, its PONG is queued behind it
+    clock.now = 6
+    client.receive(rawsocket.MSG_TYPE_WAMP, b"[36, 1, 2, {}]")
+    clock.now = 8
+    assert not client.is_dead()
+    assert client.next_deadline() == 11
+
+    # a pong for another ping doesn't yield an RTT
+    client.receive(rawsocket.MSG_TYPE_PONG, keepalive.PING_PAYLOAD.pack(42))
+    assert client.rtt.count == 0
+
+    clock.now = 8.5
+    client.receive(rawsocket.MSG_TYPE_PONG, payload)
+    assert client.rtt.count == 1
+    assert client.rtt.mean == pytest.approx(3.5)
+
+    # once idle again, the next ping has to be answered in time
+    clock.now = 13.5
+    assert client.poll() is not None
+    clock.now = 15.5
+    assert client.is_dead()
+
+
+def test_traffic_postpones_ping():
+    clock = Clock()
+    client = keepalive.KeepAlive(interval=5, timeout=2, now=clock)
+
+    clock.now = 4
+    client.touch()
+    clock.now = 5
+    assert client.poll() is None
+    assert client.next_deadline() == 9
+
+
+def test_histogram():
+    histogram = keepalive.RTTHistogram()
+    assert histogram.percentile(50) == 0.0
+
+    for rtt in (0.001, 0.001, 0.001, 0.1):
+        histogram.record(rtt)
+
+    assert histogram.count == 4
+    assert histogram.min == 0.001
+    assert histogram.max == 0.1
+    assert sum(histogram.buckets()) == 4
+    # 1 ms falls into the [512 us, 1024 us) bucket
+    assert histogram.percentile(50) == pytest.approx(0.001024)
+    assert histogram.percentile(99) == 0.1
@@ -0,0 +1,118 @@
+import pytest
+
+from wampproto import serializers
+from wampproto.transports import rawsocket
+
+
+def test_handshake():
+    data = rawsocket.send_handshake(
+        rawsocket.Handshake(rawsocket.SERIALIZER_TYPE_CBOR, rawsocket.PROTOCOL_MAX_MSG_SIZE)
+    )
+    assert data == b"\x7f\xf3\x00\x00"
+
+    hs = rawsocket.receive_handshake(data)
+    assert hs.protocol == rawsocket.SERIALIZER_TYPE_CBOR
+    assert hs.max_msg_size == rawsocket.PROTOCOL_MAX_MSG_SIZE
+
+    with pytest.raises(ValueError):
+        rawsocket.send_handshake(
+            rawsocket.Handshake(rawsocket.SERIALIZER_TYPE_JSON, rawsocket.PROTOCOL_MAX_MSG_SIZE * 2)
+        )
+
+    with pytest.raises(ValueError):
+        rawsocket.send_handshake(rawsocket.Handshake(7, rawsocket.DEFAULT_MAX_MSG_SIZE))
+
+    # either reserved byte being set is an error
+    with pytest.raises(rawsocket.HandshakeError) as e:
+        rawsocket.receive_handshake(b"\x7f\xf1\x00\x01")
+    assert e.value.code == rawsocket.ERROR_RESERVED_BITS_USED
+
+
+def test_handshaker():
+    client = rawsocket.ClientHandshaker(rawsocket.SERIALIZER_TYPE_MSGPACK, 2**16)
+    server = rawsocket.ServerHandshaker(max_msg_size=2**20)
+
+    reply, ok = server.receive(client.send())
+    assert ok
+    assert isinstance(server.serializer, serializers.MsgPackSerializer)
+    assert server.peer_max_msg_size == 2**16
+
+    assert isinstance(client.receive(reply), serializers.MsgPackSerializer)
+    assert client.serializer is not None
+    assert client.peer_max_msg_size == 2**20
+
+
+@pytest.mark.parametrize(
+    "server, client, connections, code",
+    [
+        (
+            rawsocket.ServerHandshaker([rawsocket.SERIALIZER_TYPE_CBOR]),
+            rawsocket.ClientHandshaker(rawsocket.SERIALIZER_TYPE_JSON),
+            0,
+            rawsocket.ERROR_SERIALIZER_UNSUPPORTED,
+        ),
+        (
+            rawsocket.ServerHandshaker(min_peer_msg_size=2**16),
+            rawsocket.ClientHandshaker(max_msg_size=2**10),
+            0,
+            rawsocket.ERROR_MAX_MSG_SIZE_UNACCEPTABLE,
+        ),
+        (
+            rawsocket.ServerHandshaker(max_connections=10),
+            rawsocket.ClientHandshaker(),
+            10,
+            rawsocket.ERROR_MAX_CONNECTION_COUNT_REACHED,
+        ),
+    ],
+)
+def test_handshaker_errors(
+    server: rawsocket.ServerHandshaker, client: rawsocket.ClientHandshaker, connections: int, code: int
+):
+    reply, ok = server.receive(client.send(), connections)
+    assert not ok
+    assert server.serializer is None
+
+    with pytest.raises(rawsocket.HandshakeError) as e:
+        client.receive(reply)
+    assert e.value.code == code
+
+
+@pytest.mark.parametrize(
+    "data, code",
+    [
+        (b"\x7e\xf1\x00\x00", rawsocket.ERROR_RESERVED_BITS_USED),
+        (b"\x7f\xf1\x00", rawsocket.ERROR_RESERVED_BITS_USED),
+        (b"\x7f\xf1\x01\x00", rawsocket.ERROR_RESERVED_BITS_USED),
+        (b"\x7f\xf1\x00\x01", rawsocket.ERROR_RESERVED_BITS_USED),
+        # a zero serializer is not a valid request, even though a server uses it for errors
+        (b"\x7f\x20\x00\x00", rawsocket.ERROR_SERIALIZER_UNSUPPORTED),
+        (b"\x7f\xf9\x00\x00", rawsocket.ERROR_SERIALIZER_UNSUPPORTED),
+        (b"\x7f\x01\x00\x00", rawsocket.ERROR_MAX_MSG_SIZE_UNACCEPTABLE),
+    ],
+)
+def test_server_handshaker_rejects(data: bytes, code: int):
+    server = rawsocket.ServerHandshaker(min_peer_msg_size=2**10)
+    reply, ok = server.receive(data)
+
+    assert not ok
+    assert reply == bytes((rawsocket.MAGIC, code << 4, 0, 0))
+    assert server.serializer is None
+
+
+def test_message_header():
+    header = rawsocket.MessageHeader(rawsocket.MSG_TYPE_PING, 0x123456)
+    assert header.to_bytes() == b"\x01\x12\x34\x56"
+
+    header = rawsocket.MessageHeader.from_bytes(b"\x02\xff\xff\xff")
+    assert header.kind == rawsocket.MSG_TYPE_PONG
+    assert header.length == rawsocket.PROTOCOL_MAX_MSG_SIZE - 1
+
+    with pytest.raises(ValueError):
+        rawsocket.MessageHeader(rawsocket.MSG_TYPE_WAMP, rawsocket.PROTOCOL_MAX_MSG_SIZE).to_bytes()
+
+
+def test_frame_many():
+    payloads = [b"abc", "[1]", b""]
+    buffers = rawsocket.frame_many(payloads)
+    assert buffers == [b"\x00\x00\x00\x03", b"abc", b"\x00\x00\x00\x03", b"[1]", b"\x00\x00\x00\x00", b""]
+    assert buffers[1] is payloads[0]
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from wampproto import messages, serializers
+from wampproto.transports import websocket
+
+
+def test_accept_key():
+    # example from RFC 6455 section 1.3
+    assert websocket.accept_key("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+
+def test_subprotocol():
+    assert websocket.select_subprotocol(["wamp.2.json", "wamp.2.msgpack"]) == websocket.SUBPROTOCOL_MSGPACK
+    assert websocket.select_subprotocol(["wamp.2.json"]) == websocket.SUBPROTOCOL_JSON
+    assert websocket.select_subprotocol(["mqtt"]) is None
+
+    assert isinstance(websocket.get_serializer(websocket.SUBPROTOCOL_CBOR), serializers.CBORSerializer)
+    with pytest.raises(ValueError):
+        websocket.get_serializer("mqtt")
+
+
+def test_mask_payload():
+    mask = b"\x01\x02\x03\x04"
+    payload = os.urandom(1001)
+
+    masked = websocket.mask_payload(payload, mask)
+    assert masked == bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    assert websocket.mask_payload(masked, mask) == payload
+    assert websocket.mask_payload(b"", mask) == b""
+
+
+@pytest.mark.parametrize("size", [0, 125, 126, 65535, 65536])
+@pytest.mark.parametrize("mask", [True, False])
+def test_roundtrip(size: int, mask: bool):
+    payload = os.urandom(size)
+    data = websocket.encode_frame(websocket.OPCODE_BINARY, payload, mask=mask)
+
+    decoder = websocket.FrameDecoder(expect_masked=mask)
+    # feed byte by byte around the header and in one go for the rest
+    frames = []
+    for i in range(min(len(data), 16)):
+        frames += decoder.feed(data[i : i + 1])
+
+    frames += decoder.feed(data[16:])
+    assert len(frames) == 1
+    assert frames[0].opcode == websocket.OPCODE_BINARY
+    assert frames[0].payload == payload
+
+
+@pytest.mark.parametrize(
+    "serializer", [serializers.JSONSerializer(), serializers.MsgPackSerializer(), serializers.CBORSerializer()]
+)
+def test_wamp_message(serializer: serializers.Serializer):
+    hello = messages.Hello(messages.HelloFields("realm1", {"caller": {}}, "alice", ["ticket"]))
+    decoder = websocket.FrameDecoder(expect_masked=True)
+
+    frames = decoder.feed(websocket.encode_message(serializer.serialize(hello), mask=True))
+    assert len(frames) == 1
+
+    msg = serializer.deserialize(frames[0].payload)
+    assert isinstance(msg, messages.Hello)
+    assert msg.authid == "alice"
+
+
+def test_fragmented_message():
+    decoder = websocket.FrameDecoder()
+    data = (
+        websocket.encode_frame(websocket.OPCODE_TEXT, "hé".encode()[:2], fin=False)
+        + websocket.encode_frame(websocket.OPCODE_PING, b"ping")
+        + websocket.encode_frame(websocket.OPCODE_CONTINUATION, "hé".encode()[2:] + b" world", fin=False, mask=True)
+        + websocket.encode_frame(websocket.OPCODE_CONTINUATION, b"!")
+    )
+
+    ping, message = decoder.feed(data)
+    assert ping.opcode == websocket.OPCODE_PING
+    assert ping.payload == b"ping"
+    assert message.opcode == websocket.OPCODE_TEXT
+    assert message.payload == "hé world!"
+
+
+def test_protocol_errors():
+    with pytest.raises(ValueError):
+        websocket.FrameDecoder(expect_masked=True).feed(websocket.encode_frame(websocket.OPCODE_BINARY, b"x"))
+
+    with pytest.raises(ValueError):
+        websocket.FrameDecoder().feed(websocket.encode_frame(websocket.OPCODE_CONTINUATION, b"x"))
+
+    with pytest.raises(ValueError):
+        websocket.FrameDecoder().feed(websocket.encode_frame(websocket.OPCODE_PING, b"x" * 126))
+
+    with pytest.raises(ValueError):
+        websocket.FrameDecoder(max_msg_size=10).feed(websocket.encode_frame(websocket.OPCODE_BINARY, b"x" * 11))
+
+    decoder = websocket.FrameDecoder(max_msg_size=10)
+    decoder.feed(websocket.encode_frame(websocket.OPCODE_BINARY, b"x" * 6, fin=False))
+    with pytest.raises(ValueError):
+        decoder.feed(websocket.encode_frame(websocket.OPCODE_CONTINUATION, b"x" * 6))
+
+    with pytest.raises(ValueError):
+        websocket.FrameDecoder().feed(b"\xc2\x00")
+
+    # the most significant bit of a 64-bit length must be 0 (RFC 6455 section 5.2)
+    with pytest.raises(websocket.ProtocolError) as exc:
+        websocket.FrameDecoder().feed(bytes((0x82, 127)) + (1 << 63).to_bytes(8, "big"))
+
+    assert exc.value.close_code == websocket.CLOSE_PROTOCOL_ERROR
+
+    with pytest.raises(websocket.ProtocolError) as exc:
+        websocket.FrameDecoder(max_msg_size=10).feed(websocket.encode_frame(websocket.OPCODE_BINARY, b"x" * 11))
+
+    assert exc.value.close_code == websocket.CLOSE_MESSAGE_TOO_BIG
+
+    with pytest.raises(websocket.ProtocolError) as exc:
+        websocket.FrameDecoder().feed(websocket.encode_frame(websocket.OPCODE_TEXT, b"\xff"))
+
+    assert exc.value.close_code == websocket.CLOSE_INVALID_PAYLOAD
@@ -0,0 +1,82 @@
+import pytest
+
+from wampproto import messages
+from wampproto.broker import Broker
+from wampproto.dealer import Dealer
+from wampproto.serializers import JSONSerializer, MsgPackSerializer
+from wampproto.types import SessionDetails
+from wampproto.uritable import URITable
+
+
+def test_intern_and_release():
+    table = URITable()
+
+    handle = table.intern("io.xconn.test")
+    assert table.intern("io.xconn.test") == handle
+    assert table.handle("io.xconn.test") == handle
+    assert table.uri(handle) == "io.xconn.test"
+    assert len(table) == 1
+
+    table.release(handle)
+    assert "io.xconn.test" in table
+
+    table.release(handle)
+    assert "io.xconn.test" not in table
+    assert table.handle("io.xconn.test") is None
+
+    with pytest.raises(ValueError):
+        table.uri(handle)
+
+    # freed handles are reused
+    assert table.intern("io.xconn.other") == handle
+
+
+def test_canonical_does_not_grow_table():
+    table = URITable()
+    uri = "".join(["io.xconn", ".test"])
+    table.intern(uri)
+
+    assert table.canonical("io.xconn.test") is uri
+    assert table.canonical("io.xconn.unknown") == "io.xconn.unknown"
+    assert len(table) == 1
+
+
+def test_broker_and_dealer_share_table():
+    table = URITable()
+    broker = Broker(uri_table=table)
+    dealer = Dealer(uri_table=table)
+    details = SessionDetails(1, "realm1", "authid", "authrole")
+    broker.add_session(details)
+    dealer.add_session(details)
+
+    broker.receive_message(1, messages.Subscribe(messages.SubscribeFields(1, "io.xconn.test")))
+    dealer.receive_message(1, messages.Register(messages.RegisterFields(2, "io.xconn.test")))
+
+    handle = table.handle("io.xconn.test")
+    subscription = broker.get_subscription(broker.lookup_subscription("io.xconn.test"))
+    registration = dealer.get_registration(dealer.lookup_registration("io.xconn.test"))
+    assert subscription.uri_handle == handle
+    assert registration.procedure is subscription.topic
+
+    broker.remove_session(1)
+    assert "io.xconn.test" in table
+
+    dealer.remove_session(1)
+    assert "io.xconn.test" not in table
+
+
+@pytest.mark.parametrize("serializer_class", [JSONSerializer, MsgPackSerializer])
+def test_deserializer_returns_interned_uri(serializer_class):
+    table = URITable()
+    uri = "".join(["io.xconn", ".test"])
+    table.intern(uri)
+    serializer = serializer_class(uri_table=table)
+
+    publish = messages.Publish(messages.PublishFields(1, "io.xconn.test"))
+    received = serializer.deserialize(serializer.serialize(publish))
+    assert received.topic is uri
+
+    call = messages.Call(messages.CallFields(1, "io.xconn.unknown"))
+    received = serializer.deserialize(serializer.serialize(call))
+    assert received.procedure == "io.xconn.unknown"
+    assert len(table) == 1
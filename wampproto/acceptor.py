@@ -1,7 +1,11 @@
 import binascii
+import weakref
+from concurrent.futures import Executor
 
 from wampproto import messages, auth, serializers, uris
-from wampproto.idgen import generate_session_id
+from wampproto.admission import AdmissionController
+from wampproto.serializers.template import HandshakeTemplates, get_handshake_templates
+from wampproto.idgen import generate_session_id, RouterScopeIDGenerator
 from wampproto.types import SessionDetails
 
 ROUTER_ROLES = {
@@ -9,6 +13,17 @@ ROUTER_ROLES = {
     "broker": {"features": {}},
 }
 
+# templates for ROUTER_ROLES, built on first use per serializer type
+_router_templates: dict[type, HandshakeTemplates | None] = {}
+
+
+def _get_router_templates(serializer: serializers.Serializer) -> HandshakeTemplates | None:
+    key = type(serializer)
+    if key not in _router_templates:
+        _router_templates[key] = get_handshake_templates(serializer, ROUTER_ROLES)
+
+    return _router_templates[key]
+
 
 class Acceptor:
     STATE_NONE = 0
@@ -16,43 +31,83 @@ class Acceptor:
     STATE_CHALLENGE_SENT = 2
     STATE_WELCOME_SENT = 3
     STATE_ABORTED = 4
+    STATE_AUTHENTICATING = 5
 
     TICKET = "ticket"
     WAMPCRA = "wampcra"
     ANONYMOUS = "anonymous"
     CRYPTOSIGN = "cryptosign"
+    METHODS = frozenset((TICKET, WAMPCRA, ANONYMOUS, CRYPTOSIGN))
 
     def __init__(
         self,
         serializer: serializers.Serializer = serializers.JSONSerializer(),
         authenticator: auth.IServerAuthenticator = None,
         roles: dict[str, dict[str, dict[str, bool]]] = None,
+        session_id_generator: RouterScopeIDGenerator | None = None,
+        cra_key_cache: auth.DerivedKeyCache | None = None,
+        resumption: auth.ResumptionTickets | None = None,
+        admission: AdmissionController | None = None,
+        templates: HandshakeTemplates | None = None,
     ):
         self._serializer = serializer
         self._authenticator = authenticator
         self._roles = roles if roles is not None else ROUTER_ROLES
+        # templates must be built with get_handshake_templates() for the same serializer and
+        # roles. Without custom roles the shared ROUTER_ROLES templates are used.
+        if templates is None and roles is None:
+            templates = _get_router_templates(serializer)
+
+        self._templates = templates
+        self._cra_key_cache = cra_key_cache
+        self._resumption = resumption
+        self._admission = admission
 
         self._state = Acceptor.STATE_NONE
-        self._session_id = generate_session_id()
+        self._session_id_generator = session_id_generator
+        if session_id_generator is not None:
+            self._session_id = session_id_generator.next()
+        else:
+            self._session_id = generate_session_id()
 
         self._auth_method: str = None
         self._hello: messages.Hello = None
         self._response: auth.Response = None
         self._session_details: SessionDetails = None
 
-        self._public_key: str = None
+        self._public_key: bytes = None
         self._challenge: str = None
-        self._secret: str = None
+        self._secret: bytes = None
 
     def receive(self, data: bytes) -> (bytes, bool):
         received_message = self._serializer.deserialize(data)
         to_send = self.receive_message(received_message)
 
-        return self._serializer.serialize(to_send), isinstance(to_send, messages.Welcome) or isinstance(
-            to_send, messages.Abort
-        )
+        return self._serialize(to_send), isinstance(to_send, messages.Welcome) or isinstance(to_send, messages.Abort)
+
+    def _serialize(self, msg: messages.Message) -> bytes | str:
+        if self._templates is not None:
+            data = self._templates.render(msg)
+            if data is not None:
+                return data
+
+        return self._serializer.serialize(msg)
 
     def receive_message(self, msg: messages.Message) -> messages.Message:
+        result = self._process(msg)
+        if not isinstance(result, auth.Request):
+            return result
+
+        try:
+            response = self._authenticator.authenticate(result)
+        except Exception as e:
+            return self._authentication_failed(e)
+
+        return self._authenticated(result, response)
+
+    # returns the message to send back or, if the authenticator must be consulted first,
+    # the request to pass to it. The response is then handed over to _authenticated().
+    def _process(self, msg: messages.Message) -> messages.Message | auth.Request | None:
         if self._state == Acceptor.STATE_WELCOME_SENT:
             raise ValueError("session was established, not expecting any new messages")
 
@@ -69,139 +124,172 @@ class Acceptor:
 
                 return welcome
 
-            if msg.authmethods is not None and len(msg.authmethods) > 0:
-                method = msg.authmethods[0]
-            else:
-                method = Acceptor.ANONYMOUS
+            self._hello = msg
+            method = self._negotiate(msg.authmethods if msg.authmethods else [Acceptor.ANONYMOUS])
+            if method is None:
+                return self._abort(uris.NO_AUTH_METHOD)
+
+            if self._admission is not None:
+                # checked before anything that costs CPU, including the resumption ticket
+                retry_after = self._admission.admit(msg.authid, method)
+                if retry_after is not None:
+                    return self._abort(uris.TOO_MANY_REQUESTS, {"retry_after": retry_after})
+
+            if self._resumption is not None and msg.authextra:
+                ticket = msg.authextra.get(auth.RESUME_TICKET)
+                if ticket is not None:
+                    # a valid ticket skips authentication, otherwise the client is authenticated as usual
+                    response = self._resumption.verify(ticket, msg.realm, msg.authid)
+                    if response is not None:
+                        return self._welcome(response.authid, response.authrole)
 
             self._auth_method = method
-            self._hello = msg
 
             match method:
                 case Acceptor.ANONYMOUS:
-                    request = auth.AnonymousRequest(msg.realm, msg.authid, msg.authextra)
-                    try:
-                        response = self._authenticator.authenticate(request)
-                    except Exception as e:
-                        return messages.Abort(messages.AbortFields({}, uris.AUTHENTICATION_FAILED, args=list(e.args)))
-
-                    self._state = Acceptor.STATE_WELCOME_SENT
-
-                    welcome = messages.Welcome(
-                        messages.WelcomeFields(
-                            self._session_id, self._roles, response.authid, response.authrole, method
-                        )
-                    )
-                    self._session_details = SessionDetails(
-                        welcome.session_id, msg.realm, welcome.authid, welcome.authrole
-                    )
-
-                    return welcome
+                    self._state = Acceptor.STATE_HELLO_RECEIVED
+                    return auth.AnonymousRequest(msg.realm, msg.authid, msg.authextra)
                 case Acceptor.CRYPTOSIGN:
                     public_key = msg.authextra.get("pubkey")
                     if public_key is None:
                         raise ValueError("authextra must contain pubkey for cryptosign")
 
-                    request = auth.CryptoSignRequest(msg.realm, msg.authid, msg.authextra, public_key)
-                    try:
-                        self._response = self._authenticator.authenticate(request)
-                    except Exception as e:
-                        return messages.Abort(messages.AbortFields({}, uris.AUTHENTICATION_FAILED, args=list(e.args)))
-
-                    self._public_key = public_key
-
-                    challenge = auth.generate_cryptosign_challenge()
-                    self._state = Acceptor.STATE_CHALLENGE_SENT
-
-                    return messages.Challenge(messages.ChallengeFields(method, {"challenge": challenge}))
+                    self._state = Acceptor.STATE_HELLO_RECEIVED
+                    return auth.CryptoSignRequest(msg.realm, msg.authid, msg.authextra, public_key)
                 case Acceptor.WAMPCRA:
-                    request = auth.WAMPCRARequest(msg.realm, msg.authid, msg.authextra)
-                    try:
-                        response = self._authenticator.authenticate(request)
-                    except Exception as e:
-                        return messages.Abort(messages.AbortFields({}, uris.AUTHENTICATION_FAILED, args=list(e.args)))
-
-                    if not isinstance(response, auth.WAMPCRAResponse):
-                        raise ValueError("invalid response type for WAMPCRA")
-
-                    self._response = response
-                    self._secret = response.secret
-
-                    challenge = auth.generate_wampcra_challenge(
-                        self._session_id, self._response.authid, self._response.authrole, "dynamic"
-                    )
-                    self._state = Acceptor.STATE_CHALLENGE_SENT
-                    self._challenge = challenge
-
-                    return messages.Challenge(messages.ChallengeFields(method, {"challenge": challenge}))
+                    self._state = Acceptor.STATE_HELLO_RECEIVED
+                    return auth.WAMPCRARequest(msg.realm, msg.authid, msg.authextra)
                 case Acceptor.TICKET:
                     self._state = Acceptor.STATE_CHALLENGE_SENT
                     return messages.Challenge(messages.ChallengeFields(method, {}))
                 case _:
                     raise ValueError("unknown method")
         elif isinstance(msg, messages.Authenticate):
+            if self._state == Acceptor.STATE_AUTHENTICATING:
+                raise ValueError("authentication is already in progress")
+
             if self._state != Acceptor.STATE_CHALLENGE_SENT:
                 raise ValueError("unknown state")
 
             match self._auth_method:
                 case Acceptor.CRYPTOSIGN:
-                    if not auth.verify_cryptosign_signature(msg.signature, binascii.unhexlify(self._public_key)):
-                        self._state = Acceptor.STATE_ABORTED
-                        return messages.Abort(messages.AbortFields({}, uris.AUTHENTICATION_FAILED))
-
-                    self._state = Acceptor.STATE_WELCOME_SENT
-                    welcome = messages.Welcome(
-                        messages.WelcomeFields(
-                            self._session_id,
-                            self._roles,
-                            authid=self._response.authid,
-                            authrole=self._response.authrole,
-                        )
-                    )
-                    self._session_details = SessionDetails(
-                        welcome.session_id, self._hello.realm, welcome.authid, welcome.authrole
-                    )
-                    return welcome
+                    verified = auth.verify_cryptosign_signature(msg.signature, self._public_key, self._challenge)
+                    return self._complete_cryptosign(verified)
                 case Acceptor.WAMPCRA:
-                    if not auth.verify_wampcra_signature(msg.signature, self._challenge, self._secret.encode()):
-                        self._state = Acceptor.STATE_ABORTED
-                        return messages.Abort(messages.AbortFields({}, uris.AUTHENTICATION_FAILED))
-
-                    self._state = Acceptor.STATE_WELCOME_SENT
-                    welcome = messages.Welcome(
-                        messages.WelcomeFields(
-                            self._session_id,
-                            self._roles,
-                            authid=self._response.authid,
-                            authrole=self._response.authrole,
-                        )
-                    )
-                    self._session_details = SessionDetails(
-                        welcome.session_id, self._hello.realm, welcome.authid, welcome.authrole
-                    )
-                    return welcome
+                    if not auth.verify_wampcra_signature(msg.signature, self._challenge, self._secret):
+                        return self._abort(uris.AUTHENTICATION_FAILED)
+
+                    return self._welcome(self._response.authid, self._response.authrole)
                 case Acceptor.TICKET:
-                    request = auth.TicketRequest(
+                    # a second AUTHENTICATE must not start another authentication while this one runs
+                    self._state = Acceptor.STATE_AUTHENTICATING
+                    return auth.TicketRequest(
                         self._hello.realm, self._hello.authid, self._hello.authextra, msg.signature
                     )
-                    try:
-                        response = self._authenticator.authenticate(request)
-                    except Exception as e:
-                        return messages.Abort(messages.AbortFields({}, uris.AUTHENTICATION_FAILED, args=list(e.args)))
-
-                    self._state = Acceptor.STATE_WELCOME_SENT
-                    welcome = messages.Welcome(
-                        messages.WelcomeFields(
-                            self._session_id, self._roles, authid=response.authid, authrole=response.authrole
-                        )
-                    )
-                    self._session_details = SessionDetails(
-                        welcome.session_id, self._hello.realm, welcome.authid, welcome.authrole
-                    )
-
-                    return welcome
         elif isinstance(msg, messages.Abort):
             self._state = Acceptor.STATE_ABORTED
+            self.close()
+
+    def _negotiate(self, offered: list[str]) -> str | None:
+        # the client lists its methods by preference, pick the first one the server supports
+        supported = _supported_methods(self._authenticator)
+        for method in offered:
+            if method in supported:
+                return method
+
+        return None
+
+    def _authentication_failed(self, e: Exception) -> messages.Abort:
+        return self._abort(uris.AUTHENTICATION_FAILED, args=list(e.args))
+
+    def _abort(self, reason: str, details: dict | None = None, args: list | None = None) -> messages.Abort:
+        self._state = Acceptor.STATE_ABORTED
+        self.close()
+        return messages.Abort(messages.AbortFields(details if details is not None else {}, reason, args=args))
+
+    def close(self) -> None:
+        # gives the session ID back to the generator. Routers must call this when the session
+        # ends (GOODBYE or disconnect) or the handshake fails, aborted handshakes release it
+        # on their own. The ID is only released once, as it may be reissued afterwards.
+        if self._session_id_generator is not None:
+            self._session_id_generator.release(self._session_id)
+            self._session_id_generator = None
+
+    def _authenticated(self, request: auth.Request, response: auth.Response) -> messages.Message:
+        match request.method:
+            case Acceptor.ANONYMOUS:
+                return self._welcome(response.authid, response.authrole, Acceptor.ANONYMOUS)
+            case Acceptor.CRYPTOSIGN:
+                self._response = response
+
+                try:
+                    self._public_key = binascii.unhexlify(request.public_key)
+                except (binascii.Error, TypeError):
+                    return self._abort(uris.AUTHENTICATION_FAILED)
+
+                challenge = auth.generate_cryptosign_challenge()
+                self._state = Acceptor.STATE_CHALLENGE_SENT
+                self._challenge = challenge
+
+                return messages.Challenge(messages.ChallengeFields(Acceptor.CRYPTOSIGN, {"challenge": challenge}))
+            case Acceptor.WAMPCRA:
+                if not isinstance(response, auth.WAMPCRAResponse):
+                    raise ValueError("invalid response type for WAMPCRA")
+
+                self._response = response
+
+                challenge = auth.generate_wampcra_challenge(
+                    self._session_id, self._response.authid, self._response.authrole, "dynamic"
+                )
+                extra = {"challenge": challenge}
+
+                if isinstance(response, auth.WAMPCRASaltedResponse):
+                    if self._cra_key_cache is not None:
+                        self._secret = self._cra_key_cache.get(
+                            response.salt, response.secret, response.iterations, response.keylen
+                        )
+                    else:
+                        self._secret = auth.derive_cra_key(
+                            response.salt, response.secret, response.iterations, response.keylen
+                        )
+                    extra.update({"salt": response.salt, "iterations": response.iterations, "keylen": response.keylen})
+                else:
+                    self._secret = response.secret.encode()
+
+                self._state = Acceptor.STATE_CHALLENGE_SENT
+                self._challenge = challenge
+
+                return messages.Challenge(messages.ChallengeFields(Acceptor.WAMPCRA, extra))
+            case Acceptor.TICKET:
+                return self._welcome(response.authid, response.authrole)
+            case _:
+                raise ValueError("unknown method")
+
+    def _welcome(self, authid: str, authrole: str, authmethod: str | None = None) -> messages.Welcome:
+        self._state = Acceptor.STATE_WELCOME_SENT
+        authextra = None
+        if self._resumption is not None:
+            authextra = {auth.RESUME_TICKET: self._resumption.issue(authid, authrole, self._hello.realm)}
+
+        welcome = messages.Welcome(
+            messages.WelcomeFields(
+                self._session_id,
+                self._roles,
+                authid=authid,
+                authrole=authrole,
+                authmethod=authmethod,
+                authextra=authextra,
+            )
+        )
+        self._session_details = SessionDetails(welcome.session_id, self._hello.realm, welcome.authid, welcome.authrole)
+
+        return welcome
+
+    def _complete_cryptosign(self, verified: bool) -> messages.Message:
+        if not verified:
+            return self._abort(uris.AUTHENTICATION_FAILED)
+
+        return self._welcome(self._response.authid, self._response.authrole)
 
     def is_aborted(self) -> bool:
         return self._state == Acceptor.STATE_ABORTED
@@ -211,3 +299,80 @@ class Acceptor:
             raise ValueError("session is not setup yet")
 
         return self._session_details
+
+
+_method_sets: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _supported_methods(authenticator: auth.IServerAuthenticator | auth.IAsyncServerAuthenticator) -> frozenset[str]:
+    # authenticators are shared by all acceptors of a router, so their method set is only
+    # computed once. A new set of methods takes effect with a new authenticator instance.
+    try:
+        return _method_sets[authenticator]
+    except KeyError:
+        methods = Acceptor.METHODS.intersection(authenticator.methods())
+        _method_sets[authenticator] = methods
+        return methods
+    except TypeError:
+        return Acceptor.METHODS.intersection(authenticator.methods())
+
+
+class AsyncAcceptor(Acceptor):
+    def __init__(
+        self,
+        serializer: serializers.Serializer = serializers.JSONSerializer(),
+        authenticator: auth.IAsyncServerAuthenticator = None,
+        roles: dict[str, dict[str, dict[str, bool]]] = None,
+        session_id_generator: RouterScopeIDGenerator | None = None,
+        cra_key_cache: auth.DerivedKeyCache | None = None,
+        resumption: auth.ResumptionTickets | None = None,
+        admission: AdmissionController | None = None,
+        templates: HandshakeTemplates | None = None,
+    ):
+        super().__init__(
+            serializer, authenticator, roles, session_id_generator, cra_key_cache, resumption, admission, templates
+        )
+
+    async def receive(self, data: bytes) -> (bytes, bool):
+        received_message = self._serializer.deserialize(data)
+        to_send = await self.receive_message(received_message)
+
+        return self._serialize(to_send), isinstance(to_send, messages.Welcome) or isinstance(to_send, messages.Abort)
+
+    async def receive_message(self, msg: messages.Message) -> messages.Message:
+        result = self._process(msg)
+        if not isinstance(result, auth.Request):
+            return result
+
+        try:
+            response = await self._authenticator.authenticate(result)
+        except Exception as e:
+            return self._authentication_failed(e)
+
+        return self._authenticated(result, response)
+
+
+def receive_authenticate_batch(
+    pending: list[tuple[Acceptor, messages.Authenticate]], executor: Executor | None = None
+) -> list[messages.Message]:
+    # cryptosign signatures of all pending handshakes are verified together (optionally on
+    # a thread pool), any other AUTHENTICATE is handled by its acceptor as usual. That can't be
+    # done synchronously for an AsyncAcceptor, so those are rejected before anything is processed.
+    if any(isinstance(acceptor, AsyncAcceptor) for acceptor, _ in pending):
+        raise ValueError("receive_authenticate_batch does not support AsyncAcceptor")
+
+    results: list[messages.Message | None] = [None] * len(pending)
+    batch: list[int] = []
+    for index, (acceptor, msg) in enumerate(pending):
+        if acceptor._state == Acceptor.STATE_CHALLENGE_SENT and acceptor._auth_method == Acceptor.CRYPTOSIGN:
+            batch.append(index)
+        else:
+            results[index] = acceptor.receive_message(msg)
+
+    items = [
+        (pending[index][1].signature, pending[index][0]._public_key, pending[index][0]._challenge) for index in batch
+    ]
+    for index, verified in zip(batch, auth.verify_cryptosign_signatures(items, executor)):
+        results[index] = pending[index][0]._complete_cryptosign(verified)
+
+    return results
@@ -0,0 +1,128 @@
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        super().__init__()
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        # seconds until a token is available, 0 if one can be taken right away
+        if self.tokens >= 1:
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+    def idle(self, now: float) -> bool:
+        # a bucket that would be full again carries no state and can be dropped
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class KeyedBuckets:
+    def __init__(self, rate: float, burst: float, max_buckets: int = 10000):
+        super().__init__()
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+
+        self._rate = rate
+        self._burst = burst
+        self._max_buckets = max_buckets
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._overflow: TokenBucket | None = None
+
+    def get(self, key: str, now: float) -> TokenBucket:
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is not None:
+            buckets.move_to_end(key)
+            bucket.refill(now)
+            return bucket
+
+        # buckets are kept in least recently used order, so idle ones are at the front. Only the
+        # front is checked, which keeps this O(1) while a flood of new keys is coming in.
+        while buckets and next(iter(buckets.values())).idle(now):
+            buckets.popitem(last=False)
+
+        if len(buckets) >= self._max_buckets:
+            # evicting a depleted bucket would give its key a full one on its next attempt, so
+            # new keys share one overflow bucket until the least recently used ones are idle again
+            if self._overflow is None:
+                self._overflow = TokenBucket(self._rate, self._burst, now)
+            else:
+                self._overflow.refill(now)
+
+            return self._overflow
+
+        bucket = buckets[key] = TokenBucket(self._rate, self._burst, now)
+        return bucket
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: float | None = None,
+        authid_rate: float | None = None,
+        authid_burst: float | None = None,
+        method_limits: dict[str, tuple[float, float]] | None = None,
+        max_buckets: int = 10000,
+        now: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self._now = now
+        self._global = None
+        if rate is not None:
+            self._global = TokenBucket(rate, burst if burst is not None else max(1.0, rate), now())
+
+        self._authids = None
+        if authid_rate is not None:
+            authid_burst = authid_burst if authid_burst is not None else max(1.0, authid_rate)
+            self._authids = KeyedBuckets(authid_rate, authid_burst, max_buckets)
+
+        self._methods: dict[str, TokenBucket] = {}
+        for method, (method_rate, method_burst) in (method_limits or {}).items():
+            self._methods[method] = TokenBucket(method_rate, method_burst, now())
+
+    def admit(self, authid: str | None, authmethod: str) -> float | None:
+        # returns None if the handshake may proceed, otherwise the number of seconds to wait
+        # before retrying. A token is only taken when all buckets have one available.
+        now = self._now()
+        buckets: list[TokenBucket] = []
+
+        if self._authids is not None:
+            buckets.append(self._authids.get(authid or "", now))
+
+        bucket = self._methods.get(authmethod)
+        if bucket is not None:
+            bucket.refill(now)
+            buckets.append(bucket)
+
+        if self._global is not None:
+            self._global.refill(now)
+            buckets.append(self._global)
+
+        retry_after = max((bucket.wait_time() for bucket in buckets), default=0.0)
+        if retry_after > 0:
+            return retry_after
+
+        for bucket in buckets:
+            bucket.tokens -= 1
+
+        return None
@@ -1,6 +1,7 @@
 from wampproto.auth.auth import (
     IClientAuthenticator,
     IServerAuthenticator,
+    IAsyncServerAuthenticator,
     Request,
     AnonymousRequest,
     WAMPCRARequest,
@@ -8,6 +9,7 @@ from wampproto.auth.auth import (
     TicketRequest,
     Response,
     WAMPCRAResponse,
+    WAMPCRASaltedResponse,
 )
 from wampproto.auth.anonymous import AnonymousAuthenticator
 from wampproto.auth.cryptosign import (
@@ -15,10 +17,15 @@ from wampproto.auth.cryptosign import (
     generate_cryptosign_challenge,
     sign_cryptosign_challenge,
     verify_cryptosign_signature,
+    verify_cryptosign_signatures,
 )
 from wampproto.auth.ticket import TicketAuthenticator
+from wampproto.auth.executor import ExecutorAuthenticator
+from wampproto.auth.resumption import ResumptionTickets, RESUME_TICKET
 from wampproto.auth.wampcra import (
     WAMPCRAAuthenticator,
+    DerivedKeyCache,
+    derive_cra_key,
     generate_wampcra_challenge,
     sign_wampcra_challenge,
     verify_wampcra_signature,
@@ -31,6 +38,8 @@ __all__ = (
     "TicketAuthenticator",
     "WAMPCRAAuthenticator",
     "IServerAuthenticator",
+    "IAsyncServerAuthenticator",
+    "ExecutorAuthenticator",
     "Request",
     "AnonymousRequest",
     "WAMPCRARequest",
@@ -38,9 +47,15 @@ __all__ = (
     "TicketRequest",
     "Response",
     "WAMPCRAResponse",
+    "WAMPCRASaltedResponse",
+    "DerivedKeyCache",
+    "ResumptionTickets",
+    "RESUME_TICKET",
     "generate_cryptosign_challenge",
     "sign_cryptosign_challenge",
     "verify_cryptosign_signature",
+    "verify_cryptosign_signatures",
+    "derive_cra_key",
     "generate_wampcra_challenge",
     "sign_wampcra_challenge",
     "verify_wampcra_signature",
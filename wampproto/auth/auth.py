@@ -116,7 +116,7 @@ class WAMPCRASaltedResponse(WAMPCRAResponse):
 
     @property
     def salt(self) -> str:
-        return self.salt
+        return self._salt
 
     @property
     def iterations(self) -> int:
@@ -133,3 +133,11 @@ class IServerAuthenticator:
 
     def authenticate(self, request: Request) -> Response:
         raise NotImplementedError()
+
+
+class IAsyncServerAuthenticator:
+    def methods(self) -> list[str]:
+        raise NotImplementedError()
+
+    async def authenticate(self, request: Request) -> Response:
+        raise NotImplementedError()
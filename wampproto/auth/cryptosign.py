@@ -1,11 +1,12 @@
 import binascii
-import random
+import functools
+from concurrent.futures import Executor
 
 import nacl.signing
 from nacl.encoding import HexEncoder
 from nacl.exceptions import BadSignatureError
 
-from wampproto import messages, auth
+from wampproto import messages, auth, entropy
 from wampproto.messages.authenticate import AuthenticateFields
 
 
@@ -31,8 +32,7 @@ class CryptoSignAuthenticator(auth.IClientAuthenticator):
 
 
 def generate_cryptosign_challenge() -> str:
-    raw_bytes = random.randbytes(32)
-    return binascii.hexlify(raw_bytes).decode("ascii")
+    return entropy.token_hex(32)
 
 
 def sign_cryptosign_challenge(challenge: str, private_key: nacl.signing.SigningKey) -> str:
@@ -40,16 +40,34 @@ def sign_cryptosign_challenge(challenge: str, private_key: nacl.signing.SigningK
     return private_key.sign(raw_challenge, HexEncoder).signature.decode() + challenge
 
 
-def verify_cryptosign_signature(signature: str, public_key: bytes) -> bool:
+@functools.lru_cache(maxsize=4096)
+def get_verify_key(public_key: bytes) -> nacl.signing.VerifyKey:
+    return nacl.signing.VerifyKey(public_key)
+
+
+def verify_cryptosign_signature(signature: str, public_key: bytes, challenge: str | None = None) -> bool:
+    # signature is the hex encoded 64 byte signature followed by the signed challenge.
+    if challenge is not None and signature[128:].lower() != challenge.lower():
+        return False
+
     try:
-        verifying_key = nacl.signing.VerifyKey(public_key)
-        verifying_key.verify(binascii.unhexlify(signature))
-    except BadSignatureError:
+        get_verify_key(public_key).verify(binascii.unhexlify(signature))
+    except (BadSignatureError, binascii.Error, ValueError):
         return False
 
     return True
 
 
+def verify_cryptosign_signatures(
+    items: list[tuple[str, bytes, str | None]], executor: Executor | None = None
+) -> list[bool]:
+    # PyNaCl releases the GIL while verifying, so a thread pool verifies in parallel.
+    if executor is None or len(items) < 2:
+        return [verify_cryptosign_signature(*item) for item in items]
+
+    return list(executor.map(verify_cryptosign_signature, *zip(*items)))
+
+
 def generate_cryptosign_keypair() -> tuple[str, str]:
     signing_key = nacl.signing.SigningKey.generate()
     verify_key = signing_key.verify_key
@@ -0,0 +1,42 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from wampproto import auth
+
+
+class ExecutorAuthenticator(auth.IAsyncServerAuthenticator):
+    def __init__(
+        self, authenticator: auth.IServerAuthenticator, executor: Executor | None = None, max_concurrency: int = 16
+    ):
+        super().__init__()
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self._authenticator = authenticator
+        # an executor passed in belongs to the caller and is not shut down by close()
+        self._owns_executor = executor is None
+        self._executor = executor if executor is not None else ThreadPoolExecutor(max_workers=max_concurrency)
+        # excess requests wait on the event loop instead of piling up in the executor queue.
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def executor(self) -> Executor:
+        return self._executor
+
+    def methods(self) -> list[str]:
+        return self._authenticator.methods()
+
+    async def authenticate(self, request: auth.Request) -> auth.Response:
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._authenticator.authenticate, request)
+
+    def close(self, wait: bool = True) -> None:
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "ExecutorAuthenticator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,66 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from typing import Callable
+
+from wampproto.auth.auth import Response
+
+RESUME_TICKET = "resume_ticket"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class ResumptionTickets:
+    def __init__(self, key: bytes, ttl: float = 3600, now: Callable[[], float] = time.time):
+        super().__init__()
+        if len(key) < 32:
+            raise ValueError("key must be at least 32 bytes")
+
+        self._key = key
+        self._ttl = ttl
+        self._now = now
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._key, payload, hashlib.sha256).digest()
+
+    def issue(self, authid: str, authrole: str, realm: str) -> str:
+        payload = json.dumps(
+            {"authid": authid, "authrole": authrole, "realm": realm, "exp": int(self._now() + self._ttl)},
+            separators=(",", ":"),
+        ).encode()
+
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(payload))}"
+
+    def verify(self, ticket: str, realm: str, authid: str | None = None) -> Response | None:
+        # a ticket is only good for the realm it was issued for, and for the authid it
+        # was issued to if the client announced one.
+        if not isinstance(ticket, str):
+            return None
+
+        encoded_payload, _, encoded_signature = ticket.partition(".")
+        try:
+            payload = _b64decode(encoded_payload)
+            signature = _b64decode(encoded_signature)
+        except (binascii.Error, ValueError):
+            return None
+
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+
+        claims = json.loads(payload)
+        if claims["exp"] < self._now() or claims["realm"] != realm:
+            return None
+
+        if authid is not None and claims["authid"] != authid:
+            return None
+
+        return Response(claims["authid"], claims["authrole"])
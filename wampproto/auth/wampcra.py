@@ -1,21 +1,74 @@
 import base64
 import binascii
-import datetime
 import hashlib
 import hmac
-import json
-import random
+import threading
+import time
+from collections import OrderedDict
+from json.encoder import encode_basestring_ascii
 
-from wampproto import messages, auth
+from wampproto import messages, auth, entropy
 from wampproto.messages.authenticate import AuthenticateFields
 
 
+class DerivedKeyCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        super().__init__()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # entries are keyed by a keyed hash, so neither the secrets nor a digest that could be
+        # brute forced offline are kept in memory.
+        self._hash_key = entropy.token_bytes(32)
+        self._keys: OrderedDict[bytes, tuple[float, bytes]] = OrderedDict()
+
+    def _cache_key(self, salt: str, secret: str, iterations: int, key_length: int) -> bytes:
+        mac = hmac.new(self._hash_key, digestmod=hashlib.sha256)
+        for part in (salt.encode(), secret.encode()):
+            mac.update(len(part).to_bytes(8, "big") + part)
+
+        mac.update(iterations.to_bytes(8, "big") + key_length.to_bytes(8, "big"))
+        return mac.digest()
+
+    def get(self, salt: str, secret: str, iterations: int, key_length: int) -> bytes:
+        cache_key = self._cache_key(salt, secret, iterations, key_length)
+        with self._lock:
+            entry = self._keys.get(cache_key)
+            if entry is not None:
+                expires_at, derived_key = entry
+                if expires_at > time.monotonic():
+                    self._keys.move_to_end(cache_key)
+                    return derived_key
+
+        # derived without holding the lock, so one slow derivation doesn't block the other threads
+        derived_key = derive_cra_key(salt, secret, iterations, key_length)
+
+        with self._lock:
+            now = time.monotonic()
+            self._keys[cache_key] = (now + self._ttl, derived_key)
+            self._keys.move_to_end(cache_key)
+
+            # entries are kept in least recently used order, trim to size and evict expired ones from the head.
+            while len(self._keys) > self._maxsize or (self._keys and self._keys[next(iter(self._keys))][0] <= now):
+                self._keys.popitem(last=False)
+
+        return derived_key
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
 class WAMPCRAAuthenticator(auth.IClientAuthenticator):
     TYPE = "wampcra"
 
-    def __init__(self, authid: str, secret: str, auth_extra: dict = None):
+    def __init__(self, authid: str, secret: str, auth_extra: dict = None, key_cache: DerivedKeyCache = None):
         super().__init__(WAMPCRAAuthenticator.TYPE, authid, auth_extra)
         self._secret = secret
+        self._key_cache = key_cache
 
     def authenticate(self, challenge: messages.Challenge) -> messages.Authenticate:
         salt = challenge.extra.get("salt", None)
@@ -23,7 +76,10 @@ class WAMPCRAAuthenticator(auth.IClientAuthenticator):
         key_length = challenge.extra.get("keylen", 0)
 
         if salt is not None:
-            raw_secret = derive_cra_key(salt, self._secret, iterations, key_length)
+            if self._key_cache is not None:
+                raw_secret = self._key_cache.get(salt, self._secret, iterations, key_length)
+            else:
+                raw_secret = derive_cra_key(salt, self._secret, iterations, key_length)
         else:
             raw_secret = self._secret.encode()
 
@@ -46,25 +102,34 @@ def derive_cra_key(salt_str: str, secret: str, iterations: int, key_length: int)
     return base64.b64encode(derived_key)
 
 
+_timestamp_second = -1
+_timestamp_prefix = ""
+
+
 def utcnow() -> str:
-    ts = datetime.datetime.utcnow()
-    return f"{ts.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]}Z"
+    global _timestamp_second, _timestamp_prefix
+
+    now = time.time()
+    second = int(now)
+    # formatting the date part is the expensive bit, it only changes once per second.
+    if second != _timestamp_second:
+        _timestamp_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _timestamp_second = second
+
+    return f"{_timestamp_prefix}.{int((now - second) * 1000):03d}Z"
+
+
+def _json_string(value: str | None) -> str:
+    return "null" if value is None else encode_basestring_ascii(value)
 
 
 def generate_wampcra_challenge(session_id: int, authid: str, authrole: str, provider: str) -> str:
-    nonce = binascii.hexlify(random.randbytes(16)).decode()
-
-    data = {
-        "nonce": nonce,
-        "authprovider": provider,
-        "authid": authid,
-        "authrole": authrole,
-        "authmethod": "wampcra",
-        "session": session_id,
-        "timestamp": utcnow(),
-    }
-
-    return json.dumps(data)
+    # equivalent to json.dumps() of the challenge dict, without building the dict first.
+    return (
+        f'{{"nonce": "{entropy.token_hex(16)}", "authprovider": {_json_string(provider)}, '
+        f'"authid": {_json_string(authid)}, "authrole": {_json_string(authrole)}, "authmethod": "wampcra", '
+        f'"session": {int(session_id)}, "timestamp": "{utcnow()}"}}'
+    )
 
 
 def sign_wampcra_challenge(challenge: str, key: bytes) -> str:
@@ -1,6 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Hashable
 
-from wampproto import messages, types, idgen
+from wampproto import messages, types, idgen, meta, queues, uris
+from wampproto.messages import util
+from wampproto.uritable import URITable
 
 
 @dataclass
@@ -8,16 +11,63 @@ class Subscription:
     id: int
     topic: str
     subscribers: dict[int, int]
+    uri_handle: int | None = None
+    # session id -> True to conflate by topic or the kwargs key to conflate by
+    conflate: dict[int, bool | str] = field(default_factory=dict)
+    _recipients: tuple[int, ...] | None = field(default=None, init=False, repr=False, compare=False)
+
+    def add_subscriber(self, session_id: int):
+        self.subscribers[session_id] = session_id
+        self._recipients = None
+
+    def remove_subscriber(self, session_id: int):
+        self.subscribers.pop(session_id, None)
+        self._recipients = None
+
+    def recipients(self) -> tuple[int, ...]:
+        # publications to a topic share one snapshot until its subscribers change, in the
+        # order they subscribed
+        if self._recipients is None:
+            self._recipients = tuple(self.subscribers)
+
+        return self._recipients
+
+
+OPTION_CONFLATE = "x_conflate"
 
 
 class Broker:
-    def __init__(self):
+    def __init__(
+        self,
+        meta_events: meta.MetaEventQueue | None = None,
+        uri_table: URITable | None = None,
+        uri_check: str | None = util.URI_CHECK_LOOSE,
+        queue_size: int | None = None,
+        queue_policy: str = queues.POLICY_DROP_OLDEST,
+    ):
         super().__init__()
+        self.meta_events = meta_events
+        self.uri_table = uri_table
+        self.uri_check = uri_check
         self.subscriptions_by_topic: dict[str, Subscription] = {}
         self.subscriptions_by_session: dict[int, dict[int, Subscription]] = {}
+        self.subscriptions_by_id: dict[int, Subscription] = {}
         self.sessions: dict[int, types.SessionDetails] = {}
+        self.sessions_by_authrole: dict[str, int] = {}
         self.idgen = idgen.SessionScopeIDGenerator()
 
+        # per session queues of undelivered events, created on the first dispatch to a session.
+        # Without a queue_size they are unbounded.
+        self.queue_size = queue_size
+        self.queue_policy = queue_policy
+        self.queues: dict[int, queues.SubscriberQueue] = {}
+        self.dropped_events = 0
+        if queue_size is not None and queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+
+        if queue_policy not in queues.POLICIES:
+            raise ValueError(f"unknown queue policy '{queue_policy}'")
+
     def add_session(self, details: types.SessionDetails):
         if details.session_id in self.subscriptions_by_session:
             raise ValueError("cannot add session twice")
@@ -25,6 +75,9 @@ class Broker:
         self.subscriptions_by_session[details.session_id] = {}
         self.sessions[details.session_id] = details
 
+        self.sessions_by_authrole[details.authrole] = self.sessions_by_authrole.get(details.authrole, 0) + 1
+        self._emit(meta.SESSION_ON_JOIN, [meta.session_details(details)])
+
     def remove_session(self, sid: int):
         if sid not in self.subscriptions_by_session:
             raise ValueError("cannot remove non-existing session")
@@ -32,30 +85,114 @@ class Broker:
         subscriptions = self.subscriptions_by_session.pop(sid)
         for subscription_id, sub in subscriptions.items():
             subscription = self.subscriptions_by_topic[sub.topic]
+            subscription.conflate.pop(sid, None)
             if sid in subscription.subscribers:
-                del subscription.subscribers[sid]
+                subscription.remove_subscriber(sid)
+                self._emit(meta.SUBSCRIPTION_ON_UNSUBSCRIBE, [sid, subscription.id])
 
             if len(subscription.subscribers) == 0:
-                del self.subscriptions_by_topic[subscription.topic]
+                self._remove_subscription(sid, subscription)
 
-        del self.sessions[sid]
+        self.queues.pop(sid, None)
+        details = self.sessions.pop(sid)
+        count = self.sessions_by_authrole[details.authrole] - 1
+        if count == 0:
+            del self.sessions_by_authrole[details.authrole]
+        else:
+            self.sessions_by_authrole[details.authrole] = count
+
+        self._emit(meta.SESSION_ON_LEAVE, [sid, details.authid, details.authrole])
+
+    def _emit(self, topic: str, args: list):
+        if self.meta_events is not None:
+            self.meta_events.emit(topic, args)
+
+    def _remove_subscription(self, session_id: int, subscription: Subscription):
+        del self.subscriptions_by_topic[subscription.topic]
+        del self.subscriptions_by_id[subscription.id]
+        if subscription.uri_handle is not None:
+            self.uri_table.release(subscription.uri_handle)
+
+        self._emit(meta.SUBSCRIPTION_ON_DELETE, [session_id, subscription.id])
+
+    def _is_valid_uri(self, uri: str) -> bool:
+        return self.uri_check is None or util.is_valid_uri(uri, self.uri_check)
 
     def has_subscription(self, topic: str):
         return topic in self.subscriptions_by_topic
 
+    def get_subscription(self, subscription_id: int) -> Subscription | None:
+        return self.subscriptions_by_id.get(subscription_id)
+
+    def lookup_subscription(self, topic: str) -> int | None:
+        subscription = self.subscriptions_by_topic.get(topic)
+        if subscription is None:
+            return None
+
+        return subscription.id
+
+    def match_subscriptions(self, topic: str) -> list[int]:
+        # only exact matching is supported, so at most one subscription can match.
+        subscription = self.subscriptions_by_topic.get(topic)
+        if subscription is None:
+            return []
+
+        return [subscription.id]
+
+    def list_subscriptions(self) -> list[int]:
+        return list(self.subscriptions_by_id.keys())
+
+    def count_subscribers(self, subscription_id: int) -> int | None:
+        subscription = self.subscriptions_by_id.get(subscription_id)
+        if subscription is None:
+            return None
+
+        return len(subscription.subscribers)
+
+    def session_count(self, authroles: list[str] | None = None) -> int:
+        if authroles is None:
+            return len(self.sessions)
+
+        return sum(self.sessions_by_authrole.get(authrole, 0) for authrole in set(authroles))
+
     def receive_message(self, session_id: int, message: messages.Message) -> types.MessageWithRecipient:
         if isinstance(message, messages.Subscribe):
             if session_id not in self.subscriptions_by_session:
                 raise ValueError(f"cannot subscribe, session {session_id} doesn't exist")
 
+            # only exact matching is implemented, prefix or wildcard subscriptions would never match
+            if message.options.get("match", meta.MATCH_EXACT) != meta.MATCH_EXACT:
+                err = messages.Error(messages.ErrorFields(message.TYPE, message.request_id, uris.INVALID_ARGUMENT))
+                return types.MessageWithRecipient(err, session_id)
+
+            if not self._is_valid_uri(message.topic):
+                err = messages.Error(messages.ErrorFields(message.TYPE, message.request_id, uris.INVALID_URI))
+                return types.MessageWithRecipient(err, session_id)
+
             subscription = self.subscriptions_by_topic.get(message.topic)
             if subscription is None:
                 subscription = Subscription(self.idgen.next(), message.topic, {session_id: session_id})
-                self.subscriptions_by_topic[message.topic] = subscription
+                if self.uri_table is not None:
+                    subscription.uri_handle = self.uri_table.intern(message.topic)
+                    subscription.topic = self.uri_table.uri(subscription.uri_handle)
+
+                self.subscriptions_by_topic[subscription.topic] = subscription
+                self.subscriptions_by_id[subscription.id] = subscription
+                self._emit(
+                    meta.SUBSCRIPTION_ON_CREATE,
+                    [session_id, {"id": subscription.id, "uri": subscription.topic, "match": meta.MATCH_EXACT}],
+                )
+            else:
+                subscription.add_subscriber(session_id)
+
+            conflate = message.options.get(OPTION_CONFLATE)
+            if conflate is True or (isinstance(conflate, str) and conflate):
+                subscription.conflate[session_id] = conflate
             else:
-                subscription.subscribers[session_id] = session_id
+                subscription.conflate.pop(session_id, None)
 
             self.subscriptions_by_session[session_id][subscription.id] = subscription
+            self._emit(meta.SUBSCRIPTION_ON_SUBSCRIBE, [session_id, subscription.id])
 
             subscribed = messages.Subscribed(messages.SubscribedFields(message.request_id, subscription.id))
             return types.MessageWithRecipient(subscribed, session_id)
@@ -68,9 +205,11 @@ class Broker:
             if subscription is None:
                 raise ValueError(f"cannot unsubscribe, subscription {message.subscription_id} doesn't exist")
 
-            del subscription.subscribers[session_id]
+            subscription.remove_subscriber(session_id)
+            subscription.conflate.pop(session_id, None)
+            self._emit(meta.SUBSCRIPTION_ON_UNSUBSCRIBE, [session_id, subscription.id])
             if len(subscription.subscribers) == 0:
-                del self.subscriptions_by_topic[subscription.topic]
+                self._remove_subscription(session_id, subscription)
 
             del self.subscriptions_by_session[session_id][message.subscription_id]
 
@@ -83,19 +222,166 @@ class Broker:
         if session_id not in self.subscriptions_by_session:
             raise ValueError(f"cannot publish, session {session_id} doesn't exist")
 
-        result = types.Publication(recipients=[])
-        publication_id = self.idgen.next()
+        result = types.Publication(recipients=())
+        ack = message.options.get("acknowledge", False)
+        if not self._is_valid_uri(message.topic):
+            if ack:
+                err = messages.Error(messages.ErrorFields(message.TYPE, message.request_id, uris.INVALID_URI))
+                result.ack = types.MessageWithRecipient(err, session_id)
+
+            return result
+
+        publication_id = idgen.generate_global_id()
 
         subscription = self.subscriptions_by_topic.get(message.topic)
         if subscription is not None:
             event = messages.Event(messages.EventFields(subscription.id, publication_id, message.args, message.kwargs))
             result.event = event
-            for subscriber_id in subscription.subscribers.keys():
-                result.recipients.append(subscriber_id)
+            result.recipients = subscription.recipients()
 
-        ack = message.options.get("acknowledge", False)
         if ack:
             published = messages.Published(messages.PublishedFields(message.request_id, publication_id))
             result.ack = types.MessageWithRecipient(published, session_id)
 
         return result
+
+    def receive_publish_many(self, session_id: int, publishes: list[messages.Publish]) -> types.PublicationBatch:
+        if session_id not in self.subscriptions_by_session:
+            raise ValueError(f"cannot publish, session {session_id} doesn't exist")
+
+        batch = types.PublicationBatch({}, [])
+        events = batch.events
+        # topics usually repeat within a batch, so each is resolved only once
+        subscriptions: dict[str, Subscription | None] = {}
+        for message in publishes:
+            ack = message.options.get("acknowledge", False)
+            topic = message.topic
+            if topic in subscriptions:
+                subscription = subscriptions[topic]
+            elif not self._is_valid_uri(topic):
+                if ack:
+                    err = messages.Error(messages.ErrorFields(message.TYPE, message.request_id, uris.INVALID_URI))
+                    batch.acks.append(types.MessageWithRecipient(err, session_id))
+
+                continue
+            else:
+                subscription = subscriptions[topic] = self.subscriptions_by_topic.get(topic)
+
+            publication_id = idgen.generate_global_id()
+            if subscription is not None:
+                event = messages.Event(
+                    messages.EventFields(subscription.id, publication_id, message.args, message.kwargs)
+                )
+                for subscriber_id in subscription.recipients():
+                    recipient_events = events.get(subscriber_id)
+                    if recipient_events is None:
+                        events[subscriber_id] = [event]
+                    else:
+                        recipient_events.append(event)
+
+            if ack:
+                published = messages.Published(messages.PublishedFields(message.request_id, publication_id))
+                batch.acks.append(types.MessageWithRecipient(published, session_id))
+
+        return batch
+
+    def dispatch(self, publication: types.Publication) -> list[int]:
+        # queues the event for all recipients, returns the sessions whose queue overflowed
+        # under the disconnect policy and must be disconnected.
+        event = publication.event
+        if event is None:
+            return []
+
+        subscription = self.subscriptions_by_id.get(event.subscription_id)
+        conflate = subscription.conflate if subscription is not None else {}
+
+        return [recipient for recipient in publication.recipients if not self._enqueue(recipient, event, conflate)]
+
+    def dispatch_batch(self, batch: types.PublicationBatch) -> list[int]:
+        # like dispatch() for the result of receive_publish_many(), so batched publishes are
+        # queued and conflated exactly like the same publishes dispatched one at a time.
+        overflowed = []
+        conflate_by_subscription: dict[int, dict[int, bool | str]] = {}
+        for recipient, events in batch.events.items():
+            ok = True
+            for event in events:
+                conflate = conflate_by_subscription.get(event.subscription_id)
+                if conflate is None:
+                    subscription = self.subscriptions_by_id.get(event.subscription_id)
+                    conflate = subscription.conflate if subscription is not None else {}
+                    conflate_by_subscription[event.subscription_id] = conflate
+
+                ok = self._enqueue(recipient, event, conflate) and ok
+
+            if not ok:
+                overflowed.append(recipient)
+
+        return overflowed
+
+    def _enqueue(self, recipient: int, event: messages.Event, conflate: dict[int, bool | str]) -> bool:
+        # returns False if the recipient's queue overflowed under the disconnect policy
+        queue = self.queues.get(recipient)
+        if queue is None:
+            if recipient not in self.sessions:
+                return True
+
+            queue = self.queues[recipient] = queues.SubscriberQueue(self.queue_size, self.queue_policy)
+
+        key = None
+        if conflate:
+            mode = conflate.get(recipient)
+            if mode is not None:
+                key = self._conflation_key(event, mode)
+
+        if queue.push(event, key):
+            return True
+
+        self.dropped_events += 1
+        return not queue.overflowed
+
+    @staticmethod
+    def _conflation_key(event: messages.Event, mode: bool | str) -> Hashable | None:
+        if mode is True:
+            return event.subscription_id
+
+        if not event.kwargs or mode not in event.kwargs:
+            return None
+
+        key = event.subscription_id, event.kwargs[mode]
+        # isinstance(value, Hashable) is also true for tuples holding lists, so hash to be sure
+        try:
+            hash(key)
+        except TypeError:
+            return None
+
+        return key
+
+    def drain(self, session_id: int, limit: int | None = None) -> list[messages.Event]:
+        # events to send to the session once its transport is writable
+        queue = self.queues.get(session_id)
+        if queue is None:
+            return []
+
+        return queue.pop(limit)
+
+    def pending_events(self, session_id: int) -> int:
+        queue = self.queues.get(session_id)
+        return 0 if queue is None else len(queue)
+
+    def flush_meta_events(self) -> list[types.Publication]:
+        if self.meta_events is None:
+            return []
+
+        publications = []
+        for meta_event in self.meta_events.pop():
+            subscription = self.subscriptions_by_topic.get(meta_event.topic)
+            if subscription is None:
+                continue
+
+            details = {meta.DETAIL_BATCHED: True} if meta_event.batched else None
+            event = messages.Event(
+                messages.EventFields(subscription.id, idgen.generate_global_id(), meta_event.args, details=details)
+            )
+            publications.append(types.Publication(event, subscription.recipients()))
+
+        return publications
@@ -0,0 +1,174 @@
+import base64
+import binascii
+
+from wampproto import messages
+
+OPTION_CHUNK = "x_chunk"
+# leaves room for the message envelope within rawsocket.DEFAULT_MAX_MSG_SIZE
+DEFAULT_CHUNK_SIZE = 2**19
+DEFAULT_MAX_MSG_SIZE = 2**28
+
+ENCODING_BASE64 = "base64"
+
+
+def chunk_yields(
+    invocation: messages.Invocation,
+    data: bytes | str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    encoding: str | None = None,
+) -> list[messages.Yield]:
+    # splits a result too big for a single transport message into progressive YIELDs. Each one
+    # carries a slice of data as its only argument and {"index", "count", "size"} in the x_chunk
+    # option, the last YIELD is not progressive and completes the call.
+    #
+    # str data is split as UTF-8, so chunk_size and size count bytes, and "text" tells the
+    # receiver to decode the result again. Serializers without a binary type (JSON) need
+    # encoding="base64", which sends the chunks as base64 strings, 4/3 of chunk_size long.
+    #
+    # without receive_progress the dealer would complete the call with the first chunk
+    if not invocation.details.get("receive_progress", False):
+        raise ValueError(f"invocation {invocation.request_id} was not made with receive_progress")
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    if encoding not in (None, ENCODING_BASE64):
+        raise ValueError(f"unsupported chunk encoding '{encoding}'")
+
+    text = isinstance(data, str)
+    payload = data.encode() if text else bytes(data)
+
+    count = max(1, -(-len(payload) // chunk_size))
+    yields = []
+    for index in range(count):
+        info = {"index": index, "count": count, "size": len(payload)}
+        if text:
+            info["text"] = True
+
+        if encoding is not None:
+            info["encoding"] = encoding
+
+        options = {OPTION_CHUNK: info}
+        if index < count - 1:
+            options["progress"] = True
+
+        chunk = payload[index * chunk_size : (index + 1) * chunk_size]
+        if encoding == ENCODING_BASE64:
+            chunk = base64.b64encode(chunk).decode()
+
+        yields.append(messages.Yield(messages.YieldFields(invocation.request_id, args=[chunk], options=options)))
+
+    return yields
+
+
+def _decode_chunk(chunk_info: object, args: object) -> tuple[int, int, int, bytes]:
+    # chunks come from the peer, anything unexpected is a protocol error
+    if not isinstance(chunk_info, dict) or not isinstance(args, list) or len(args) != 1:
+        raise ValueError("invalid chunk")
+
+    index, count, size = chunk_info.get("index"), chunk_info.get("count"), chunk_info.get("size")
+    for value in (index, count, size):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError("invalid chunk")
+
+    if not 0 <= index < count or size < 0:
+        raise ValueError("invalid chunk")
+
+    chunk = args[0]
+    encoding = chunk_info.get("encoding")
+    if encoding == ENCODING_BASE64:
+        if not isinstance(chunk, str):
+            raise ValueError("invalid chunk")
+
+        try:
+            chunk = base64.b64decode(chunk, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("invalid base64 chunk")
+    elif encoding is not None or not isinstance(chunk, (bytes, bytearray)):
+        raise ValueError("invalid chunk")
+
+    return index, count, size, bytes(chunk)
+
+
+class _PendingResult:
+    __slots__ = ("chunks", "size", "count")
+
+    def __init__(self, count: int):
+        super().__init__()
+        self.chunks: list[bytes] = []
+        self.size = 0
+        self.count = count
+
+
+class ChunkAssembler:
+    def __init__(self, max_msg_size: int = DEFAULT_MAX_MSG_SIZE, max_buffered: int | None = None):
+        super().__init__()
+        self._max_msg_size = max_msg_size
+        # upper bound on the bytes held for all calls together
+        self._max_buffered = max_buffered if max_buffered is not None else max_msg_size
+        self._buffered = 0
+        self._pending: dict[int, _PendingResult] = {}
+
+    @property
+    def buffered(self) -> int:
+        return self._buffered
+
+    def add(self, result: messages.Result) -> messages.Result | None:
+        # returns the reassembled RESULT once its last chunk arrived, None until then
+        chunk_info = result.details.get(OPTION_CHUNK)
+        if chunk_info is None:
+            return result
+
+        request_id = result.request_id
+        pending = self._pending.get(request_id)
+        try:
+            index, count, size, chunk = _decode_chunk(chunk_info, result.args)
+        except ValueError as e:
+            self.discard(request_id)
+            raise ValueError(f"{e} for request {request_id}")
+
+        # a final RESULT ends the call at the dealer, so no further chunk can follow it
+        if index < count - 1 and not result.details.get("progress", False):
+            self.discard(request_id)
+            raise ValueError(f"chunk {index} of request {request_id} is not progressive")
+
+        if size > self._max_msg_size:
+            self.discard(request_id)
+            raise ValueError(f"chunked result of {size} bytes exceeds max message size {self._max_msg_size}")
+
+        if pending is None:
+            pending = self._pending[request_id] = _PendingResult(count)
+
+        if index != len(pending.chunks) or count != pending.count:
+            self.discard(request_id)
+            raise ValueError(f"chunk {index} of request {request_id} received out of order")
+
+        pending.size += len(chunk)
+        self._buffered += len(chunk)
+        if pending.size > size or self._buffered > self._max_buffered:
+            self.discard(request_id)
+            raise ValueError(f"chunked results exceed the buffer limit of {self._max_buffered} bytes")
+
+        pending.chunks.append(chunk)
+        if index < count - 1:
+            return None
+
+        self.discard(request_id)
+        if pending.size != size:
+            raise ValueError(f"chunked result of request {request_id} is shorter than announced")
+
+        data = b"".join(pending.chunks)
+        if chunk_info.get("text"):
+            try:
+                data = data.decode()
+            except UnicodeDecodeError:
+                raise ValueError(f"chunked result of request {request_id} is not valid UTF-8")
+
+        details = {key: value for key, value in result.details.items() if key not in (OPTION_CHUNK, "progress")}
+
+        return messages.Result(messages.ResultFields(request_id, args=[data], kwargs=result.kwargs, details=details))
+
+    def discard(self, request_id: int) -> None:
+        pending = self._pending.pop(request_id, None)
+        if pending is not None:
+            self._buffered -= pending.size
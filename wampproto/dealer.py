@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 
-from wampproto import idgen, types, messages
+from wampproto import chunking, idgen, types, messages, meta, uris
+from wampproto.messages import util
+from wampproto.uritable import URITable
 
 OPTION_RECEIVE_PROGRESS = "receive_progress"
 OPTION_PROGRESS = "progress"
@@ -21,12 +23,22 @@ class Registration:
     procedure: str
     registrants: dict[int, int]
     invocation_policy: str | None = None
+    uri_handle: int | None = None
 
 
 class Dealer:
-    def __init__(self):
+    def __init__(
+        self,
+        meta_events: meta.MetaEventQueue | None = None,
+        uri_table: URITable | None = None,
+        uri_check: str | None = util.URI_CHECK_LOOSE,
+    ):
+        self.meta_events = meta_events
+        self.uri_table = uri_table
+        self.uri_check = uri_check
         self.registrations_by_procedure: dict[str, Registration] = {}
         self.registrations_by_session: dict[int, dict[int, Registration]] = {}
+        self.registrations_by_id: dict[int, Registration] = {}
         self.pending_calls: dict[int, PendingInvocation] = {}
         self.call_to_invocation_id: dict[tuple[int, int], int] = {}
         self.sessions: dict[int, types.SessionDetails] = {}
@@ -49,15 +61,55 @@ class Dealer:
             registration = self.registrations_by_procedure[registration.procedure]
             if sid in registration.registrants:
                 del registration.registrants[sid]
+                self._emit(meta.REGISTRATION_ON_UNREGISTER, [sid, registration.id])
 
             if len(registration.registrants) == 0:
-                del self.registrations_by_procedure[registration.procedure]
+                self._remove_registration(sid, registration)
 
         del self.sessions[sid]
 
+    def _emit(self, topic: str, args: list):
+        if self.meta_events is not None:
+            self.meta_events.emit(topic, args)
+
+    def _remove_registration(self, session_id: int, registration: Registration):
+        del self.registrations_by_procedure[registration.procedure]
+        del self.registrations_by_id[registration.id]
+        if registration.uri_handle is not None:
+            self.uri_table.release(registration.uri_handle)
+
+        self._emit(meta.REGISTRATION_ON_DELETE, [session_id, registration.id])
+
+    def _is_valid_uri(self, uri: str) -> bool:
+        return self.uri_check is None or util.is_valid_uri(uri, self.uri_check)
+
     def has_registration(self, procedure: str) -> bool:
         return procedure in self.registrations_by_procedure
 
+    def get_registration(self, registration_id: int) -> Registration | None:
+        return self.registrations_by_id.get(registration_id)
+
+    def lookup_registration(self, procedure: str) -> int | None:
+        registration = self.registrations_by_procedure.get(procedure)
+        if registration is None:
+            return None
+
+        return registration.id
+
+    def match_registration(self, procedure: str) -> int | None:
+        # only exact matching is supported, so match is equivalent to lookup.
+        return self.lookup_registration(procedure)
+
+    def list_registrations(self) -> list[int]:
+        return list(self.registrations_by_id.keys())
+
+    def count_callees(self, registration_id: int) -> int | None:
+        registration = self.registrations_by_id.get(registration_id)
+        if registration is None:
+            return None
+
+        return len(registration.registrants)
+
     def _add_call(
         self, call_id: int, invocation_id: int, caller_id: int, callee_id: int, progress: bool, receive_progress: bool
     ) -> None:
@@ -66,6 +118,10 @@ class Dealer:
 
     def receive_message(self, session_id: int, message: messages.Message) -> types.MessageWithRecipient:
         if isinstance(message, messages.Call):
+            if not self._is_valid_uri(message.procedure):
+                err = messages.Error(messages.ErrorFields(message.TYPE, message.request_id, uris.INVALID_URI))
+                return types.MessageWithRecipient(err, session_id)
+
             registration = self.registrations_by_procedure.get(message.procedure)
             if registration is None:
                 err = messages.Error(
@@ -126,6 +182,10 @@ class Dealer:
                 del self.pending_calls[message.request_id]
                 del self.call_to_invocation_id[(invocation.caller_id, invocation.request_id)]
 
+            chunk = message.options.get(chunking.OPTION_CHUNK)
+            if chunk is not None:
+                details[chunking.OPTION_CHUNK] = chunk
+
             result = messages.Result(
                 messages.ResultFields(
                     request_id=invocation.request_id, args=message.args, kwargs=message.kwargs, details=details
@@ -136,11 +196,33 @@ class Dealer:
             if session_id not in self.registrations_by_session:
                 raise ValueError(f"cannot register, session {session_id} doesn't exist")
 
+            # only exact matching is implemented, prefix or wildcard registrations would never match
+            if message.options.get("match", meta.MATCH_EXACT) != meta.MATCH_EXACT:
+                err = messages.Error(messages.ErrorFields(message.TYPE, message.request_id, uris.INVALID_ARGUMENT))
+                return types.MessageWithRecipient(err, session_id)
+
+            if not self._is_valid_uri(message.procedure):
+                err = messages.Error(messages.ErrorFields(message.TYPE, message.request_id, uris.INVALID_URI))
+                return types.MessageWithRecipient(err, session_id)
+
             registration = self.registrations_by_procedure.get(message.procedure)
             if registration is None:
                 registration = Registration(self.idgen.next(), message.procedure, {session_id: session_id})
-                self.registrations_by_procedure[message.procedure] = registration
+                if self.uri_table is not None:
+                    registration.uri_handle = self.uri_table.intern(message.procedure)
+                    registration.procedure = self.uri_table.uri(registration.uri_handle)
+
+                self.registrations_by_procedure[registration.procedure] = registration
+                self.registrations_by_id[registration.id] = registration
                 self.registrations_by_session[session_id][registration.id] = registration
+                self._emit(
+                    meta.REGISTRATION_ON_CREATE,
+                    [
+                        session_id,
+                        {"id": registration.id, "uri": registration.procedure, "match": meta.MATCH_EXACT},
+                    ],
+                )
+                self._emit(meta.REGISTRATION_ON_REGISTER, [session_id, registration.id])
             else:
                 # TODO: implement shared registrations.
                 registered = messages.Error(
@@ -168,9 +250,10 @@ class Dealer:
             except KeyError:
                 raise ValueError(f"cannot unregister, session {session_id} haven't registered for {registration.id}")
 
+            self._emit(meta.REGISTRATION_ON_UNREGISTER, [session_id, registration.id])
             if len(registration.registrants) == 0:
                 del registrations[message.registration_id]
-                del self.registrations_by_procedure[registration.procedure]
+                self._remove_registration(session_id, registration)
 
             self.registrations_by_session[session_id] = registrations
 
@@ -0,0 +1,84 @@
+import os
+import threading
+import weakref
+
+
+class EntropyPool:
+    def __init__(self, size: int = 4096):
+        super().__init__()
+        if size < 1:
+            raise ValueError("size must be at least 1")
+
+        self._size = size
+        self._buffer = b""
+        self._offset = 0
+        self._lock = threading.Lock()
+        _pools.add(self)
+
+    def reset(self) -> None:
+        self._buffer = b""
+        self._offset = 0
+
+    def _after_fork(self) -> None:
+        # the lock may have been held by a thread of the parent that doesn't exist in the child
+        self._lock = threading.Lock()
+        self.reset()
+
+    def read(self, n: int) -> bytes:
+        if n > self._size:
+            return os.urandom(n)
+
+        with self._lock:
+            if self._offset + n > len(self._buffer):
+                self._buffer = os.urandom(self._size)
+                self._offset = 0
+
+            data = self._buffer[self._offset : self._offset + n]
+            self._offset += n
+
+        return data
+
+    def read_hex(self, n: int) -> str:
+        return self.read(n).hex()
+
+    def randbelow(self, n: int) -> int:
+        if n < 1:
+            raise ValueError("n must be at least 1")
+
+        bits = n.bit_length()
+        length = (bits + 7) // 8
+        shift = length * 8 - bits
+        # rejection sampling keeps the distribution uniform
+        while True:
+            value = int.from_bytes(self.read(length), "big") >> shift
+            if value < n:
+                return value
+
+
+# a forked child must never hand out the same bytes as its parent. One hook resets all
+# live pools, the weak set doesn't keep pools alive.
+_pools: weakref.WeakSet[EntropyPool] = weakref.WeakSet()
+
+
+def _reset_pools_after_fork() -> None:
+    for pool in list(_pools):
+        pool._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+DEFAULT_POOL = EntropyPool()
+
+
+def token_bytes(n: int) -> bytes:
+    return DEFAULT_POOL.read(n)
+
+
+def token_hex(n: int) -> str:
+    return DEFAULT_POOL.read_hex(n)
+
+
+def randbelow(n: int) -> int:
+    return DEFAULT_POOL.randbelow(n)
@@ -1,10 +1,16 @@
-import random
+from wampproto import entropy
 
 ID_MAX = 1 << 53
 
 
-def generate_session_id():
-    return random.randint(1, ID_MAX)
+def generate_global_id() -> int:
+    # global scope IDs must be drawn randomly from a uniform distribution over [1, 2^53]
+    # https://wamp-proto.org/wamp_bp_latest_ietf.html#section-2.1.2
+    return entropy.randbelow(ID_MAX) + 1
+
+
+def generate_session_id() -> int:
+    return generate_global_id()
 
 
 class SessionScopeIDGenerator:
@@ -18,3 +24,83 @@ class SessionScopeIDGenerator:
 
         self.id += 1
         return self.id
+
+
+class ShardScopeIDGenerator:
+    def __init__(self, shard: int = 0, shards: int = 1):
+        super().__init__()
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+
+        if shard < 0 or shard >= shards:
+            raise ValueError(f"shard must be between 0 and {shards - 1}")
+
+        # sequential like SessionScopeIDGenerator but striding over the IDs of the shard,
+        # so the shard that issued an ID can be told from the ID alone.
+        self._shard = shard
+        self._shards = shards
+        self.id: int = shard + 1 - shards
+
+    @property
+    def shard(self) -> int:
+        return self._shard
+
+    @property
+    def shards(self) -> int:
+        return self._shards
+
+    def next(self) -> int:
+        self.id += self._shards
+        if self.id > ID_MAX:
+            self.id = self._shard + 1
+
+        return self.id
+
+    def owner(self, id_: int) -> int:
+        return (id_ - 1) % self._shards
+
+
+class RouterScopeIDGenerator:
+    def __init__(self, worker_id: int = 0, workers: int = 1):
+        super().__init__()
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        if worker_id < 0 or worker_id >= workers:
+            raise ValueError(f"worker_id must be between 0 and {workers - 1}")
+
+        self._worker_id = worker_id
+        self._workers = workers
+        # each worker owns the IDs congruent to its worker_id, so sharded routers never collide
+        self._slots = ID_MAX // workers
+        self._live: set[int] = set()
+
+    @property
+    def worker_id(self) -> int:
+        return self._worker_id
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def next(self) -> int:
+        if len(self._live) == self._slots:
+            raise ValueError("session ID space exhausted")
+
+        while True:
+            session_id = entropy.randbelow(self._slots) * self._workers + self._worker_id + 1
+            if session_id not in self._live:
+                self._live.add(session_id)
+                return session_id
+
+    def release(self, session_id: int) -> None:
+        self._live.discard(session_id)
+
+    def is_live(self, session_id: int) -> bool:
+        return session_id in self._live
+
+    def owner(self, session_id: int) -> int:
+        return (session_id - 1) % self._workers
+
+    def __len__(self) -> int:
+        return len(self._live)
@@ -24,10 +24,12 @@ class Joiner:
         realm: str,
         serializer: serializers.Serializer = serializers.JSONSerializer(),
         authenticator: auth.IClientAuthenticator = None,
+        resume_ticket: str | None = None,
     ):
         self._realm = realm
         self._serializer = serializer
         self._authenticator = authenticator if authenticator is not None else auth.AnonymousAuthenticator("", {})
+        self._resume_ticket = resume_ticket
         self._state = Joiner.STATE_NONE
 
         self._session_details: SessionDetails = None
@@ -36,13 +38,17 @@ class Joiner:
         if roles is None:
             roles = CLIENT_ROLES
 
+        authextra = self._authenticator.auth_extra
+        if self._resume_ticket is not None:
+            authextra = {**(authextra or {}), auth.RESUME_TICKET: self._resume_ticket}
+
         hello = messages.Hello(
             HelloFields(
                 realm=self._realm,
                 roles=roles,
                 authid=self._authenticator.authid,
                 authmethods=[self._authenticator.auth_method],
-                authextra=self._authenticator.auth_extra,
+                authextra=authextra,
             )
         )
 
@@ -62,6 +68,9 @@ class Joiner:
                 raise ValueError("received welcome when it was not expected")
 
             self._session_details = SessionDetails(msg.session_id, self._realm, msg.authid, msg.authrole)
+            if msg.authextra:
+                self._resume_ticket = msg.authextra.get(auth.RESUME_TICKET, self._resume_ticket)
+
             self._state = Joiner.STATE_JOINED
         elif isinstance(msg, messages.Challenge):
             if self._state != Joiner.STATE_HELLO_SENT:
@@ -75,6 +84,9 @@ class Joiner:
         else:
             raise ValueError("received unknown message")
 
+    def get_resume_ticket(self) -> str | None:
+        return self._resume_ticket
+
     def get_session_details(self) -> SessionDetails:
         if self._session_details is None:
             raise ValueError("session is not setup yet")
@@ -1,3 +1,5 @@
+import functools
+import re
 from enum import Enum
 from typing import Any
 
@@ -12,6 +14,16 @@ STRING = "string"
 LIST = "list"
 DICT = "dict"
 
+URI_CHECK_LOOSE = "loose"
+URI_CHECK_STRICT = "strict"
+
+# https://wamp-proto.org/wamp_bp_latest_ietf.html#name-uris
+# empty URI components are only allowed in wildcard patterns.
+_LOOSE_URI = re.compile(r"^([^\s.#]+\.)*([^\s.#]+)$")
+_LOOSE_URI_EMPTY = re.compile(r"^(([^\s.#]+\.)|\.)*([^\s.#]+)?$")
+_STRICT_URI = re.compile(r"^([0-9a-z_]+\.)*([0-9a-z_]+)$")
+_STRICT_URI_EMPTY = re.compile(r"^(([0-9a-z_]+\.)|\.)*([0-9a-z_]+)?$")
+
 
 class AllowedRoles(str, Enum):
     CALLEE = "callee"
@@ -36,23 +48,41 @@ def validate_realm_or_raise(realm: str, error_msg: str) -> str:
     return realm
 
 
-def validate_uri_or_raise(uri: str, error_msg: str) -> str:
+@functools.lru_cache(maxsize=4096)
+def is_valid_uri(uri: str, mode: str = URI_CHECK_LOOSE, allow_empty: bool = False) -> bool:
+    if mode == URI_CHECK_STRICT:
+        pattern = _STRICT_URI_EMPTY if allow_empty else _STRICT_URI
+    elif mode == URI_CHECK_LOOSE:
+        pattern = _LOOSE_URI_EMPTY if allow_empty else _LOOSE_URI
+    else:
+        raise ValueError(f"unknown uri check mode '{mode}'")
+
+    return pattern.match(uri) is not None
+
+
+def validate_uri_or_raise(uri: str, error_msg: str, mode: str = URI_CHECK_LOOSE, allow_empty: bool = False) -> str:
     if uri is None:
         raise exceptions.InvalidUriError(f"uri cannot be null for {error_msg}")
 
     if not isinstance(uri, str):
         raise exceptions.InvalidUriError(f"uri must be of type string for {error_msg}")
 
+    if not is_valid_uri(uri, mode, allow_empty):
+        raise exceptions.InvalidUriError(f"invalid uri '{uri}' for {error_msg}")
+
     return uri
 
 
-def validate_procedure_or_raise(procedure: str, error_msg: str) -> str:
+def validate_procedure_or_raise(procedure: str, error_msg: str, mode: str = URI_CHECK_LOOSE) -> str:
     if procedure is None:
         raise exceptions.InvalidUriError(f"procedure cannot be null for {error_msg}")
 
     if not isinstance(procedure, str):
         raise exceptions.InvalidUriError(f"procedure must be of type string for {error_msg}")
 
+    if not is_valid_uri(procedure, mode):
+        raise exceptions.InvalidUriError(f"invalid procedure '{procedure}' for {error_msg}")
+
     return procedure
 
 
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+from typing import Any, Callable, TYPE_CHECKING
+
+from wampproto import messages, types, uris
+from wampproto.exception import ApplicationError
+
+if TYPE_CHECKING:
+    from wampproto.broker import Broker
+    from wampproto.dealer import Dealer
+
+MATCH_EXACT = "exact"
+MATCH_PREFIX = "prefix"
+MATCH_WILDCARD = "wildcard"
+
+SESSION_COUNT = "wamp.session.count"
+
+SUBSCRIPTION_LIST = "wamp.subscription.list"
+SUBSCRIPTION_LOOKUP = "wamp.subscription.lookup"
+SUBSCRIPTION_MATCH = "wamp.subscription.match"
+SUBSCRIPTION_GET = "wamp.subscription.get"
+SUBSCRIPTION_LIST_SUBSCRIBERS = "wamp.subscription.list_subscribers"
+SUBSCRIPTION_COUNT_SUBSCRIBERS = "wamp.subscription.count_subscribers"
+
+REGISTRATION_LIST = "wamp.registration.list"
+REGISTRATION_LOOKUP = "wamp.registration.lookup"
+REGISTRATION_MATCH = "wamp.registration.match"
+REGISTRATION_GET = "wamp.registration.get"
+REGISTRATION_LIST_CALLEES = "wamp.registration.list_callees"
+REGISTRATION_COUNT_CALLEES = "wamp.registration.count_callees"
+
+SESSION_ON_JOIN = "wamp.session.on_join"
+SESSION_ON_LEAVE = "wamp.session.on_leave"
+
+SUBSCRIPTION_ON_CREATE = "wamp.subscription.on_create"
+SUBSCRIPTION_ON_SUBSCRIBE = "wamp.subscription.on_subscribe"
+SUBSCRIPTION_ON_UNSUBSCRIBE = "wamp.subscription.on_unsubscribe"
+SUBSCRIPTION_ON_DELETE = "wamp.subscription.on_delete"
+
+REGISTRATION_ON_CREATE = "wamp.registration.on_create"
+REGISTRATION_ON_REGISTER = "wamp.registration.on_register"
+REGISTRATION_ON_UNREGISTER = "wamp.registration.on_unregister"
+REGISTRATION_ON_DELETE = "wamp.registration.on_delete"
+
+DETAIL_BATCHED = "batched"
+
+
+def _arg(args: list[Any] | None, index: int, type_: type, procedure: str) -> Any:
+    if args is None or len(args) <= index:
+        raise ApplicationError(uris.INVALID_ARGUMENT, [f"{procedure} expects at least {index + 1} argument(s)"], {})
+
+    value = args[index]
+    if not isinstance(value, type_):
+        raise ApplicationError(
+            uris.INVALID_ARGUMENT, [f"argument {index} of {procedure} must be of type {type_.__name__}"], {}
+        )
+
+    return value
+
+
+def _lookup_match(options: dict[str, Any]) -> str:
+    return options.get("match", MATCH_EXACT) if isinstance(options, dict) else MATCH_EXACT
+
+
+class MetaEvent:
+    def __init__(self, topic: str, args: list[Any], batched: bool = False):
+        super().__init__()
+        self.topic = topic
+        self.args = args
+        self.batched = batched
+
+
+# collects meta events emitted by Broker and Dealer until they are flushed. In batch
+# mode, events for the same topic emitted within one tick (between two flushes) are
+# coalesced into a single event whose args is the list of the individual events' args.
+# Events keep their order within a topic and batches are flushed in the order their
+# first event arrived, but the order across topics is lost, e.g. a session's on_leave
+# may be flushed before the on_subscribe it emitted earlier in the same tick. Use the
+# unbatched mode when subscribers need the exact order of events across topics.
+class MetaEventQueue:
+    def __init__(self, batch: bool = False):
+        super().__init__()
+        self._batch = batch
+        self._events: list[MetaEvent] = []
+        self._batches: dict[str, list[list[Any]]] = {}
+
+    @property
+    def batch(self) -> bool:
+        return self._batch
+
+    def emit(self, topic: str, args: list[Any]) -> None:
+        if not self._batch:
+            self._events.append(MetaEvent(topic, args))
+            return
+
+        batch = self._batches.get(topic)
+        if batch is None:
+            self._batches[topic] = [args]
+        else:
+            batch.append(args)
+
+    def pending(self) -> int:
+        return len(self._events) + len(self._batches)
+
+    def pop(self) -> list[MetaEvent]:
+        if not self._batch:
+            events, self._events = self._events, []
+            return events
+
+        batches, self._batches = self._batches, {}
+        return [MetaEvent(topic, batch, batched=True) for topic, batch in batches.items()]
+
+
+def session_details(details: types.SessionDetails) -> dict[str, Any]:
+    return {
+        "session": details.session_id,
+        "realm": details.realm,
+        "authid": details.authid,
+        "authrole": details.authrole,
+    }
+
+
+class MetaAPI:
+    def __init__(self, broker: Broker, dealer: Dealer):
+        super().__init__()
+        self._broker = broker
+        self._dealer = dealer
+
+        self._procedures: dict[str, Callable[[list[Any] | None], list[Any]]] = {
+            SESSION_COUNT: self._session_count,
+            SUBSCRIPTION_LIST: self._subscription_list,
+            SUBSCRIPTION_LOOKUP: self._subscription_lookup,
+            SUBSCRIPTION_MATCH: self._subscription_match,
+            SUBSCRIPTION_GET: self._subscription_get,
+            SUBSCRIPTION_LIST_SUBSCRIBERS: self._subscription_list_subscribers,
+            SUBSCRIPTION_COUNT_SUBSCRIBERS: self._subscription_count_subscribers,
+            REGISTRATION_LIST: self._registration_list,
+            REGISTRATION_LOOKUP: self._registration_lookup,
+            REGISTRATION_MATCH: self._registration_match,
+            REGISTRATION_GET: self._registration_get,
+            REGISTRATION_LIST_CALLEES: self._registration_list_callees,
+            REGISTRATION_COUNT_CALLEES: self._registration_count_callees,
+        }
+
+    def has_procedure(self, procedure: str) -> bool:
+        return procedure in self._procedures
+
+    def receive_call(self, session_id: int, message: messages.Call) -> types.MessageWithRecipient:
+        handler = self._procedures.get(message.procedure)
+        if handler is None:
+            err = messages.Error(messages.ErrorFields(message.TYPE, message.request_id, uris.NO_SUCH_PROCEDURE))
+            return types.MessageWithRecipient(err, session_id)
+
+        try:
+            result = handler(message.args)
+        except ApplicationError as e:
+            err = messages.Error(
+                messages.ErrorFields(message.TYPE, message.request_id, e.message, args=list(e.args), kwargs=e.kwargs)
+            )
+            return types.MessageWithRecipient(err, session_id)
+
+        return types.MessageWithRecipient(
+            messages.Result(messages.ResultFields(message.request_id, result)), session_id
+        )
+
+    def _session_count(self, args: list[Any] | None) -> list[Any]:
+        authroles = None
+        if args:
+            authroles = _arg(args, 0, list, SESSION_COUNT)
+
+        return [self._broker.session_count(authroles)]
+
+    def _subscription_list(self, args: list[Any] | None) -> list[Any]:
+        return [{MATCH_EXACT: self._broker.list_subscriptions(), MATCH_PREFIX: [], MATCH_WILDCARD: []}]
+
+    def _subscription_lookup(self, args: list[Any] | None) -> list[Any]:
+        topic = _arg(args, 0, str, SUBSCRIPTION_LOOKUP)
+        if len(args) > 1 and _lookup_match(args[1]) != MATCH_EXACT:
+            return [None]
+
+        return [self._broker.lookup_subscription(topic)]
+
+    def _subscription_match(self, args: list[Any] | None) -> list[Any]:
+        topic = _arg(args, 0, str, SUBSCRIPTION_MATCH)
+        matches = self._broker.match_subscriptions(topic)
+
+        return [matches if len(matches) != 0 else None]
+
+    def _subscription(self, args: list[Any] | None, procedure: str):
+        subscription_id = _arg(args, 0, int, procedure)
+        subscription = self._broker.get_subscription(subscription_id)
+        if subscription is None:
+            raise ApplicationError(uris.NO_SUCH_SUBSCRIPTION, [], {})
+
+        return subscription
+
+    def _subscription_get(self, args: list[Any] | None) -> list[Any]:
+        subscription = self._subscription(args, SUBSCRIPTION_GET)
+        return [{"id": subscription.id, "uri": subscription.topic, "match": MATCH_EXACT}]
+
+    def _subscription_list_subscribers(self, args: list[Any] | None) -> list[Any]:
+        subscription = self._subscription(args, SUBSCRIPTION_LIST_SUBSCRIBERS)
+        return [list(subscription.recipients())]
+
+    def _subscription_count_subscribers(self, args: list[Any] | None) -> list[Any]:
+        subscription = self._subscription(args, SUBSCRIPTION_COUNT_SUBSCRIBERS)
+        return [self._broker.count_subscribers(subscription.id)]
+
+    def _registration_list(self, args: list[Any] | None) -> list[Any]:
+        return [{MATCH_EXACT: self._dealer.list_registrations(), MATCH_PREFIX: [], MATCH_WILDCARD: []}]
+
+    def _registration_lookup(self, args: list[Any] | None) -> list[Any]:
+        procedure = _arg(args, 0, str, REGISTRATION_LOOKUP)
+        if len(args) > 1 and _lookup_match(args[1]) != MATCH_EXACT:
+            return [None]
+
+        return [self._dealer.lookup_registration(procedure)]
+
+    def _registration_match(self, args: list[Any] | None) -> list[Any]:
+        procedure = _arg(args, 0, str, REGISTRATION_MATCH)
+        return [self._dealer.match_registration(procedure)]
+
+    def _registration(self, args: list[Any] | None, procedure: str):
+        registration_id = _arg(args, 0, int, procedure)
+        registration = self._dealer.get_registration(registration_id)
+        if registration is None:
+            raise ApplicationError(uris.NO_SUCH_REGISTRATION, [], {})
+
+        return registration
+
+    def _registration_get(self, args: list[Any] | None) -> list[Any]:
+        registration = self._registration(args, REGISTRATION_GET)
+        return [
+            {
+                "id": registration.id,
+                "uri": registration.procedure,
+                "match": MATCH_EXACT,
+                "invoke": registration.invocation_policy or "single",
+            }
+        ]
+
+    def _registration_list_callees(self, args: list[Any] | None) -> list[Any]:
+        registration = self._registration(args, REGISTRATION_LIST_CALLEES)
+        return [list(registration.registrants.keys())]
+
+    def _registration_count_callees(self, args: list[Any] | None) -> list[Any]:
+        registration = self._registration(args, REGISTRATION_COUNT_CALLEES)
+        return [self._dealer.count_callees(registration.id)]
@@ -0,0 +1,180 @@
+import time
+from collections import deque
+from typing import Callable, Hashable
+
+from wampproto import messages
+
+DEFAULT_MAX_BYTES = 2**16
+DEFAULT_MAX_COUNT = 64
+DEFAULT_MAX_DELAY = 0.001
+
+
+class OutboundQueue:
+    # collects serialized messages so they can be written with one vectored write. push()
+    # reports when a byte or count threshold is reached, deadline() tells the event loop
+    # when to flush at the latest so queued messages are never delayed more than max_delay.
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_count: int = DEFAULT_MAX_COUNT,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        framer: Callable[[list[bytes | str]], list[bytes]] | None = None,
+        now: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        if max_bytes < 1 or max_count < 1 or max_delay < 0:
+            raise ValueError("max_bytes and max_count must be at least 1 and max_delay not negative")
+
+        self._max_bytes = max_bytes
+        self._max_count = max_count
+        self._max_delay = max_delay
+        self._framer = framer
+        self._now = now
+
+        self._items: list[bytes | str] = []
+        self._size = 0
+        self._first_at: float | None = None
+
+    def push(self, data: bytes | str) -> bool:
+        # returns True if the queue should be flushed right away
+        if not self._items:
+            self._first_at = self._now()
+
+        self._items.append(data)
+        # JSON messages are str, their size on the wire is that of their UTF-8 encoding.
+        # isascii() is O(1) for str, so only non-ASCII messages are encoded to be measured.
+        if isinstance(data, str) and not data.isascii():
+            self._size += len(data.encode())
+        else:
+            self._size += len(data)
+        return self._size >= self._max_bytes or len(self._items) >= self._max_count
+
+    def deadline(self) -> float | None:
+        if self._first_at is None:
+            return None
+
+        return self._first_at + self._max_delay
+
+    def due(self) -> bool:
+        return bool(self._items) and (
+            self._size >= self._max_bytes
+            or len(self._items) >= self._max_count
+            or self._now() >= self._first_at + self._max_delay
+        )
+
+    def flush(self) -> list[bytes | str]:
+        # returns the buffers to write, framed by the transport's framer if one was given
+        items = self._items
+        self._items = []
+        self._size = 0
+        self._first_at = None
+
+        if self._framer is not None and items:
+            return self._framer(items)
+
+        return items
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_NEWEST = "drop_newest"
+POLICY_DISCONNECT = "disconnect"
+POLICY_CONFLATE = "conflate"
+
+POLICIES = (POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_DISCONNECT, POLICY_CONFLATE)
+
+
+class SubscriberQueue:
+    # bounded queue of events waiting to be delivered to one session. Once max_size events
+    # are pending the policy decides what happens to new ones:
+    #   drop_oldest: the oldest pending event is dropped
+    #   drop_newest: the new event is dropped
+    #   disconnect: the new event is dropped and the queue is marked as overflowed, the
+    #     router is expected to disconnect the session
+    #   conflate: the new event replaces the pending one of the same subscription, if there
+    #     is none the oldest pending event is dropped
+    # A max_size of None makes the queue unbounded, events are then never dropped.
+    def __init__(self, max_size: int | None, policy: str = POLICY_DROP_OLDEST):
+        super().__init__()
+        if max_size is not None and max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy '{policy}'")
+
+        self._max_size = max_size
+        self._policy = policy
+        # entries are [event, conflation key] lists so a pending event can be replaced in place
+        self._entries: deque[list] = deque()
+        self._by_subscription: dict[int, list] = {}
+        self._by_key: dict[Hashable, list] = {}
+        self.dropped = 0
+        self.conflated = 0
+        self.overflowed = False
+
+    def push(self, event: messages.Event, conflation_key: Hashable | None = None) -> bool:
+        # returns False if an event had to be dropped. An event with a conflation key replaces
+        # the pending event with the same key, so only the latest one is delivered.
+        if conflation_key is not None:
+            entry = self._by_key.get(conflation_key)
+            if entry is not None:
+                entry[0] = event
+                self.conflated += 1
+                return True
+
+        if self._max_size is None or len(self._entries) < self._max_size:
+            self._append(event, conflation_key)
+            return True
+
+        self.dropped += 1
+        if self._policy == POLICY_CONFLATE:
+            entry = self._by_subscription.get(event.subscription_id)
+            if entry is not None:
+                self._forget_key(entry)
+                entry[0] = event
+                entry[1] = conflation_key
+                if conflation_key is not None:
+                    self._by_key[conflation_key] = entry
+
+                return False
+
+        if self._policy in (POLICY_DROP_OLDEST, POLICY_CONFLATE):
+            self._pop_entry()
+            self._append(event, conflation_key)
+        elif self._policy == POLICY_DISCONNECT:
+            self.overflowed = True
+
+        return False
+
+    def _append(self, event: messages.Event, conflation_key: Hashable | None) -> None:
+        entry = [event, conflation_key]
+        self._entries.append(entry)
+        self._by_subscription[event.subscription_id] = entry
+        if conflation_key is not None:
+            self._by_key[conflation_key] = entry
+
+    def _forget_key(self, entry: list) -> None:
+        if entry[1] is not None and self._by_key.get(entry[1]) is entry:
+            del self._by_key[entry[1]]
+
+    def _pop_entry(self) -> list:
+        entry = self._entries.popleft()
+        subscription_id = entry[0].subscription_id
+        if self._by_subscription.get(subscription_id) is entry:
+            del self._by_subscription[subscription_id]
+
+        self._forget_key(entry)
+        return entry
+
+    def pop(self, limit: int | None = None) -> list[messages.Event]:
+        count = len(self._entries) if limit is None else min(limit, len(self._entries))
+        return [self._pop_entry()[0] for _ in range(count)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -12,7 +12,7 @@ class JSONSerializer(serializers.Serializer):
 
     def deserialize(self, data: str) -> messages.Message:
         wamp_message = json.loads(data)
-        return to_message(wamp_message)
+        return to_message(wamp_message, self.uri_table)
 
     def static(self) -> bool:
         return False
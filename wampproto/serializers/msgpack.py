@@ -12,7 +12,7 @@ class MsgPackSerializer(serializers.Serializer):
 
     def deserialize(self, data: bytes) -> messages.Message:
         wamp_message = msgpack.loads(data)
-        return to_message(wamp_message)
+        return to_message(wamp_message, self.uri_table)
 
     def static(self) -> bool:
         return False
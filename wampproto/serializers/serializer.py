@@ -1,9 +1,23 @@
 from wampproto import messages
+from wampproto.uritable import URITable
 
 NONE_SERIALIZER_ID = 0
 
+# position of the topic/procedure/error URI in the wire format of messages carrying one.
+URI_INDEX = {
+    messages.Subscribe.TYPE: 3,
+    messages.Publish.TYPE: 3,
+    messages.Call.TYPE: 3,
+    messages.Register.TYPE: 3,
+    messages.Error.TYPE: 4,
+}
+
 
 class Serializer:
+    def __init__(self, uri_table: URITable | None = None):
+        super().__init__()
+        self.uri_table = uri_table
+
     def serialize(self, message: messages.Message) -> bytes | str:
         raise NotImplementedError()
 
@@ -14,7 +28,7 @@ class Serializer:
         raise NotImplementedError()
 
 
-def to_message(message: list) -> messages.Message:
+def to_message(message: list, uri_table: URITable | None = None) -> messages.Message:
     if not isinstance(message, list):
         raise TypeError(f"invalid type '{type(message)}', expected a list")
 
@@ -22,6 +36,11 @@ def to_message(message: list) -> messages.Message:
     if not isinstance(message_type, int):
         raise TypeError(f"invalid message type '{type(message[0])}', expected an integer")
 
+    if uri_table is not None:
+        index = URI_INDEX.get(message_type)
+        if index is not None and len(message) > index and isinstance(message[index], str):
+            message[index] = uri_table.canonical(message[index])
+
     match message_type:
         case messages.Hello.TYPE:
             return messages.Hello.parse(message)
@@ -0,0 +1,212 @@
+import functools
+import json
+from typing import Any
+
+import cbor2
+import msgpack
+
+from wampproto import messages
+from wampproto.serializers.serializer import Serializer
+from wampproto.serializers.json import JSONSerializer
+from wampproto.serializers.cbor import CBORSerializer
+from wampproto.serializers.msgpack import MsgPackSerializer
+
+
+# encoders produce the same output as the serializers but allow messages to be assembled
+# from already encoded parts, so the constant parts of a message are only encoded once.
+class JSONTemplateEncoder:
+    def value(self, value: Any) -> str:
+        return json.dumps(value)
+
+    def integer(self, value: int) -> str:
+        return str(value)
+
+    def array_header(self, n: int) -> str:
+        return "["
+
+    def separator(self) -> str:
+        return ", "
+
+    def array_end(self) -> str:
+        return "]"
+
+    def prepend(self, encoded_map: str, pair: tuple[str, str]) -> str:
+        key, value = pair
+        if encoded_map == "{}":
+            return f"{{{key}: {value}}}"
+
+        return f"{{{key}: {value}, {encoded_map[1:]}"
+
+
+class MsgPackTemplateEncoder:
+    def value(self, value: Any) -> bytes:
+        return msgpack.dumps(value)
+
+    def integer(self, value: int) -> bytes:
+        return msgpack.dumps(value)
+
+    @staticmethod
+    def _header(fix: int, length16: int, length32: int, n: int) -> bytes:
+        if n < 16:
+            return bytes([fix | n])
+        elif n < 1 << 16:
+            return bytes([length16]) + n.to_bytes(2, "big")
+
+        return bytes([length32]) + n.to_bytes(4, "big")
+
+    def array_header(self, n: int) -> bytes:
+        return self._header(0x90, 0xDC, 0xDD, n)
+
+    def separator(self) -> bytes:
+        return b""
+
+    def array_end(self) -> bytes:
+        return b""
+
+    def prepend(self, encoded_map: bytes, pair: tuple[bytes, bytes]) -> bytes:
+        first = encoded_map[0]
+        if first & 0xF0 == 0x80:
+            n, offset = first & 0x0F, 1
+        elif first == 0xDE:
+            n, offset = int.from_bytes(encoded_map[1:3], "big"), 3
+        else:
+            n, offset = int.from_bytes(encoded_map[1:5], "big"), 5
+
+        return self._header(0x80, 0xDE, 0xDF, n + 1) + pair[0] + pair[1] + encoded_map[offset:]
+
+
+class CBORTemplateEncoder:
+    MAJOR_ARRAY = 4
+    MAJOR_MAP = 5
+
+    def value(self, value: Any) -> bytes:
+        return cbor2.dumps(value)
+
+    def integer(self, value: int) -> bytes:
+        return cbor2.dumps(value)
+
+    @staticmethod
+    def _header(major: int, n: int) -> bytes:
+        if n < 24:
+            return bytes([major << 5 | n])
+        elif n < 1 << 8:
+            return bytes([major << 5 | 24, n])
+        elif n < 1 << 16:
+            return bytes([major << 5 | 25]) + n.to_bytes(2, "big")
+        elif n < 1 << 32:
+            return bytes([major << 5 | 26]) + n.to_bytes(4, "big")
+
+        return bytes([major << 5 | 27]) + n.to_bytes(8, "big")
+
+    def array_header(self, n: int) -> bytes:
+        return self._header(self.MAJOR_ARRAY, n)
+
+    def separator(self) -> bytes:
+        return b""
+
+    def array_end(self) -> bytes:
+        return b""
+
+    def prepend(self, encoded_map: bytes, pair: tuple[bytes, bytes]) -> bytes:
+        info = encoded_map[0] & 0x1F
+        if info < 24:
+            n, offset = info, 1
+        else:
+            offset = 1 + (1 << (info - 24))
+            n = int.from_bytes(encoded_map[1:offset], "big")
+
+        return self._header(self.MAJOR_MAP, n + 1) + pair[0] + pair[1] + encoded_map[offset:]
+
+
+TemplateEncoder = JSONTemplateEncoder | MsgPackTemplateEncoder | CBORTemplateEncoder
+
+
+_ENCODERS = {
+    JSONSerializer: JSONTemplateEncoder,
+    MsgPackSerializer: MsgPackTemplateEncoder,
+    CBORSerializer: CBORTemplateEncoder,
+}
+
+
+def get_template_encoder(serializer: Serializer) -> TemplateEncoder | None:
+    # subclasses may change the wire format, so only exact types are supported.
+    encoder_class = _ENCODERS.get(type(serializer))
+    if encoder_class is None:
+        return None
+
+    return encoder_class()
+
+
+class HandshakeTemplates:
+    def __init__(self, encoder: TemplateEncoder, roles: dict[str, Any] | bytes | str, maxsize: int = 1024):
+        super().__init__()
+        self._encoder = encoder
+        self._separator = encoder.separator()
+        self._end = encoder.array_end()
+        self._welcome_prefix = encoder.array_header(3) + encoder.value(messages.Welcome.TYPE) + self._separator
+        # roles may be passed already encoded
+        encoded_roles = roles if isinstance(roles, (bytes, str)) else encoder.value(roles)
+        self._roles = (encoder.value("roles"), encoded_roles)
+        # authid, authrole and authmethod repeat across sessions, so everything after the session ID is cached.
+        self._welcome_suffix = functools.lru_cache(maxsize)(self._encode_welcome_suffix)
+        self._challenge = functools.lru_cache(maxsize)(self._encode_challenge)
+
+    def _encode_welcome_suffix(
+        self, authid: str | None, authrole: str | None, authmethod: str | None, authextra: bool
+    ) -> bytes | str:
+        return self._encode_details(authid, authrole, authmethod, {} if authextra else None)
+
+    def _encode_details(
+        self, authid: str | None, authrole: str | None, authmethod: str | None, authextra: dict[str, Any] | None
+    ) -> bytes | str:
+        details: dict[str, Any] = {}
+        if authid is not None:
+            details["authid"] = authid
+
+        if authrole is not None:
+            details["authrole"] = authrole
+
+        if authmethod is not None:
+            details["authmethod"] = authmethod
+
+        if authextra is not None:
+            details["authextra"] = authextra
+
+        encoder = self._encoder
+        return self._separator + encoder.prepend(encoder.value(details), self._roles) + self._end
+
+    def _encode_challenge(self, authmethod: str) -> bytes | str:
+        return self._encoder.value([messages.Challenge.TYPE, authmethod, {}])
+
+    def welcome(self, msg: messages.Welcome) -> bytes | str:
+        authextra = msg.authextra
+        if authextra:
+            suffix = self._encode_details(msg.authid, msg.authrole, msg.authmethod, authextra)
+        else:
+            suffix = self._welcome_suffix(msg.authid, msg.authrole, msg.authmethod, authextra is not None)
+
+        return self._welcome_prefix + self._encoder.integer(msg.session_id) + suffix
+
+    def challenge(self, msg: messages.Challenge) -> bytes | str:
+        if msg.extra:
+            return self._encoder.value(msg.marshal())
+
+        return self._challenge(msg.authmethod)
+
+    def render(self, msg: messages.Message) -> bytes | str | None:
+        if isinstance(msg, messages.Welcome):
+            return self.welcome(msg)
+        elif isinstance(msg, messages.Challenge):
+            return self.challenge(msg)
+
+        return None
+
+
+def get_handshake_templates(serializer: Serializer, roles: dict[str, Any]) -> HandshakeTemplates | None:
+    # encodes the roles, so routers build the templates once per serializer and pass them to
+    # every Acceptor instead of calling this per connection.
+    encoder = get_template_encoder(serializer)
+    if encoder is None:
+        return None
+
+    return HandshakeTemplates(encoder, roles)
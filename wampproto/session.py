@@ -1,9 +1,16 @@
-from wampproto import messages, serializers
+from wampproto import chunking, messages, queues, serializers
 
 
 class WAMPSession:
-    def __init__(self, serializer: serializers.Serializer = serializers.JSONSerializer()):
+    def __init__(
+        self,
+        serializer: serializers.Serializer = serializers.JSONSerializer(),
+        chunk_assembler: chunking.ChunkAssembler | None = None,
+        outbound: queues.OutboundQueue | None = None,
+    ):
         self._serializer = serializer
+        self._chunk_assembler = chunk_assembler
+        self._outbound = outbound
 
         # data structures for RPC
         self._call_requests: set[int] = set()
@@ -28,7 +35,9 @@ class WAMPSession:
             if msg.request_id not in self._invocation_requests:
                 raise ValueError("cannot yield for unknown invocation request")
 
-            self._invocation_requests.remove(msg.request_id)
+            # the invocation stays open until the final, non progressive yield
+            if not msg.options.get("progress", False):
+                self._invocation_requests.remove(msg.request_id)
         elif isinstance(msg, messages.Publish):
             if msg.options.get("acknowledge", False):
                 self._publish_requests.add(msg.request_id)
@@ -48,16 +57,46 @@ class WAMPSession:
 
         return self._serializer.serialize(msg)
 
+    def enqueue_message(self, msg: messages.Message) -> bool:
+        # like send_message() but the result is queued, returns True once the queue should be flushed
+        if self._outbound is None:
+            raise ValueError("session has no outbound queue")
+
+        return self._outbound.push(self.send_message(msg))
+
+    def flush(self) -> list[bytes | str]:
+        if self._outbound is None:
+            return []
+
+        return self._outbound.flush()
+
+    def send_chunked(
+        self, invocation: messages.Invocation, data: bytes | str, chunk_size: int = chunking.DEFAULT_CHUNK_SIZE
+    ) -> list[bytes]:
+        # the invocation must have been made with receive_progress, chunk_yields() refuses it
+        # otherwise. JSON has no binary type, so chunks are sent base64 encoded.
+        if invocation.request_id not in self._invocation_requests:
+            raise ValueError("cannot yield for unknown invocation request")
+
+        encoding = chunking.ENCODING_BASE64 if isinstance(self._serializer, serializers.JSONSerializer) else None
+        yields = chunking.chunk_yields(invocation, data, chunk_size, encoding)
+        return [self.send_message(msg) for msg in yields]
+
     def receive(self, data: bytes) -> messages.Message:
         msg = self._serializer.deserialize(data)
         return self.receive_message(msg)
 
     def receive_message(self, msg: messages.Message) -> messages.Message:
         if isinstance(msg, messages.Result):
-            try:
-                self._call_requests.remove(msg.request_id)
-            except KeyError:
+            if msg.request_id not in self._call_requests:
                 raise ValueError("received RESULT for invalid request_id")
+
+            if not msg.details.get("progress", False):
+                self._call_requests.remove(msg.request_id)
+
+            if self._chunk_assembler is not None:
+                # chunks are collected until the whole result arrived, None is returned until then
+                return self._chunk_assembler.add(msg)
         elif isinstance(msg, messages.Registered):
             try:
                 self._register_requests.remove(msg.request_id)
@@ -112,6 +151,9 @@ class WAMPSession:
                         self._call_requests.remove(msg.request_id)
                     except KeyError:
                         raise ValueError("received ERROR for invalid call request")
+
+                    if self._chunk_assembler is not None:
+                        self._chunk_assembler.discard(msg.request_id)
                 case messages.Register.TYPE:
                     try:
                         self._register_requests.remove(msg.request_id)
@@ -0,0 +1,181 @@
+import os
+import sys
+import threading
+
+from wampproto import idgen, messages, types
+from wampproto.broker import Broker, Subscription
+from wampproto.dealer import Dealer, Registration
+from wampproto.messages import util
+
+
+def default_shards() -> int:
+    # shards only pay off when threads run in parallel, on GIL builds a single shard is used
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    if is_gil_enabled is None or is_gil_enabled():
+        return 1
+
+    return os.cpu_count() or 1
+
+
+def _validate_shards(shards: int | None) -> int:
+    if shards is None:
+        return default_shards()
+
+    if shards < 1:
+        raise ValueError("shards must be at least 1")
+
+    return shards
+
+
+class ShardedBroker:
+    # partitions subscriptions by topic hash into shards that each have their own lock, so
+    # threads publishing to different topics don't contend. Subscription IDs are strided per
+    # shard, which routes UNSUBSCRIBE to the shard that owns the subscription.
+    def __init__(self, shards: int | None = None, uri_check: str | None = util.URI_CHECK_LOOSE):
+        super().__init__()
+        self._shards: list[Broker] = []
+        self._locks: list[threading.Lock] = []
+        count = _validate_shards(shards)
+        for shard in range(count):
+            broker = Broker(uri_check=uri_check)
+            broker.idgen = idgen.ShardScopeIDGenerator(shard, count)
+            self._shards.append(broker)
+            self._locks.append(threading.Lock())
+
+    @property
+    def shards(self) -> int:
+        return len(self._shards)
+
+    def shard_for_topic(self, topic: str) -> int:
+        return hash(topic) % len(self._shards)
+
+    def shard_for_id(self, subscription_id: int) -> int:
+        return (subscription_id - 1) % len(self._shards)
+
+    def add_session(self, details: types.SessionDetails):
+        # every shard needs to know the session, as it may subscribe to topics of any shard
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.add_session(details)
+
+    def remove_session(self, sid: int):
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.remove_session(sid)
+
+    def has_subscription(self, topic: str) -> bool:
+        index = self.shard_for_topic(topic)
+        with self._locks[index]:
+            return self._shards[index].has_subscription(topic)
+
+    def lookup_subscription(self, topic: str) -> int | None:
+        index = self.shard_for_topic(topic)
+        with self._locks[index]:
+            return self._shards[index].lookup_subscription(topic)
+
+    def get_subscription(self, subscription_id: int) -> Subscription | None:
+        index = self.shard_for_id(subscription_id)
+        with self._locks[index]:
+            return self._shards[index].get_subscription(subscription_id)
+
+    def count_subscribers(self, subscription_id: int) -> int | None:
+        index = self.shard_for_id(subscription_id)
+        with self._locks[index]:
+            return self._shards[index].count_subscribers(subscription_id)
+
+    def list_subscriptions(self) -> list[int]:
+        subscriptions = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                subscriptions.extend(shard.list_subscriptions())
+
+        return subscriptions
+
+    def receive_message(self, session_id: int, message: messages.Message) -> types.MessageWithRecipient:
+        if isinstance(message, messages.Subscribe):
+            index = self.shard_for_topic(message.topic)
+        elif isinstance(message, messages.Unsubscribe):
+            index = self.shard_for_id(message.subscription_id)
+        else:
+            raise ValueError("message type not supported")
+
+        with self._locks[index]:
+            return self._shards[index].receive_message(session_id, message)
+
+    def receive_publish(self, session_id: int, message: messages.Publish) -> types.Publication:
+        index = self.shard_for_topic(message.topic)
+        with self._locks[index]:
+            return self._shards[index].receive_publish(session_id, message)
+
+
+class ShardedDealer:
+    # partitions registrations by procedure hash like ShardedBroker. Registration and
+    # invocation IDs are strided per shard, so UNREGISTER, YIELD and ERROR messages are
+    # routed to the shard that owns the registration or the pending invocation.
+    def __init__(self, shards: int | None = None, uri_check: str | None = util.URI_CHECK_LOOSE):
+        super().__init__()
+        self._shards: list[Dealer] = []
+        self._locks: list[threading.Lock] = []
+        count = _validate_shards(shards)
+        for shard in range(count):
+            dealer = Dealer(uri_check=uri_check)
+            dealer.idgen = idgen.ShardScopeIDGenerator(shard, count)
+            self._shards.append(dealer)
+            self._locks.append(threading.Lock())
+
+    @property
+    def shards(self) -> int:
+        return len(self._shards)
+
+    def shard_for_procedure(self, procedure: str) -> int:
+        return hash(procedure) % len(self._shards)
+
+    def shard_for_id(self, id_: int) -> int:
+        return (id_ - 1) % len(self._shards)
+
+    def add_session(self, details: types.SessionDetails):
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.add_session(details)
+
+    def remove_session(self, sid: int):
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.remove_session(sid)
+
+    def has_registration(self, procedure: str) -> bool:
+        index = self.shard_for_procedure(procedure)
+        with self._locks[index]:
+            return self._shards[index].has_registration(procedure)
+
+    def lookup_registration(self, procedure: str) -> int | None:
+        index = self.shard_for_procedure(procedure)
+        with self._locks[index]:
+            return self._shards[index].lookup_registration(procedure)
+
+    def get_registration(self, registration_id: int) -> Registration | None:
+        index = self.shard_for_id(registration_id)
+        with self._locks[index]:
+            return self._shards[index].get_registration(registration_id)
+
+    def list_registrations(self) -> list[int]:
+        registrations = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                registrations.extend(shard.list_registrations())
+
+        return registrations
+
+    def receive_message(self, session_id: int, message: messages.Message) -> types.MessageWithRecipient:
+        if isinstance(message, (messages.Call, messages.Register)):
+            index = self.shard_for_procedure(message.procedure)
+        elif isinstance(message, messages.Unregister):
+            index = self.shard_for_id(message.registration_id)
+        elif isinstance(message, (messages.Yield, messages.Error)):
+            # the request ID of a YIELD or ERROR is the ID of the invocation it answers
+            index = self.shard_for_id(message.request_id)
+        else:
+            raise ValueError("message type not supported")
+
+        with self._locks[index]:
+            return self._shards[index].receive_message(session_id, message)
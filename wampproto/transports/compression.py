@@ -0,0 +1,273 @@
+import zlib
+
+from wampproto.transports import websocket
+
+PERMESSAGE_DEFLATE = "permessage-deflate"
+SERVER_NO_CONTEXT_TAKEOVER = "server_no_context_takeover"
+CLIENT_NO_CONTEXT_TAKEOVER = "client_no_context_takeover"
+SERVER_MAX_WINDOW_BITS = "server_max_window_bits"
+CLIENT_MAX_WINDOW_BITS = "client_max_window_bits"
+
+# messages below this size rarely shrink enough to be worth the CPU
+DEFAULT_THRESHOLD = 1024
+DEFAULT_MAX_MSG_SIZE = 2**24
+DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+# preset dictionary for small messages. zlib finds matches in it like in previously
+# compressed data, the most frequent strings come last so they get the shortest distances.
+WAMP_DICTIONARY = (
+    b'"x_payload_serializer"'
+    b'"disclose_me"'
+    b'"match": "prefix"'
+    b'"match": "wildcard"'
+    b'"authextra": {}'
+    b'"authmethods": ["anonymous"'
+    b'"authmethod": "ticket"'
+    b'"authmethod": "wampcra"'
+    b'"authmethod": "cryptosign"'
+    b'"authrole": "'
+    b'"authid": "'
+    b'{"roles": {"caller": {"features": {}}, "callee": {"features": {}}, '
+    b'"publisher": {"features": {}}, "subscriber": {"features": {}}}'
+    b'{"roles": {"dealer": {"features": {}}, "broker": {"features": {}}}'
+    b'"wamp.error.no_such_procedure"'
+    b'"wamp.error.invalid_argument"'
+    b'"wamp.error.authentication_failed"'
+    b'"wamp.close.close_realm"'
+    b'"wamp.session.on_join"'
+    b'"wamp.session.on_leave"'
+    b'"acknowledge": true'
+    b'"receive_progress": true'
+    b'"progress": true'
+    b'"publisher": '
+    b'"caller": '
+    b'"topic": "'
+    b'"procedure": "'
+    b"{}, [], {}]"
+    b"{}, ["
+    b", {}, "
+)
+
+
+class DeflateCompressor:
+    def __init__(
+        self,
+        level: int = zlib.Z_DEFAULT_COMPRESSION,
+        context_takeover: bool = True,
+        window_bits: int = 15,
+        zdict: bytes | None = None,
+    ):
+        super().__init__()
+        self._context_takeover = context_takeover
+        if zdict is not None:
+            self._prototype = zlib.compressobj(level, zlib.DEFLATED, -window_bits, zdict=zdict)
+        else:
+            self._prototype = zlib.compressobj(level, zlib.DEFLATED, -window_bits)
+
+        self._compressor = self._prototype.copy()
+
+    def compress(self, data: bytes) -> bytes:
+        # raw deflate ending on a sync flush with the 4 byte empty block stripped (RFC 7692)
+        if self._context_takeover:
+            compressor = self._compressor
+        else:
+            # copying a primed compressor is cheaper than creating (and loading the dictionary into) a new one
+            compressor = self._prototype.copy()
+
+        compressed = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        return compressed[:-4]
+
+
+class DeflateDecompressor:
+    def __init__(
+        self,
+        context_takeover: bool = True,
+        window_bits: int = 15,
+        zdict: bytes | None = None,
+        max_size: int = DEFAULT_MAX_MSG_SIZE,
+    ):
+        super().__init__()
+        self._context_takeover = context_takeover
+        self._max_size = max_size
+        if zdict is not None:
+            self._prototype = zlib.decompressobj(-window_bits, zdict=zdict)
+        else:
+            self._prototype = zlib.decompressobj(-window_bits)
+
+        self._decompressor = self._prototype.copy()
+
+    def decompress(self, data: bytes) -> bytes:
+        decompressor = self._decompressor if self._context_takeover else self._prototype.copy()
+        # bounded so a small message can't expand into an arbitrary amount of memory
+        decompressed = decompressor.decompress(data + DEFLATE_TAIL, self._max_size)
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"decompressed message exceeds max message size {self._max_size}")
+
+        return decompressed
+
+
+def parse_extensions(header: str) -> list[tuple[str, dict[str, str | None]]]:
+    extensions = []
+    for offer in header.split(","):
+        name, *params = (part.strip() for part in offer.split(";"))
+        if not name:
+            continue
+
+        parsed: dict[str, str | None] = {}
+        for param in params:
+            key, _, value = param.partition("=")
+            parsed[key.strip()] = value.strip().strip('"') or None
+
+        extensions.append((name, parsed))
+
+    return extensions
+
+
+class PerMessageDeflate:
+    def __init__(
+        self,
+        is_server: bool,
+        threshold: int = DEFAULT_THRESHOLD,
+        level: int = zlib.Z_DEFAULT_COMPRESSION,
+        local_context_takeover: bool = True,
+        remote_context_takeover: bool = True,
+        local_window_bits: int = 15,
+        max_msg_size: int = DEFAULT_MAX_MSG_SIZE,
+    ):
+        super().__init__()
+        self._is_server = is_server
+        self._threshold = threshold
+        self._compressor = DeflateCompressor(level, local_context_takeover, local_window_bits)
+        self._decompressor = DeflateDecompressor(remote_context_takeover, max_size=max_msg_size)
+
+    @classmethod
+    def accept(
+        cls, header: str, threshold: int = DEFAULT_THRESHOLD, **kwargs
+    ) -> tuple[str, "PerMessageDeflate"] | None:
+        # server side: picks the first acceptable permessage-deflate offer of the client and
+        # returns the Sec-WebSocket-Extensions response along with the negotiated codec
+        for name, params in parse_extensions(header):
+            if name != PERMESSAGE_DEFLATE:
+                continue
+
+            response = [PERMESSAGE_DEFLATE]
+            window_bits = 15
+            if SERVER_MAX_WINDOW_BITS in params:
+                try:
+                    window_bits = int(params[SERVER_MAX_WINDOW_BITS])
+                except (TypeError, ValueError):
+                    continue
+
+                # zlib can't produce a raw deflate stream with a window of 256 bytes
+                if not 9 <= window_bits <= 15:
+                    continue
+
+                response.append(f"{SERVER_MAX_WINDOW_BITS}={window_bits}")
+
+            local_context_takeover = SERVER_NO_CONTEXT_TAKEOVER not in params
+            if not local_context_takeover:
+                response.append(SERVER_NO_CONTEXT_TAKEOVER)
+
+            remote_context_takeover = CLIENT_NO_CONTEXT_TAKEOVER not in params
+            if not remote_context_takeover:
+                response.append(CLIENT_NO_CONTEXT_TAKEOVER)
+
+            codec = cls(
+                True,
+                threshold,
+                local_context_takeover=local_context_takeover,
+                remote_context_takeover=remote_context_takeover,
+                local_window_bits=window_bits,
+                **kwargs,
+            )
+            return "; ".join(response), codec
+
+        return None
+
+    @classmethod
+    def offer(cls) -> str:
+        return f"{PERMESSAGE_DEFLATE}; {CLIENT_MAX_WINDOW_BITS}"
+
+    @classmethod
+    def from_response(cls, header: str, threshold: int = DEFAULT_THRESHOLD, **kwargs) -> "PerMessageDeflate":
+        # client side: sets up the codec as agreed in the server's Sec-WebSocket-Extensions response
+        for name, params in parse_extensions(header):
+            if name != PERMESSAGE_DEFLATE:
+                continue
+
+            window_bits = int(params.get(CLIENT_MAX_WINDOW_BITS) or 15)
+            return cls(
+                False,
+                threshold,
+                local_context_takeover=CLIENT_NO_CONTEXT_TAKEOVER not in params,
+                remote_context_takeover=SERVER_NO_CONTEXT_TAKEOVER not in params,
+                local_window_bits=window_bits,
+                **kwargs,
+            )
+
+        raise ValueError(f"{PERMESSAGE_DEFLATE} was not accepted")
+
+    def encode(self, data: bytes | str) -> bytes:
+        opcode = websocket.OPCODE_BINARY
+        if isinstance(data, str):
+            data = data.encode()
+            opcode = websocket.OPCODE_TEXT
+
+        # clients mask their frames
+        mask = not self._is_server
+        if len(data) < self._threshold:
+            return websocket.encode_frame(opcode, data, mask=mask)
+
+        return websocket.encode_frame(opcode, self._compressor.compress(data), mask=mask, rsv1=True)
+
+    def decode(self, frame: websocket.Frame) -> websocket.Frame:
+        if not frame.rsv1:
+            return frame
+
+        payload = self._decompressor.decompress(frame.payload)
+        if frame.opcode == websocket.OPCODE_TEXT:
+            return websocket.Frame(frame.opcode, payload.decode())
+
+        return websocket.Frame(frame.opcode, payload)
+
+
+class RawSocketCompression:
+    # RawSocket has no room to negotiate compression: the handshake's reserved bytes must be
+    # zero and message types 3-7 are reserved. This codec is for links where both peers are
+    # configured to use it, e.g. between routers. Each message is prefixed with one byte
+    # telling whether the rest is compressed, so small messages can be sent as they are.
+    FLAG_PLAIN = 0
+    FLAG_DEFLATE = 1
+
+    def __init__(
+        self,
+        threshold: int = 256,
+        level: int = zlib.Z_DEFAULT_COMPRESSION,
+        context_takeover: bool = True,
+        zdict: bytes | None = WAMP_DICTIONARY,
+        max_msg_size: int = DEFAULT_MAX_MSG_SIZE,
+    ):
+        super().__init__()
+        self._threshold = threshold
+        self._compressor = DeflateCompressor(level, context_takeover, zdict=zdict)
+        self._decompressor = DeflateDecompressor(context_takeover, zdict=zdict, max_size=max_msg_size)
+
+    def encode(self, data: bytes | str) -> bytes:
+        if isinstance(data, str):
+            data = data.encode()
+
+        if len(data) < self._threshold:
+            return bytes((self.FLAG_PLAIN,)) + data
+
+        return bytes((self.FLAG_DEFLATE,)) + self._compressor.compress(data)
+
+    def decode(self, data: bytes) -> bytes:
+        if not data:
+            raise ValueError("empty message")
+
+        if data[0] == self.FLAG_PLAIN:
+            return data[1:]
+        elif data[0] == self.FLAG_DEFLATE:
+            return self._decompressor.decompress(data[1:])
+
+        raise ValueError(f"unknown compression flag {data[0]}")
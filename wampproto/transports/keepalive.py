@@ -0,0 +1,122 @@
+import struct
+import time
+from typing import Callable
+
+from wampproto.transports import rawsocket
+
+PING_PAYLOAD = struct.Struct(">Q")
+
+
+class RTTHistogram:
+    # log2 buckets of microseconds, bucket i counts RTTs in [2^(i-1), 2^i) us. 32 buckets
+    # reach past an hour, more than any deadline would allow.
+    def __init__(self, buckets: int = 32):
+        super().__init__()
+        self._counts = [0] * buckets
+        self._count = 0
+        self._total = 0.0
+        self._min = float("inf")
+        self._max = 0.0
+
+    def record(self, rtt: float) -> None:
+        index = min(int(rtt * 1_000_000).bit_length(), len(self._counts) - 1)
+        self._counts[index] += 1
+        self._count += 1
+        self._total += rtt
+        self._min = min(self._min, rtt)
+        self._max = max(self._max, rtt)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def min(self) -> float:
+        return self._min if self._count else 0.0
+
+    @property
+    def max(self) -> float:
+        return self._max
+
+    @property
+    def mean(self) -> float:
+        return self._total / self._count if self._count else 0.0
+
+    def percentile(self, p: float) -> float:
+        # upper bound of the bucket holding the p-th percentile, in seconds
+        if self._count == 0:
+            return 0.0
+
+        rank = p / 100 * self._count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank and count:
+                return min((1 << index) / 1_000_000, self._max)
+
+        return self._max
+
+    def buckets(self) -> list[int]:
+        return list(self._counts)
+
+
+class KeepAlive:
+    def __init__(self, interval: float = 30.0, timeout: float = 10.0, now: Callable[[], float] = time.monotonic):
+        super().__init__()
+        if interval <= 0 or timeout <= 0:
+            raise ValueError("interval and timeout must be positive")
+
+        self._interval = interval
+        self._timeout = timeout
+        self._now = now
+
+        self._last_received = now()
+        self._sequence = 0
+        # kept after other traffic proved the peer alive, so a late PONG still yields an RTT
+        self._ping_sent_at: float | None = None
+        self._awaiting_pong = False
+        self.rtt = RTTHistogram()
+
+    def touch(self) -> None:
+        # any traffic from the peer proves it is alive, so pings are only sent on idle connections
+        # and a busy peer isn't declared dead while its PONG is queued behind other messages.
+        self._last_received = self._now()
+        self._awaiting_pong = False
+
+    def next_deadline(self) -> float:
+        # the time at which poll() must be called next
+        if self._awaiting_pong:
+            return self._ping_sent_at + self._timeout
+
+        return self._last_received + self._interval
+
+    def poll(self) -> bytes | None:
+        # returns a PING frame to send if the connection has been idle long enough
+        if self._awaiting_pong:
+            return None
+
+        now = self._now()
+        if now - self._last_received < self._interval:
+            return None
+
+        self._sequence += 1
+        self._ping_sent_at = now
+        self._awaiting_pong = True
+        payload = PING_PAYLOAD.pack(self._sequence)
+        return rawsocket.pack_header(rawsocket.MSG_TYPE_PING, len(payload)) + payload
+
+    def is_dead(self) -> bool:
+        return self._awaiting_pong and self._now() - self._ping_sent_at >= self._timeout
+
+    def receive(self, kind: int, payload: bytes) -> bytes | None:
+        # handles a frame read from the connection, PINGs are answered with the PONG to send back
+        self.touch()
+        if kind == rawsocket.MSG_TYPE_PING:
+            return rawsocket.pack_header(rawsocket.MSG_TYPE_PONG, len(payload)) + payload
+
+        if kind == rawsocket.MSG_TYPE_PONG and self._ping_sent_at is not None:
+            if len(payload) == PING_PAYLOAD.size and PING_PAYLOAD.unpack(payload)[0] == self._sequence:
+                self.rtt.record(self._last_received - self._ping_sent_at)
+                self._ping_sent_at = None
+
+        return None
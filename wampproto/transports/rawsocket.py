@@ -1,18 +1,43 @@
 import math
+import struct
+
+from wampproto import serializers
 
 MAGIC = 0x7F
 # 16 megabyte
 PROTOCOL_MAX_MSG_SIZE = 2**24
+PROTOCOL_MIN_MSG_SIZE = 2**9
 DEFAULT_MAX_MSG_SIZE = 2**20
 
 SERIALIZER_TYPE_JSON = 1
 SERIALIZER_TYPE_MSGPACK = 2
 SERIALIZER_TYPE_CBOR = 3
 
+SERIALIZERS: dict[int, type[serializers.Serializer]] = {
+    SERIALIZER_TYPE_JSON: serializers.JSONSerializer,
+    SERIALIZER_TYPE_MSGPACK: serializers.MsgPackSerializer,
+    SERIALIZER_TYPE_CBOR: serializers.CBORSerializer,
+}
+
+ERROR_SERIALIZER_UNSUPPORTED = 1
+ERROR_MAX_MSG_SIZE_UNACCEPTABLE = 2
+ERROR_RESERVED_BITS_USED = 3
+ERROR_MAX_CONNECTION_COUNT_REACHED = 4
+
+ERROR_MESSAGES = {
+    ERROR_SERIALIZER_UNSUPPORTED: "serializer unsupported",
+    ERROR_MAX_MSG_SIZE_UNACCEPTABLE: "maximum message length unacceptable",
+    ERROR_RESERVED_BITS_USED: "use of reserved bits (unsupported feature)",
+    ERROR_MAX_CONNECTION_COUNT_REACHED: "maximum connection count reached",
+}
+
 MSG_TYPE_WAMP = 0
 MSG_TYPE_PING = 1
 MSG_TYPE_PONG = 2
 
+# kind in the most significant byte, followed by the 24 bit payload length
+HEADER = struct.Struct(">I")
+
 
 class Handshake:
     def __init__(self, protocol: int, max_msg_size: int):
@@ -51,24 +76,59 @@ class MessageHeader:
         return self._length
 
     def to_bytes(self) -> bytes:
-        data = int_to_bytes(self._length)
-        return bytes(
-            [
-                self._kind,
-                data[0],
-                data[1],
-                data[2],
-            ]
-        )
+        return pack_header(self._kind, self._length)
 
     @classmethod
     def from_bytes(cls, data: bytes) -> "MessageHeader":
-        return MessageHeader(data[0], bytes_to_int(data[1:]))
+        value = HEADER.unpack_from(data)[0]
+        return MessageHeader(value >> 24, value & 0xFFFFFF)
+
+
+def pack_header(kind: int, length: int) -> bytes:
+    if length >= PROTOCOL_MAX_MSG_SIZE:
+        raise ValueError(f"message of {length} bytes exceeds the protocol limit of {PROTOCOL_MAX_MSG_SIZE} bytes")
+
+    return HEADER.pack(kind << 24 | length)
+
+
+def frame_many(payloads: list[bytes | str], kind: int = MSG_TYPE_WAMP) -> list[bytes]:
+    # header and payload buffers are interleaved instead of concatenated, ready for
+    # socket.sendmsg() or transport.writelines().
+    buffers: list[bytes] = []
+    append = buffers.append
+    pack = HEADER.pack
+    prefix = kind << 24
+    for payload in payloads:
+        if isinstance(payload, str):
+            payload = payload.encode()
+
+        length = len(payload)
+        if length >= PROTOCOL_MAX_MSG_SIZE:
+            raise ValueError(f"message of {length} bytes exceeds the protocol limit of {PROTOCOL_MAX_MSG_SIZE} bytes")
+
+        append(pack(prefix | length))
+        append(payload)
+
+    return buffers
+
+
+class HandshakeError(ValueError):
+    def __init__(self, code: int):
+        super().__init__(f"rawsocket handshake failed: {ERROR_MESSAGES.get(code, f'unknown error {code}')}")
+        self.code = code
+
+
+def validate_max_msg_size(max_msg_size: int) -> None:
+    if max_msg_size > PROTOCOL_MAX_MSG_SIZE or max_msg_size < PROTOCOL_MIN_MSG_SIZE:
+        raise ValueError(
+            f"max_msg_size must be between {PROTOCOL_MIN_MSG_SIZE} and {PROTOCOL_MAX_MSG_SIZE}, got {max_msg_size}"
+        )
 
 
 def send_handshake(hs: Handshake) -> bytes:
-    # FIXME: max_msg_size must not be more than 16 megabytes.
-    # FIXME: protocol must be checked to ensure only supported serializers are used.
+    validate_max_msg_size(hs.max_msg_size)
+    if hs.protocol not in SERIALIZERS:
+        raise ValueError(f"unsupported serializer {hs.protocol}")
 
     return bytes(
         [
@@ -80,6 +140,10 @@ def send_handshake(hs: Handshake) -> bytes:
     )
 
 
+def send_handshake_error(code: int) -> bytes:
+    return bytes([MAGIC, code << 4, 0x00, 0x00])
+
+
 def receive_handshake(data: bytes) -> Handshake:
     if len(data) != 4:
         raise ValueError("Expected 4 bytes for handshake response, got %d" % len(data))
@@ -87,27 +151,104 @@ def receive_handshake(data: bytes) -> Handshake:
     if data[0] != MAGIC:
         raise ValueError("Expected MAGIC, got %d" % data[0])
 
-    if data[2] != 0x00 and data[3] != 0x00:
-        raise ValueError(f"Expected 0x00 for third and fourth byte of handshake response, got {data[2]} and {data[3]}")
+    if data[2] != 0x00 or data[3] != 0x00:
+        raise HandshakeError(ERROR_RESERVED_BITS_USED)
+
+    # a zero serializer means the peer refused the handshake, the upper nibble holds the reason
+    if data[1] & 0x0F == 0:
+        raise HandshakeError(data[1] >> 4)
 
     return Handshake(data[1] & 0x0F, 1 << ((data[1] >> 4) + 9))
 
 
+class ClientHandshaker:
+    def __init__(self, protocol: int = SERIALIZER_TYPE_JSON, max_msg_size: int = DEFAULT_MAX_MSG_SIZE):
+        super().__init__()
+        validate_max_msg_size(max_msg_size)
+        if protocol not in SERIALIZERS:
+            raise ValueError(f"unsupported serializer {protocol}")
+
+        self._handshake = Handshake(protocol, max_msg_size)
+        self._serializer: serializers.Serializer | None = None
+        self._peer_max_msg_size = 0
+
+    def send(self) -> bytes:
+        return send_handshake(self._handshake)
+
+    def receive(self, data: bytes) -> serializers.Serializer:
+        hs = receive_handshake(data)
+        if hs.protocol != self._handshake.protocol:
+            raise HandshakeError(ERROR_SERIALIZER_UNSUPPORTED)
+
+        self._serializer = SERIALIZERS[hs.protocol]()
+        self._peer_max_msg_size = hs.max_msg_size
+        return self._serializer
+
+    @property
+    def serializer(self) -> serializers.Serializer | None:
+        return self._serializer
+
+    @property
+    def peer_max_msg_size(self) -> int:
+        # the largest message the router accepts
+        return self._peer_max_msg_size
+
+
+class ServerHandshaker:
+    def __init__(
+        self,
+        protocols: list[int] | None = None,
+        max_msg_size: int = DEFAULT_MAX_MSG_SIZE,
+        min_peer_msg_size: int = PROTOCOL_MIN_MSG_SIZE,
+        max_connections: int | None = None,
+    ):
+        super().__init__()
+        validate_max_msg_size(max_msg_size)
+        self._protocols = frozenset(protocols if protocols is not None else SERIALIZERS).intersection(SERIALIZERS)
+        self._max_msg_size = max_msg_size
+        self._min_peer_msg_size = min_peer_msg_size
+        self._max_connections = max_connections
+
+        self._serializer: serializers.Serializer | None = None
+        self._peer_max_msg_size = 0
+
+    def receive(self, data: bytes, connections: int = 0) -> tuple[bytes, bool]:
+        # returns the reply and whether the handshake succeeded. On failure the reply carries
+        # the error code and the connection must be closed after sending it.
+        # the request is parsed here rather than by receive_handshake(), which reads a zero
+        # serializer as an error reply. A client always has to name a serializer.
+        if len(data) != 4 or data[0] != MAGIC or data[2] != 0x00 or data[3] != 0x00:
+            # there is no error code for a bad magic byte, it is reported as use of reserved bits
+            return send_handshake_error(ERROR_RESERVED_BITS_USED), False
+
+        if self._max_connections is not None and connections >= self._max_connections:
+            return send_handshake_error(ERROR_MAX_CONNECTION_COUNT_REACHED), False
+
+        protocol = data[1] & 0x0F
+        if protocol not in self._protocols:
+            return send_handshake_error(ERROR_SERIALIZER_UNSUPPORTED), False
+
+        max_msg_size = 1 << ((data[1] >> 4) + 9)
+        if max_msg_size < self._min_peer_msg_size:
+            return send_handshake_error(ERROR_MAX_MSG_SIZE_UNACCEPTABLE), False
+
+        self._serializer = SERIALIZERS[protocol]()
+        self._peer_max_msg_size = max_msg_size
+        return send_handshake(Handshake(protocol, self._max_msg_size)), True
+
+    @property
+    def serializer(self) -> serializers.Serializer | None:
+        return self._serializer
+
+    @property
+    def peer_max_msg_size(self) -> int:
+        # the largest message the client accepts
+        return self._peer_max_msg_size
+
+
 def int_to_bytes(i: int) -> bytes:
-    return bytes(
-        [
-            (i >> 16) & 0xFF,
-            (i >> 8) & 0xFF,
-            i & 0xFF,
-        ]
-    )
+    return (i & 0xFFFFFF).to_bytes(3, "big")
 
 
 def bytes_to_int(b: bytes) -> int:
-    n = 0
-    shift = 0
-    for byte in reversed(b):
-        n |= byte << shift
-        shift += 8
-
-    return n
+    return int.from_bytes(b, "big")
@@ -0,0 +1,278 @@
+import base64
+import hashlib
+
+from wampproto import entropy, serializers
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+SUBPROTOCOL_JSON = "wamp.2.json"
+SUBPROTOCOL_MSGPACK = "wamp.2.msgpack"
+SUBPROTOCOL_CBOR = "wamp.2.cbor"
+
+# in order of preference when the client offers more than one
+SUBPROTOCOLS: dict[str, type[serializers.Serializer]] = {
+    SUBPROTOCOL_CBOR: serializers.CBORSerializer,
+    SUBPROTOCOL_MSGPACK: serializers.MsgPackSerializer,
+    SUBPROTOCOL_JSON: serializers.JSONSerializer,
+}
+
+DEFAULT_MAX_MSG_SIZE = 2**20
+MAX_CONTROL_PAYLOAD = 125
+
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_INVALID_PAYLOAD = 1007
+CLOSE_MESSAGE_TOO_BIG = 1009
+
+
+class ProtocolError(ValueError):
+    # the close code to fail the connection with (RFC 6455 section 7.4.1)
+    def __init__(self, message: str, close_code: int = CLOSE_PROTOCOL_ERROR):
+        super().__init__(message)
+        self.close_code = close_code
+
+
+def accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + GUID).encode()).digest()).decode()
+
+
+def select_subprotocol(offered: list[str]) -> str | None:
+    for subprotocol in SUBPROTOCOLS:
+        if subprotocol in offered:
+            return subprotocol
+
+    return None
+
+
+def get_serializer(subprotocol: str) -> serializers.Serializer:
+    serializer_class = SUBPROTOCOLS.get(subprotocol)
+    if serializer_class is None:
+        raise ValueError(f"unsupported subprotocol '{subprotocol}'")
+
+    return serializer_class()
+
+
+def mask_payload(payload: bytes | memoryview, mask: bytes) -> bytes:
+    # XOR the whole payload at once as a big integer instead of byte by byte
+    length = len(payload)
+    if length == 0:
+        return b""
+
+    key = mask * (length // 4 + 1)
+    masked = int.from_bytes(payload, "little") ^ int.from_bytes(key[:length], "little")
+    return masked.to_bytes(length, "little")
+
+
+class Frame:
+    def __init__(self, opcode: int, payload: bytes | str, fin: bool = True, rsv1: bool = False):
+        super().__init__()
+        self._opcode = opcode
+        self._payload = payload
+        self._fin = fin
+        self._rsv1 = rsv1
+
+    @property
+    def opcode(self) -> int:
+        return self._opcode
+
+    @property
+    def payload(self) -> bytes | str:
+        return self._payload
+
+    @property
+    def fin(self) -> bool:
+        return self._fin
+
+    @property
+    def rsv1(self) -> bool:
+        # set on compressed messages when permessage-deflate was negotiated
+        return self._rsv1
+
+    def is_control(self) -> bool:
+        return self._opcode >= OPCODE_CLOSE
+
+
+def encode_frame(opcode: int, payload: bytes, fin: bool = True, mask: bool = False, rsv1: bool = False) -> bytes:
+    length = len(payload)
+    first = (0x80 if fin else 0) | (0x40 if rsv1 else 0) | opcode
+    mask_bit = 0x80 if mask else 0
+
+    if length < 126:
+        header = bytes((first, mask_bit | length))
+    elif length < 1 << 16:
+        header = bytes((first, mask_bit | 126)) + length.to_bytes(2, "big")
+    else:
+        header = bytes((first, mask_bit | 127)) + length.to_bytes(8, "big")
+
+    if not mask:
+        return header + payload
+
+    # clients must mask every frame with a fresh key
+    key = entropy.token_bytes(4)
+    return header + key + mask_payload(payload, key)
+
+
+def encode_message(data: bytes | str, mask: bool = False) -> bytes:
+    # the JSON serializer returns str, which is sent as a text frame
+    if isinstance(data, str):
+        return encode_frame(OPCODE_TEXT, data.encode(), mask=mask)
+
+    return encode_frame(OPCODE_BINARY, data, mask=mask)
+
+
+def frame_many(payloads: list[bytes | str], mask: bool = False) -> list[bytes]:
+    # framer for queues.OutboundQueue, JSON messages (str) are sent as text frames
+    return [encode_message(payload, mask) for payload in payloads]
+
+
+class FrameDecoder:
+    def __init__(
+        self, max_msg_size: int = DEFAULT_MAX_MSG_SIZE, expect_masked: bool | None = None, allow_rsv1: bool = False
+    ):
+        super().__init__()
+        self._max_msg_size = max_msg_size
+        # servers expect masked frames, clients unmasked ones. None accepts both.
+        self._expect_masked = expect_masked
+        self._reserved_mask = 0x30 if allow_rsv1 else 0x70
+        self._buffer = bytearray()
+
+        self._fragments: list[bytes] = []
+        self._fragments_size = 0
+        self._fragments_opcode: int | None = None
+        self._fragments_rsv1 = False
+
+    def feed(self, data: bytes) -> list[Frame]:
+        # returns control frames and complete messages, fragmented messages are reassembled.
+        self._buffer += data
+        frames: list[Frame] = []
+
+        view = memoryview(self._buffer)
+        offset = 0
+        try:
+            while True:
+                frame, consumed = self._parse(view, offset)
+                if frame is None:
+                    break
+
+                offset += consumed
+                frame = self._reassemble(frame)
+                if frame is not None:
+                    frames.append(frame)
+        finally:
+            view.release()
+            del self._buffer[:offset]
+
+        return frames
+
+    def _parse(self, view: memoryview, offset: int) -> tuple[Frame | None, int]:
+        available = len(view) - offset
+        if available < 2:
+            return None, 0
+
+        first, second = view[offset], view[offset + 1]
+        if first & self._reserved_mask:
+            raise ProtocolError("reserved bits must not be set")
+
+        opcode = first & 0x0F
+        fin = bool(first & 0x80)
+        masked = bool(second & 0x80)
+        if self._expect_masked is not None and masked != self._expect_masked:
+            raise ProtocolError("masked frame expected" if self._expect_masked else "unexpected masked frame")
+
+        length = second & 0x7F
+        header_size = 2
+        if length == 126:
+            header_size = 4
+            if available < header_size:
+                return None, 0
+
+            length = int.from_bytes(view[offset + 2 : offset + 4], "big")
+        elif length == 127:
+            header_size = 10
+            if available < header_size:
+                return None, 0
+
+            length = int.from_bytes(view[offset + 2 : offset + 10], "big")
+            if length >> 63:
+                raise ProtocolError("most significant bit of a 64-bit payload length must be 0")
+
+        if opcode >= OPCODE_CLOSE and (length > MAX_CONTROL_PAYLOAD or not fin):
+            raise ProtocolError("control frames must not be fragmented or exceed 125 bytes")
+
+        if length > self._max_msg_size:
+            raise ProtocolError(
+                f"frame of {length} bytes exceeds max message size {self._max_msg_size}", CLOSE_MESSAGE_TOO_BIG
+            )
+
+        if masked:
+            header_size += 4
+
+        if available < header_size + length:
+            return None, 0
+
+        start = offset + header_size
+        if masked:
+            payload = mask_payload(view[start : start + length], bytes(view[start - 4 : start]))
+        else:
+            payload = bytes(view[start : start + length])
+
+        rsv1 = bool(first & 0x40)
+        if rsv1 and (opcode >= OPCODE_CLOSE or opcode == OPCODE_CONTINUATION):
+            raise ProtocolError("RSV1 may only be set on the first frame of a data message")
+
+        return Frame(opcode, payload, fin, rsv1), header_size + length
+
+    def _reassemble(self, frame: Frame) -> Frame | None:
+        if frame.is_control():
+            if frame.opcode not in (OPCODE_CLOSE, OPCODE_PING, OPCODE_PONG):
+                raise ProtocolError(f"unknown opcode {frame.opcode}")
+
+            return frame
+
+        if frame.opcode == OPCODE_CONTINUATION:
+            if self._fragments_opcode is None:
+                raise ProtocolError("continuation frame without a message to continue")
+        elif frame.opcode in (OPCODE_TEXT, OPCODE_BINARY):
+            if self._fragments_opcode is not None:
+                raise ProtocolError("new message started before the previous one was finished")
+
+            if frame.fin:
+                return self._message(frame.opcode, frame.payload, frame.rsv1)
+
+            self._fragments_opcode = frame.opcode
+            self._fragments_rsv1 = frame.rsv1
+        else:
+            raise ProtocolError(f"unknown opcode {frame.opcode}")
+
+        self._fragments_size += len(frame.payload)
+        if self._fragments_size > self._max_msg_size:
+            raise ProtocolError(f"message exceeds max message size {self._max_msg_size}", CLOSE_MESSAGE_TOO_BIG)
+
+        self._fragments.append(frame.payload)
+        if not frame.fin:
+            return None
+
+        message = self._message(self._fragments_opcode, b"".join(self._fragments), self._fragments_rsv1)
+        self._fragments = []
+        self._fragments_size = 0
+        self._fragments_opcode = None
+        self._fragments_rsv1 = False
+
+        return message
+
+    @staticmethod
+    def _message(opcode: int, payload: bytes, rsv1: bool) -> Frame:
+        # compressed text is only decoded after decompression
+        if opcode == OPCODE_TEXT and not rsv1:
+            try:
+                return Frame(opcode, payload.decode())
+            except UnicodeDecodeError:
+                raise ProtocolError("text message is not valid UTF-8", CLOSE_INVALID_PAYLOAD)
+
+        return Frame(opcode, payload, True, rsv1)
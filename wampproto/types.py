@@ -47,5 +47,15 @@ class MessageWithRecipient:
 @dataclass
 class Publication:
     event: messages.Event | None = None
-    recipients: list[int] = None
+    # a tuple since it is shared with other publications to the same subscription, in the
+    # order the sessions subscribed
+    recipients: tuple[int, ...] = None
     ack: MessageWithRecipient | None = None
+
+
+@dataclass
+class PublicationBatch:
+    # events per recipient in publish order, and the acknowledgements for the publisher.
+    # Routers using subscriber queues pass it to Broker.dispatch_batch().
+    events: dict[int, list[messages.Event]]
+    acks: list[MessageWithRecipient]
@@ -3,3 +3,8 @@ PROCEDURE_ALREADY_EXISTS = "wamp.error.procedure_already_exists"
 INVALID_URI = "wamp.error.invalid_uri"
 AUTHENTICATION_FAILED = "wamp.error.authentication_failed"
 CLOSE_REALM = "wamp.close.close_realm"
+NO_SUCH_PROCEDURE = "wamp.error.no_such_procedure"
+NO_SUCH_SUBSCRIPTION = "wamp.error.no_such_subscription"
+NO_SUCH_REGISTRATION = "wamp.error.no_such_registration"
+TOO_MANY_REQUESTS = "wamp.error.too_many_requests"
+NO_AUTH_METHOD = "wamp.error.no_auth_method"
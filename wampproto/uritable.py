@@ -0,0 +1,60 @@
+class URITable:
+    def __init__(self):
+        super().__init__()
+        self._handles: dict[str, int] = {}
+        self._uris: list[str | None] = []
+        self._refcounts: list[int] = []
+        self._free: list[int] = []
+
+    def intern(self, uri: str) -> int:
+        handle = self._handles.get(uri)
+        if handle is not None:
+            self._refcounts[handle] += 1
+            return handle
+
+        if self._free:
+            handle = self._free.pop()
+            self._uris[handle] = uri
+            self._refcounts[handle] = 1
+        else:
+            handle = len(self._uris)
+            self._uris.append(uri)
+            self._refcounts.append(1)
+
+        self._handles[uri] = handle
+        return handle
+
+    def release(self, handle: int) -> None:
+        count = self._refcounts[handle] - 1
+        if count < 0:
+            raise ValueError(f"handle {handle} is not interned")
+
+        self._refcounts[handle] = count
+        if count == 0:
+            del self._handles[self._uris[handle]]
+            self._uris[handle] = None
+            self._free.append(handle)
+
+    def handle(self, uri: str) -> int | None:
+        return self._handles.get(uri)
+
+    def uri(self, handle: int) -> str:
+        uri = self._uris[handle]
+        if uri is None:
+            raise ValueError(f"handle {handle} is not interned")
+
+        return uri
+
+    def canonical(self, uri: str) -> str:
+        # never grows the table, so URIs received from the wire can't be used to fill it up.
+        handle = self._handles.get(uri)
+        if handle is None:
+            return uri
+
+        return self._uris[handle]
+
+    def __contains__(self, uri: str) -> bool:
+        return uri in self._handles
+
+    def __len__(self) -> int:
+        return len(self._handles)